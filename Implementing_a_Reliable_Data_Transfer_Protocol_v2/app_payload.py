@@ -0,0 +1,38 @@
+# The hosts only ever handle bytes: they are given bytes to send and hand back whatever part
+# of a packet holds the payload, which may be a memoryview into the packet. What the
+# simulated applications send and expect back is set here, at the edge of the simulator:
+#
+#   TextPayloads    the default. Applications send short str messages, which go down as
+#                   UTF-8 and are decoded again on delivery. The test configs expect this
+#   BinaryPayloads  with --binary_payloads. Applications send random bytes of 1 to
+#                   --payload_size bytes, which are delivered as bytes
+
+class TextPayloads():
+    def to_bytes(self, payload):
+        return payload.encode()
+
+    def from_bytes(self, data):
+        return str(data, "utf-8")
+
+    # How a payload is shown in the trace
+    def describe(self, data):
+        return str(data, "utf-8", "replace")
+
+
+class BinaryPayloads():
+    def to_bytes(self, payload):
+        return payload if isinstance(payload, bytes) else bytes(payload)
+
+    def from_bytes(self, data):
+        return data if isinstance(data, bytes) else bytes(data)
+
+    def describe(self, data):
+        if len(data) > 16:
+            return "%s... (%i bytes)" % (bytes(data[:16]).hex(), len(data))
+        return bytes(data).hex()
+
+
+def payloads_from_options(options):
+    if getattr(options, "binary_payloads", False):
+        return BinaryPayloads()
+    return TextPayloads()
@@ -0,0 +1,74 @@
+# Runs every golden test config with the fixed timer interval, with --adaptive_rto, and with
+# --adaptive_rto --rto_reset_on_ack, and compares the number of retransmitted data packets
+# and when the last data was delivered. Every run must deliver exactly the data that was
+# sent, in order.
+#
+# The golden configs use the random delay channel, which reorders packets. Go-Back-N takes
+# that for loss and resends the window, so Karn's algorithm leaves almost no valid samples
+# and the adaptive timer can't beat the fixed one there. A second table runs the same three
+# timers over a modelled link, which keeps packets in order, with a range of fixed timer
+# intervals around its round trip time. That is where the adaptive timer pays off: it
+# recovers much sooner when the fixed interval is too long, and resends much less when it
+# is too short.
+#
+#   python -m benchmarks.bench_adaptive_rto [--scale 10] [--timer_interval X] [--timers 3,10,30,100]
+from optparse import OptionParser
+from benchmarks.bench_utils import GOLDEN_TESTS, config_options, make_options, run_quiet, print_table
+
+RUNS = (
+    ("fixed", {}),
+    ("adaptive", {"adaptive_rto": True}),
+    ("reset on ACK", {"adaptive_rto": True, "rto_reset_on_ack": True}),
+)
+
+
+def retransmissions(simulator):
+    return simulator.A.retransmissions + simulator.B.retransmissions
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--scale", type="int", default=1, help="Multiply num_pkts of every config by this")
+    op.add_option("--timer_interval", type="float", help="Use this timer interval instead of each config's")
+    op.add_option("--timers", default="3,10,30,100", help="Fixed timer intervals to try over the modelled link")
+    op.add_option("--seeds", type="int", default=5, help="Average the modelled link runs over this many seeds")
+    args, _ = op.parse_args()
+
+    rows = []
+    totals = [0] * len(RUNS)
+    for test in GOLDEN_TESTS:
+        overrides = {"num_pkts": config_options(test).num_pkts * args.scale}
+        if args.timer_interval:
+            overrides["timer_interval"] = args.timer_interval
+        results = []
+        for name, extra in RUNS:
+            simulator, events, elapsed = run_quiet(config_options(test, **dict(overrides, **extra)))
+            assert simulator.B.data_received == simulator.A.data_sent, "%s lost or reordered data" % test
+            assert simulator.A.data_received == simulator.B.data_sent, "%s lost or reordered data" % test
+            results.append(simulator)
+        for i, simulator in enumerate(results):
+            totals[i] += retransmissions(simulator)
+        rows.append((test,) + tuple(retransmissions(s) for s in results) +
+                    tuple("%.1f" % s.last_delivery for s in results))
+
+    rows.append(("total",) + tuple(totals) + ("",) * len(RUNS))
+    print_table(["config"] + ["%s resent" % name for name, _ in RUNS] + ["%s done at" % name for name, _ in RUNS], rows)
+
+    # A link with a propagation delay of 4 each way, so the round trip is a little over 8
+    print()
+    rows = []
+    for timer_interval in [float(t) for t in args.timers.split(",")]:
+        resent = [0] * len(RUNS)
+        done_at = [0.0] * len(RUNS)
+        for seed in range(1, args.seeds + 1):
+            for i, (name, extra) in enumerate(RUNS):
+                options = make_options(num_pkts=300 * args.scale, arrival_rate=0.5, timer_interval=timer_interval,
+                                       loss_prob=0.05, corrupt_prob=0.05, seed=seed, prop_delay=4, trace_level="off",
+                                       **extra)
+                simulator, events, elapsed = run_quiet(options)
+                assert simulator.B.data_received == simulator.A.data_sent, "link run lost or reordered data"
+                resent[i] += retransmissions(simulator)
+                done_at[i] += simulator.last_delivery
+        rows.append((timer_interval,) + tuple("%.0f" % (r / args.seeds) for r in resent) +
+                    tuple("%.1f" % (d / args.seeds) for d in done_at))
+    print_table(["link timer"] + ["%s resent" % name for name, _ in RUNS] + ["%s done at" % name for name, _ in RUNS], rows)
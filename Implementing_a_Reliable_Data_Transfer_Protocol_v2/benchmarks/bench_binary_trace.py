@@ -0,0 +1,60 @@
+# Compares the text log (--trace_level full --trace_file) with the binary trace
+# (--record_trace) on one golden config: how much each slows the simulation down, how big the
+# files are and how long it takes to read them back. Then replays the binary trace through
+# GBNHost and times that against running the simulation again.
+#
+#   python -m benchmarks.bench_binary_trace [--test Test12_FastDataRate_10Loss_10Corruption] [--scale 100]
+import os, time, tempfile
+from optparse import OptionParser
+from benchmarks.bench_utils import config_options, run_quiet, print_table
+from binary_trace import TraceReader, TO_NETWORK
+from trace_replay import replay
+
+
+def file_size(*paths):
+    return sum(os.path.getsize(p) for p in paths)
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--test", default="Test12_FastDataRate_10Loss_10Corruption")
+    op.add_option("--scale", type="int", default=100, help="Multiply num_pkts of the config by this")
+    args, _ = op.parse_args()
+
+    num_pkts = config_options(args.test).num_pkts * args.scale
+    directory = tempfile.mkdtemp()
+    text_path = os.path.join(directory, "trace.log")
+    binary_path = os.path.join(directory, "trace.bin")
+
+    plain, _, plain_time = run_quiet(config_options(args.test, num_pkts=num_pkts, keep_events=0))
+    text, _, text_time = run_quiet(config_options(args.test, num_pkts=num_pkts, keep_events=0,
+                                                  trace_level="full", trace_file=text_path))
+    binary, _, binary_time = run_quiet(config_options(args.test, num_pkts=num_pkts, keep_events=0,
+                                                      record_trace=binary_path))
+
+    start = time.perf_counter()
+    with open(text_path) as fp:
+        text_sends = sum(1 for line in fp if "Passing to Network Layer" in line)
+    text_read = time.perf_counter() - start
+
+    # The same query on both: how many packets were put on the network
+    start = time.perf_counter()
+    with TraceReader(binary_path) as reader:
+        records = len(reader)
+        binary_sends = sum(1 for record in reader.raw_records() if record[2] == TO_NETWORK)
+    binary_read = time.perf_counter() - start
+    assert binary_sends == text_sends == binary.ntolayer3
+
+    start = time.perf_counter()
+    replayed = replay(binary_path)
+    replay_time = time.perf_counter() - start
+    assert replayed.mismatches == 0 and replayed.missing == 0, "replay differs from the trace"
+    assert replayed.B.data_received == binary.B.data_received
+
+    print("%s x%i: %i events, %i records" % (args.test, args.scale, plain.nprocessed, records))
+    print_table(["run", "wall s", "file KiB", "read s"], [
+        ("no trace", "%.2f" % plain_time, "", ""),
+        ("text log (full)", "%.2f" % text_time, "%.0f" % (file_size(text_path) / 1024), "%.3f" % text_read),
+        ("binary trace", "%.2f" % binary_time, "%.0f" % (file_size(binary_path, binary_path + ".payload") / 1024), "%.3f" % binary_read),
+        ("replay of binary trace", "%.2f" % replay_time, "", ""),
+    ])
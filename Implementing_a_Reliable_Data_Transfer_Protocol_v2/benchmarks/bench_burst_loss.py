@@ -0,0 +1,56 @@
+# Measures how throughput holds up when the same share of packets is lost in bursts. The
+# first row is the Bernoulli channel, the rest use the Gilbert-Elliott channel with the same
+# average loss rate and a growing mean burst length. Both hosts always have data waiting,
+# so throughput is limited only by the window and by recovery. Packets cross a modelled link
+# (see link_model.py), which keeps them in order: the default random delay reorders them so
+# often that Go-Back-N is busy recovering from that, and the loss model hardly shows.
+# Throughput is the number of messages delivered per unit of simulated time, counting both
+# directions.
+#
+#   python -m benchmarks.bench_burst_loss [--num_pkts 2000] [--loss_prob 0.1] [--bursts 1,2,4,8] [--host sr]
+from optparse import OptionParser
+from benchmarks.bench_utils import make_options, run_quiet, print_table
+from gbn_host import GBNHost
+from sr_host import SRHost
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--num_pkts", type="int", default=2000)
+    op.add_option("--loss_prob", type="float", default=0.1)
+    op.add_option("--bursts", default="1,2,4,8,16,32")
+    op.add_option("--bad_loss", type="float", default=1.0)
+    op.add_option("--window_size", type="int", default=8)
+    op.add_option("--timer_interval", type="float", default=10.0)
+    op.add_option("--bandwidth", type="float", default=50.0)
+    op.add_option("--prop_delay", type="float", default=2.0)
+    op.add_option("--seeds", type="int", default=5, help="Average every row over this many seeds")
+    op.add_option("--host", type="choice", choices=["gbn", "sr"], default="gbn")
+    args, _ = op.parse_args()
+
+    rows = []
+    baseline = None
+    for burst_len in [None] + [float(b) for b in args.bursts.split(",")]:
+        delivered = done_at = packets = lost = resent = 0
+        for seed in range(1, args.seeds + 1):
+            options = make_options(num_pkts=args.num_pkts, arrival_rate=0.001, timer_interval=args.timer_interval,
+                                   loss_prob=args.loss_prob, corrupt_prob=0.0, seed=seed, window_size=args.window_size,
+                                   bandwidth=args.bandwidth, prop_delay=args.prop_delay,
+                                   channel="bernoulli" if burst_len is None else "gilbert", burst_len=burst_len,
+                                   bad_loss=args.bad_loss, trace_level="off")
+            simulator, events, elapsed = run_quiet(options, GBNHost if args.host == "gbn" else SRHost)
+            assert simulator.B.data_received == simulator.A.data_sent, "burst length %s lost or reordered data" % burst_len
+            delivered += len(simulator.A.data_received) + len(simulator.B.data_received)
+            done_at += simulator.last_delivery
+            packets += simulator.ntolayer3
+            lost += simulator.nlost
+            resent += simulator.A.retransmissions + simulator.B.retransmissions
+
+        throughput = delivered / done_at
+        if baseline is None:
+            baseline = throughput
+        rows.append(("bernoulli" if burst_len is None else "%g" % burst_len, "%.1f%%" % (100.0 * lost / packets),
+                     "%.2f" % throughput, "%.0f%%" % (100.0 * throughput / baseline),
+                     "%.2f" % (packets / delivered), "%.2f" % (resent / delivered)))
+
+    print_table(["burst len", "loss", "msgs/time", "vs bernoulli", "pkts per msg", "resends per msg"], rows)
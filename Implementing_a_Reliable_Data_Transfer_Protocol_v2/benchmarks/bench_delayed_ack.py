@@ -0,0 +1,42 @@
+# Runs every golden test config with an ACK for every packet and with delayed ACKs, and
+# compares the ACKs sent (num_ack_sent of both hosts), all packets put on the network
+# (ntolayer3) and when the last data was delivered. Both runs must deliver exactly the data
+# that was sent, in order.
+#
+#   python -m benchmarks.bench_delayed_ack [--scale 10] [--ack_every 2] [--ack_delay X]
+from optparse import OptionParser
+from benchmarks.bench_utils import GOLDEN_TESTS, config_options, run_quiet, print_table
+
+
+def acks_sent(simulator):
+    return simulator.A.num_ack_sent + simulator.B.num_ack_sent
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--scale", type="int", default=1, help="Multiply num_pkts of every config by this")
+    op.add_option("--ack_every", type="int", default=2)
+    op.add_option("--ack_delay", type="float", help="Defaults to a quarter of each config's timer interval")
+    args, _ = op.parse_args()
+
+    rows = []
+    totals = [0, 0, 0, 0]
+    for test in GOLDEN_TESTS:
+        num_pkts = config_options(test).num_pkts * args.scale
+        every, _, _ = run_quiet(config_options(test, num_pkts=num_pkts))
+        delayed, _, _ = run_quiet(config_options(test, num_pkts=num_pkts, ack_every=args.ack_every, ack_delay=args.ack_delay))
+        for simulator in (every, delayed):
+            assert simulator.B.data_received == simulator.A.data_sent, "%s lost or reordered data" % test
+            assert simulator.A.data_received == simulator.B.data_sent, "%s lost or reordered data" % test
+        coalesced = delayed.A.acks_coalesced + delayed.B.acks_coalesced
+        totals[0] += acks_sent(every)
+        totals[1] += acks_sent(delayed)
+        totals[2] += every.ntolayer3
+        totals[3] += delayed.ntolayer3
+        rows.append((test, acks_sent(every), acks_sent(delayed), coalesced, every.ntolayer3, delayed.ntolayer3,
+                     "%.1f" % every.last_delivery, "%.1f" % delayed.last_delivery))
+
+    rows.append(("total", totals[0], totals[1], "", totals[2], totals[3], "", ""))
+    print_table(["config", "ACKs", "delayed ACKs", "coalesced", "ntolayer3", "delayed ntolayer3", "done at", "delayed done at"], rows)
+    print("ACKs saved: %.0f%%, packets saved: %.0f%%" % (100.0 * (totals[0] - totals[1]) / totals[0],
+                                                        100.0 * (totals[2] - totals[3]) / totals[2]))
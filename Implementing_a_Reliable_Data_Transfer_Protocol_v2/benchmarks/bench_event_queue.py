@@ -0,0 +1,94 @@
+# Measures how many simulated events per second the simulator processes as the number of
+# packets grows. "before" swaps back in the event queue the simulator used to have: a list
+# kept sorted by a linear insert, events taken off the front with pop(0), and timers found
+# and removed by scanning the list. "after" is the heap based queue the simulator has now.
+# Both runs must process the same events and deliver the same data. The table also shows
+# the most events that were ever pending at once, since that is what each insert and timer
+# scan of the old queue costs.
+#
+#   python -m benchmarks.bench_event_queue [--sizes 1000,100000,1000000]
+import sys
+from optparse import OptionParser
+from benchmarks.bench_utils import make_options, run_quiet, print_table
+from network_simulator import NetworkSimulator, SimulatedEvent, EventType
+
+
+class ListQueueSimulator(NetworkSimulator):
+    max_pending = 0
+
+    def insert_event(self, new_event):
+        event_list = self.event_list
+        if len(event_list) >= self.max_pending:
+            self.max_pending = len(event_list) + 1
+        if len(event_list) == 0:
+            event_list.append(new_event)
+        elif new_event.evtime < event_list[0].evtime:
+            event_list.insert(0, new_event)
+        elif new_event.evtime > event_list[-1].evtime:
+            event_list.append(new_event)
+        else:
+            for idx, e in enumerate(event_list):
+                if new_event.evtime < e.evtime:
+                    event_list.insert(idx, new_event)
+                    break
+            else:
+                event_list.append(new_event)
+
+    def start_timer(self, entity, increment):
+        for e in self.event_list:
+            if e.evtype == EventType.TIMER_INTERRUPT and e.eventity == entity:
+                return
+        self.insert_event(SimulatedEvent(self.time + increment, EventType.TIMER_INTERRUPT, entity))
+
+    def stop_timer(self, entity):
+        for idx, e in enumerate(self.event_list):
+            if e.evtype == EventType.TIMER_INTERRUPT and e.eventity == entity:
+                self.event_list.pop(idx)
+                return
+
+    # Only full runs are needed here, so until_time and max_events aren't supported
+    def run(self, until_time=None, max_events=None):
+        event_list = self.event_list
+        handlers = self.handlers
+        events = self.events
+        while self.continue_simulation:
+            if len(event_list) == 0:
+                self.continue_simulation = False
+                self.trace_sink.close()
+                break
+            cur_event = event_list.pop(0)
+            if cur_event.cancelled:
+                continue
+            if events is not None:
+                events.append(cur_event)
+            self.nprocessed += 1
+            self.time = cur_event.evtime
+            handlers[cur_event.evtype](cur_event)
+        return self.nprocessed
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--sizes", default="1000,100000,1000000")
+    op.add_option("--arrival_rate", type="float", default=2)
+    op.add_option("--loss_prob", type="float", default=0.1)
+    op.add_option("--corrupt_prob", type="float", default=0.1)
+    op.add_option("--trace_level", default="off")
+    op.add_option("--keep_events", type="int", default=0)
+    args, _ = op.parse_args()
+
+    rows = []
+    for num_pkts in [int(x) for x in args.sizes.split(",")]:
+        options = make_options(num_pkts=num_pkts, arrival_rate=args.arrival_rate, timer_interval=3,
+                               loss_prob=args.loss_prob, corrupt_prob=args.corrupt_prob, seed=1234,
+                               trace_level=args.trace_level, keep_events=args.keep_events)
+        before, _, before_elapsed = run_quiet(options, simulator_class=ListQueueSimulator)
+        after, _, after_elapsed = run_quiet(options)
+        assert before.nprocessed == after.nprocessed, "the two queues processed different events"
+        assert before.B.data_received == after.B.data_received, "the two queues delivered different data"
+        before_rate = before.nprocessed / before_elapsed
+        after_rate = after.nprocessed / after_elapsed
+        rows.append((num_pkts, after.nprocessed, before.max_pending, "%.0f" % before_rate, "%.0f" % after_rate, "%.2fx" % (after_rate / before_rate)))
+        sys.stdout.flush()
+
+    print_table(["num_pkts", "events", "max pending", "before events/sec", "after events/sec", "speedup"], rows)
@@ -0,0 +1,42 @@
+# Runs the golden test configs that lose packets (10% and 25% loss) with and without
+# --fast_retransmit and compares how the senders recovered: timeouts, fast retransmits,
+# stall time (how long the senders waited before resending, see GBNHost) and when the last
+# data was delivered. Both runs must deliver exactly the data that was sent, in order.
+#
+#   python -m benchmarks.bench_fast_retransmit [--scale 10] [--window_size 8]
+from optparse import OptionParser
+from benchmarks.bench_utils import GOLDEN_TESTS, config_options, run_quiet, print_table
+
+
+def total(simulator, name):
+    return getattr(simulator.A, name) + getattr(simulator.B, name)
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--scale", type="int", default=1, help="Multiply num_pkts of every config by this")
+    op.add_option("--window_size", type="int", default=5)
+    args, _ = op.parse_args()
+
+    rows = []
+    stalls = [0.0, 0.0]
+    for test in GOLDEN_TESTS:
+        if config_options(test).loss_prob == 0:
+            continue
+        num_pkts = config_options(test).num_pkts * args.scale
+        results = []
+        for fast in (False, True):
+            simulator, _, _ = run_quiet(config_options(test, num_pkts=num_pkts, window_size=args.window_size, fast_retransmit=fast))
+            assert simulator.B.data_received == simulator.A.data_sent, "%s lost or reordered data" % test
+            assert simulator.A.data_received == simulator.B.data_sent, "%s lost or reordered data" % test
+            results.append(simulator)
+        slow, fast = results
+        stalls[0] += total(slow, "stall_time")
+        stalls[1] += total(fast, "stall_time")
+        rows.append((test, total(slow, "timeouts"), total(fast, "timeouts"), total(fast, "fast_retransmits"),
+                     "%.1f" % total(slow, "stall_time"), "%.1f" % total(fast, "stall_time"),
+                     slow.ntolayer3, fast.ntolayer3, "%.1f" % slow.last_delivery, "%.1f" % fast.last_delivery))
+
+    print_table(["config", "timeouts", "FR timeouts", "fast rexmits", "stall", "FR stall",
+                 "ntolayer3", "FR ntolayer3", "done at", "FR done at"], rows)
+    print("stall time removed: %.0f%%" % (100.0 * (stalls[0] - stalls[1]) / stalls[0]))
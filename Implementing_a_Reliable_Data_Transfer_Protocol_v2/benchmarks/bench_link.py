@@ -0,0 +1,47 @@
+# Measures goodput and link utilization over a modelled link (see link_model.py) as the
+# window grows. Both hosts always have data waiting, so the window is what holds a sender
+# back until it covers the bandwidth-delay product. The table shows the BDP in packets of
+# the average size next to each window, so it can be seen where goodput stops growing and
+# the queue takes over. The link also carries the ACKs for the other direction, so the
+# window that fills it is a little smaller than the BDP. A window larger than the queue
+# overflows it with its first burst. Goodput and utilization are for the A to B direction.
+#
+#   python -m benchmarks.bench_link [--num_pkts 2000] [--bandwidth 50] [--prop_delay 5] [--queue_size 48] [--windows 1,2,4,8]
+from optparse import OptionParser
+from benchmarks.bench_utils import make_options, run_quiet, print_table
+from link_model import link_report
+from gbn_host import GBNHost
+from sr_host import SRHost
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--num_pkts", type="int", default=2000)
+    op.add_option("--windows", default="1,2,4,8,16,24,32,48,64")
+    op.add_option("--bandwidth", type="float", default=50.0)
+    op.add_option("--prop_delay", type="float", default=5.0)
+    op.add_option("--queue_size", type="int", default=48)
+    op.add_option("--loss_prob", type="float", default=0.0)
+    op.add_option("--timer_interval", type="float", default=30.0)
+    op.add_option("--seed", type="int", default=1)
+    op.add_option("--host", type="choice", choices=["gbn", "sr"], default="gbn")
+    args, _ = op.parse_args()
+
+    rows = []
+    for window_size in [int(w) for w in args.windows.split(",")]:
+        options = make_options(num_pkts=args.num_pkts, arrival_rate=0.001, timer_interval=args.timer_interval,
+                               loss_prob=args.loss_prob, corrupt_prob=0.0, seed=args.seed, window_size=window_size,
+                               bandwidth=args.bandwidth, prop_delay=args.prop_delay, queue_size=args.queue_size,
+                               trace_level="off")
+        simulator, events, elapsed = run_quiet(options, GBNHost if args.host == "gbn" else SRHost)
+        assert simulator.B.data_received == simulator.A.data_sent, "window %i lost or reordered data" % window_size
+
+        a_to_b = link_report(simulator)["A"]
+        link = simulator.links[0]
+        # A data packet goes out and its ACK comes back before the window can move
+        rtt = 2 * args.prop_delay + (link.bytes_sent / link.packets_sent) / args.bandwidth
+        bdp = args.bandwidth * rtt / (link.bytes_sent / link.packets_sent)
+        rows.append((window_size, "%.1f" % bdp, "%.2f" % a_to_b["goodput"], "%.1f%%" % (100.0 * a_to_b["utilization"]),
+                     a_to_b["queue_drops"], a_to_b["max_queue"], simulator.ntolayer3, "%.1f" % elapsed))
+
+    print_table(["window", "BDP pkts", "goodput", "utilization", "queue drops", "max queue", "ntolayer3", "wall s"], rows)
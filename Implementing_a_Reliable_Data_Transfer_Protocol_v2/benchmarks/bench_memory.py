@@ -0,0 +1,56 @@
+# Reports the peak memory traced by tracemalloc for a full run that keeps every processed
+# event, as Simulate() does by default. "before" swaps in an event class like the one the
+# simulator used to have (a per-instance __dict__ plus the unused previous_event/next_event
+# fields), "after" is the simulator as it is now.
+#
+#   python -m benchmarks.bench_memory [--num_pkts 1000000]
+#
+# At the default 1,000,000 packets (6,666,476 events, about 15 minutes under tracemalloc):
+#
+#      run  processed  peak MiB  bytes/event
+#   before    6666476    1306.8          206
+#    after    6666476     900.0          142
+import tracemalloc
+from optparse import OptionParser
+from benchmarks.bench_utils import make_options, run_quiet, print_table
+import network_simulator
+
+
+class DictSimulatedEvent():
+    def __init__(self, evtime=0, evtype=None, eventity=None, pkt=None):
+        self.evtime = evtime
+        self.evtype = evtype
+        self.eventity = eventity
+        self.pkt = pkt
+        self.cancelled = False
+        self.previous_event = None
+        self.next_event = None
+
+
+def peak_memory(options, event_class):
+    original = network_simulator.SimulatedEvent
+    network_simulator.SimulatedEvent = event_class
+    try:
+        tracemalloc.start()
+        simulator, events, elapsed = run_quiet(options)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    finally:
+        network_simulator.SimulatedEvent = original
+    return simulator.nprocessed, peak
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--num_pkts", type="int", default=1000000)
+    args, _ = op.parse_args()
+
+    options = make_options(num_pkts=args.num_pkts, arrival_rate=2, timer_interval=3, loss_prob=0.1,
+                           corrupt_prob=0.1, seed=1234, trace_level="off")
+
+    rows = []
+    for name, event_class in (("before", DictSimulatedEvent), ("after", network_simulator.SimulatedEvent)):
+        events, peak = peak_memory(options, event_class)
+        rows.append((name, events, "%.1f" % (peak / 2**20), "%.0f" % (peak / events)))
+
+    print_table(["run", "processed", "peak MiB", "bytes/event"], rows)
@@ -0,0 +1,50 @@
+# Measures throughput against the maximum segment size for multi-megabyte messages. The
+# messages are random bytes of up to --payload_size bytes, segmented with --mss and sent
+# over a modelled link (see link_model.py) with a short propagation delay, so the window
+# always covers the round trip and the link is the bottleneck. Every segment pays for a
+# 12 byte header, and for a 12 byte ACK going the other way, so of all the bytes the links
+# carry at most mss / (mss + 24) can be application data. The table shows that bound next to
+# the share that was measured, the goodput (application bytes delivered per unit of time,
+# both directions) and the wall clock cost of simulating all those packets. Every run sends
+# the same messages (the random streams are kept apart) and must deliver exactly the data
+# that was sent.
+#
+#   python -m benchmarks.bench_mss [--num_pkts 6] [--payload_size 4000000] [--mss 64,536,1460,8192] [--loss_prob 0.01]
+from optparse import OptionParser
+from benchmarks.bench_utils import make_options, run_quiet, print_table
+from gbn_packet import HEADER_SIZE
+from link_model import link_report
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--num_pkts", type="int", default=6, help="The number of messages")
+    op.add_option("--payload_size", type="int", default=4000000)
+    op.add_option("--mss", default="64,128,256,536,1460,4096,8192,16384")
+    op.add_option("--bandwidth", type="float", default=1000000.0)
+    op.add_option("--prop_delay", type="float", default=0.001)
+    op.add_option("--window_size", type="int", default=64)
+    op.add_option("--timer_interval", type="float", default=5.0)
+    op.add_option("--loss_prob", type="float", default=0.0)
+    op.add_option("--seed", type="int", default=1)
+    args, _ = op.parse_args()
+
+    rows = []
+    for mss in [int(m) for m in args.mss.split(",")]:
+        options = make_options(num_pkts=args.num_pkts, arrival_rate=0.001, timer_interval=args.timer_interval,
+                               loss_prob=args.loss_prob, corrupt_prob=0.0, seed=args.seed, window_size=args.window_size,
+                               binary_payloads=True, payload_size=args.payload_size, mss=mss, bandwidth=args.bandwidth,
+                               prop_delay=args.prop_delay, rng_substreams=True, trace_level="off", keep_events=0)
+        simulator, events, elapsed = run_quiet(options)
+        assert simulator.B.data_received == simulator.A.data_sent, "mss %i lost or reordered data" % mss
+        assert simulator.A.data_received == simulator.B.data_sent, "mss %i lost or reordered data" % mss
+
+        report = link_report(simulator)
+        goodput = report["A"]["goodput"] + report["B"]["goodput"]
+        delivered = sum(len(d) for d in simulator.A.data_received) + sum(len(d) for d in simulator.B.data_received)
+        carried = report["A"]["bytes"] + report["B"]["bytes"]
+        rows.append((mss, simulator.ntolayer3, "%.1f" % (delivered / 1024.0 / 1024.0), "%.0f" % goodput,
+                     "%.1f%%" % (100.0 * delivered / carried), "%.1f%%" % (100.0 * mss / (mss + 2 * HEADER_SIZE)),
+                     "%.2f" % elapsed, "%.1f" % (delivered / elapsed / 1024.0 / 1024.0)))
+
+    print_table(["mss", "packets", "MiB delivered", "goodput", "efficiency", "bound", "wall s", "MiB/s wall"], rows)
@@ -0,0 +1,35 @@
+# Measures how many bytes of binary application data the simulator delivers per second of
+# wall clock time, for a range of message sizes up to 64 KB. The data goes through the
+# hosts as bytes and is only copied when it is delivered. Every run must deliver exactly
+# the data that was sent, in order.
+#
+#   python -m benchmarks.bench_payload [--num_pkts 2000] [--sizes 64,1024,65536] [--loss_prob 0.1] [--host sr]
+from optparse import OptionParser
+from benchmarks.bench_utils import make_options, run_quiet, print_table
+from gbn_host import GBNHost
+from sr_host import SRHost
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--num_pkts", type="int", default=2000)
+    op.add_option("--sizes", default="16,256,1024,4096,16384,65536")
+    op.add_option("--loss_prob", type="float", default=0.0)
+    op.add_option("--corrupt_prob", type="float", default=0.0)
+    op.add_option("--seed", type="int", default=1)
+    op.add_option("--host", type="choice", choices=["gbn", "sr"], default="gbn")
+    args, _ = op.parse_args()
+
+    rows = []
+    for size in [int(s) for s in args.sizes.split(",")]:
+        options = make_options(num_pkts=args.num_pkts, arrival_rate=2, timer_interval=20, loss_prob=args.loss_prob,
+                               corrupt_prob=args.corrupt_prob, seed=args.seed, binary_payloads=True, payload_size=size,
+                               trace_level="off", keep_events=0)
+        simulator, events, elapsed = run_quiet(options, GBNHost if args.host == "gbn" else SRHost)
+        assert simulator.B.data_received == simulator.A.data_sent, "%i byte payloads lost or reordered" % size
+        assert simulator.A.data_received == simulator.B.data_sent, "%i byte payloads lost or reordered" % size
+        delivered = sum(len(d) for d in simulator.A.data_received) + sum(len(d) for d in simulator.B.data_received)
+        rows.append((size, simulator.nsim, "%.1f" % (delivered / 1024.0 / 1024.0), "%.3f" % elapsed,
+                     "%.1f" % (delivered / elapsed / 1024.0 / 1024.0), "%.0f" % (simulator.nsim / elapsed)))
+
+    print_table(["max size", "msgs", "MiB delivered", "wall s", "MiB/s", "msgs/s"], rows)
@@ -0,0 +1,57 @@
+# Runs every golden test config three ways: with an ACK packet for every data packet, with
+# delayed ACKs only (held back for --ack_delay, for any number of packets) and with ACKs
+# piggybacked on data going the other way, which holds them back for the same time. Most of
+# what piggybacking saves over an ACK per packet comes from holding ACKs back and merging
+# them, so its own gain is measured against the delayed ACK run. The table compares the
+# ACK-only packets sent (num_ack_sent of both hosts), all packets put on the network
+# (ntolayer3) and when the last data was delivered. Every run must deliver exactly the data
+# that was sent, in order.
+#
+#   python -m benchmarks.bench_piggyback [--scale 10] [--ack_delay X]
+from optparse import OptionParser
+from benchmarks.bench_utils import GOLDEN_TESTS, config_options, run_quiet, print_table
+
+# An --ack_every no run reaches, so only the ACK timer sends a held back ACK
+UNBOUNDED = 2 ** 31 - 1
+
+
+def acks_sent(simulator):
+    return simulator.A.num_ack_sent + simulator.B.num_ack_sent
+
+
+def saved(before, after):
+    return "%.0f%%" % (100.0 * (before - after) / before)
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--scale", type="int", default=1, help="Multiply num_pkts of every config by this")
+    op.add_option("--ack_delay", type="float", help="How long an ACK waits for data. Defaults to a quarter of each config's timer interval")
+    args, _ = op.parse_args()
+
+    rows = []
+    acks = [0, 0, 0]
+    packets = [0, 0, 0]
+    for test in GOLDEN_TESTS:
+        num_pkts = config_options(test).num_pkts * args.scale
+        every, _, _ = run_quiet(config_options(test, num_pkts=num_pkts))
+        delayed, _, _ = run_quiet(config_options(test, num_pkts=num_pkts, ack_every=UNBOUNDED, ack_delay=args.ack_delay))
+        piggyback, _, _ = run_quiet(config_options(test, num_pkts=num_pkts, piggyback=True, ack_delay=args.ack_delay))
+        runs = (every, delayed, piggyback)
+        for i, simulator in enumerate(runs):
+            assert simulator.B.data_received == simulator.A.data_sent, "%s lost or reordered data" % test
+            assert simulator.A.data_received == simulator.B.data_sent, "%s lost or reordered data" % test
+            acks[i] += acks_sent(simulator)
+            packets[i] += simulator.ntolayer3
+        carried = piggyback.A.acks_piggybacked + piggyback.B.acks_piggybacked
+        rows.append((test,) + tuple(acks_sent(s) for s in runs) + (carried,) + tuple(s.ntolayer3 for s in runs) +
+                    tuple("%.1f" % s.last_delivery for s in runs))
+
+    rows.append(("total",) + tuple(acks) + ("",) + tuple(packets) + ("", "", ""))
+    print_table(["config", "ACKs", "delayed ACKs", "piggyback ACKs", "piggybacked",
+                 "ntolayer3", "delayed ntolayer3", "piggyback ntolayer3",
+                 "done at", "delayed done at", "piggyback done at"], rows)
+    print("Delayed ACKs vs an ACK per packet: ACK packets saved %s, packets saved %s" %
+          (saved(acks[0], acks[1]), saved(packets[0], packets[1])))
+    print("Piggybacking vs delayed ACKs: ACK packets saved %s, packets saved %s" %
+          (saved(acks[1], acks[2]), saved(packets[1], packets[2])))
@@ -0,0 +1,147 @@
+# Performance regression suite. Runs every golden test config under tests/test_cases as it
+# is and scaled up (num_pkts x10, x100, x1000), with tracing off, and records for each run:
+#
+#   wall_s          the best wall clock time of --repeat runs
+#   events_per_s    events processed per second in that run
+#   peak_kib        peak memory allocated during the run (tracemalloc, in a separate run)
+#   hotspots        the functions with the most time of their own (cProfile, separate run,
+#                   only at the largest scale)
+#
+# The results can be saved as a JSON baseline, and later results compared against one. Any
+# run that is slower, processes fewer events per second or uses more memory than the
+# baseline by more than --threshold is flagged, and the script exits with status 1. Runs
+# shorter than --min_time in the baseline are too noisy to time, so only their memory is
+# compared.
+#
+#   python -m benchmarks.bench_regression --save baseline.json
+#   python -m benchmarks.bench_regression --compare baseline.json [--threshold 0.2]
+#   python -m benchmarks.bench_regression --tests Test12_FastDataRate_10Loss_10Corruption --scales 1,100
+#
+# Everything runs in this process from the configs in the repository, so it works offline.
+# Timings from different machines can't be compared, so save a baseline on the machine that
+# will do the comparing.
+import cProfile, gc, json, os, platform, pstats, sys, time, tracemalloc
+from optparse import OptionParser
+from benchmarks.bench_utils import GOLDEN_TESTS, config_options, run_quiet, print_table
+
+# The metrics compared against a baseline, and whether a bigger value is worse
+METRICS = [("wall_s", True), ("events_per_s", False), ("peak_kib", True)]
+
+
+def measure(test, scale, repeat, profile, hotspots):
+    options = config_options(test, num_pkts=config_options(test).num_pkts * scale, keep_events=0)
+
+    best = None
+    for i in range(repeat):
+        gc.collect()
+        simulator, _, elapsed = run_quiet(options)
+        if best is None or elapsed < best:
+            best = elapsed
+    result = {
+        "test": test,
+        "scale": scale,
+        "events": simulator.nprocessed,
+        "wall_s": best,
+        "events_per_s": simulator.nprocessed / best if best else 0.0,
+    }
+
+    gc.collect()
+    tracemalloc.start()
+    run_quiet(options)
+    result["peak_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+    tracemalloc.stop()
+
+    if profile:
+        profiler = cProfile.Profile()
+        profiler.runcall(run_quiet, options)
+        result["hotspots"] = top_functions(profiler, hotspots)
+    return result
+
+
+# The functions that spent the most time in their own code, as "file:line(function)" with
+# that time and the share of the whole run
+def top_functions(profiler, count):
+    stats = pstats.Stats(profiler).stats
+    total = sum(tt for _, _, tt, _, _ in stats.values()) or 1.0
+    ranked = sorted(stats.items(), key=lambda item: item[1][2], reverse=True)[:count]
+    return [{"function": "%s:%i(%s)" % (os.path.basename(filename), line, name),
+             "calls": nc, "self_s": tt, "share": tt / total}
+            for (filename, line, name), (cc, nc, tt, ct, callers) in ranked]
+
+
+# The runs in results that got worse than the same run in baseline by more than threshold,
+# as (key, metric, baseline value, new value) tuples
+def find_regressions(baseline, results, threshold, min_time=0.0):
+    before = {"%s x%i" % (r["test"], r["scale"]): r for r in baseline["runs"]}
+    regressions = []
+    for r in results["runs"]:
+        key = "%s x%i" % (r["test"], r["scale"])
+        if key not in before:
+            continue
+        for metric, bigger_is_worse in METRICS:
+            if metric != "peak_kib" and before[key]["wall_s"] < min_time:
+                continue
+            old, new = before[key][metric], r[metric]
+            if old <= 0:
+                continue
+            change = (new - old) / old
+            if (change > threshold) if bigger_is_worse else (change < -threshold):
+                regressions.append((key, metric, old, new))
+    return regressions
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--tests", help="Comma separated config names (default: all 12)")
+    op.add_option("--scales", default="1,10,100,1000", help="Comma separated num_pkts multipliers")
+    op.add_option("--repeat", type="int", default=3, help="Timed runs per config, the best one counts")
+    op.add_option("--hotspots", type="int", default=8, help="Functions to list per profile")
+    op.add_option("--save", metavar="FILE", help="Write the results to FILE as a baseline")
+    op.add_option("--compare", metavar="FILE", help="Flag regressions against the baseline in FILE")
+    op.add_option("--threshold", type="float", default=0.2, help="Allowed change before a regression is flagged")
+    op.add_option("--min_time", type="float", default=0.05, help="Don't compare the timings of runs shorter than this")
+    args, _ = op.parse_args()
+
+    tests = args.tests.split(",") if args.tests else GOLDEN_TESTS
+    scales = [int(s) for s in args.scales.split(",")]
+
+    results = {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "runs": [],
+    }
+    rows = []
+    for test in tests:
+        for scale in scales:
+            r = measure(test, scale, args.repeat, scale == max(scales), args.hotspots)
+            results["runs"].append(r)
+            rows.append((test, scale, r["events"], "%.4f" % r["wall_s"], "%.0f" % r["events_per_s"], "%.0f" % r["peak_kib"]))
+            print("%s x%i done" % (test, scale), file=sys.stderr)
+    print_table(["config", "scale", "events", "wall s", "events/s", "peak KiB"], rows)
+
+    # Hotspots of the whole suite: self time added up over the profiled runs
+    combined = {}
+    for r in results["runs"]:
+        for h in r.get("hotspots", []):
+            combined[h["function"]] = combined.get(h["function"], 0.0) + h["self_s"]
+    if combined:
+        print("\nhotspots at x%i (self time over all configs):" % max(scales))
+        for function, seconds in sorted(combined.items(), key=lambda item: item[1], reverse=True)[:args.hotspots]:
+            print("  %8.3f s  %s" % (seconds, function))
+
+    if args.save:
+        with open(args.save, "w") as fp:
+            json.dump(results, fp, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)
+        regressions = find_regressions(baseline, results, args.threshold, args.min_time)
+        if regressions:
+            print("\n%i regressions beyond %.0f%%:" % (len(regressions), args.threshold * 100))
+            print_table(["run", "metric", "baseline", "now", "change"],
+                        [(key, metric, "%.4g" % old, "%.4g" % new, "%+.0f%%" % (100.0 * (new - old) / old))
+                         for key, metric, old, new in regressions])
+            sys.exit(1)
+        print("\nno regressions beyond %.0f%% against %s" % (args.threshold * 100, args.compare))
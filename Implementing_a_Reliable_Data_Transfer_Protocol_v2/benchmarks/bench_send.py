@@ -0,0 +1,50 @@
+# Measures how many packets per second pass_to_network_layer accepts, for a range of packet
+# sizes. "before" adds back the copy.deepcopy the simulator used to make of every packet,
+# "after" is the simulator as it is now. deepcopy hands bytes back as they are, so for bytes
+# packets the two differ only by the call, and the rates are the best of --repeat runs
+# taken in turn to keep noise from deciding the result. Packets are built once, outside
+# the timing; bench_codec.py times building them.
+#
+#   python -m benchmarks.bench_send [--count 200000] [--repeat 5]
+import copy, time
+from optparse import OptionParser
+from benchmarks.bench_utils import make_options, print_table
+from gbn_host import GBNHost
+from network_simulator import NetworkSimulator, EventEntity
+
+
+class DeepCopySimulator(NetworkSimulator):
+    def pass_to_network_layer(self, entity, packet, is_ACK = False):
+        NetworkSimulator.pass_to_network_layer(self, entity, copy.deepcopy(packet), is_ACK)
+
+
+def sends_per_second(simulator_class, options, packet, count):
+    simulator = simulator_class(options, GBNHost)
+    start = time.perf_counter()
+    for i in range(count):
+        simulator.pass_to_network_layer(EventEntity.A, packet, False)
+        if len(simulator.event_list) >= 1000:
+            simulator.event_list.clear()
+    return count / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--count", type="int", default=200000)
+    op.add_option("--corrupt_prob", type="float", default=0.1)
+    op.add_option("--repeat", type="int", default=5)
+    args, _ = op.parse_args()
+
+    options = make_options(num_pkts=0, arrival_rate=1, timer_interval=3, loss_prob=0,
+                           corrupt_prob=args.corrupt_prob, seed=1234, trace_level="off")
+
+    rows = []
+    for size in (16, 1024, 65536):
+        packet = GBNHost(None, None, 10, 10).packet_Create(0, b"x" * size)
+        before = after = 0
+        for i in range(args.repeat):
+            before = max(before, sends_per_second(DeepCopySimulator, options, packet, args.count))
+            after = max(after, sends_per_second(NetworkSimulator, options, packet, args.count))
+        rows.append((size, "%.0f" % before, "%.0f" % after, "%.2fx" % (after / before)))
+
+    print_table(["payload bytes", "before pkts/s", "after pkts/s", "speedup"], rows)
@@ -0,0 +1,37 @@
+# Runs every golden test config with GBNHost and with SRHost and compares how many packets
+# each put on the network (ntolayer3) and when the last data was delivered. Both hosts
+# must deliver exactly the data that was sent, in order.
+#
+#   python -m benchmarks.bench_sr_vs_gbn [--scale 10]
+from optparse import OptionParser
+from benchmarks.bench_utils import GOLDEN_TESTS, config_options, run_quiet, print_table
+from gbn_host import GBNHost
+from sr_host import SRHost
+
+
+def delivered_in_order(simulator):
+    return simulator.B.data_received == simulator.A.data_sent and simulator.A.data_received == simulator.B.data_sent
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--scale", type="int", default=1, help="Multiply num_pkts of every config by this")
+    args, _ = op.parse_args()
+
+    rows = []
+    totals = [0, 0]
+    for test in GOLDEN_TESTS:
+        num_pkts = config_options(test).num_pkts * args.scale
+        results = []
+        for host in (GBNHost, SRHost):
+            simulator, events, elapsed = run_quiet(config_options(test, num_pkts=num_pkts), host)
+            assert delivered_in_order(simulator), "%s with %s lost or reordered data" % (test, host.__name__)
+            results.append(simulator)
+        gbn, sr = results
+        totals[0] += gbn.ntolayer3
+        totals[1] += sr.ntolayer3
+        rows.append((test, gbn.ntolayer3, sr.ntolayer3, "%.0f%%" % (100.0 * (gbn.ntolayer3 - sr.ntolayer3) / gbn.ntolayer3),
+                     "%.1f" % gbn.last_delivery, "%.1f" % sr.last_delivery))
+
+    rows.append(("total", totals[0], totals[1], "%.0f%%" % (100.0 * (totals[0] - totals[1]) / totals[0]), "", ""))
+    print_table(["config", "GBN ntolayer3", "SR ntolayer3", "saved", "GBN done at", "SR done at"], rows)
@@ -0,0 +1,68 @@
+# Shows what --stream_check costs on a correct run and what it saves on a broken one.
+#
+# The broken host delivers one message twice, after fail_at deliveries. Checking afterwards
+# means finishing the run and then comparing the data lists; the stream checker stops at the
+# duplicate. The comparison afterwards is done in order here, since the set based one in
+# GBNTester.check_host doesn't notice a duplicate at all.
+#
+#   python -m benchmarks.bench_stream_check [--scale 1000] [--fail_at 1000]
+import time
+from optparse import OptionParser
+from benchmarks.bench_utils import config_options, print_table
+from gbn_host import GBNHost
+from network_simulator import NetworkSimulator
+from stream_checker import StreamChecker, DeliveryError
+
+
+def make_broken_host(fail_at):
+    class DuplicatingHost(GBNHost):
+        def __init__(self, *args):
+            GBNHost.__init__(self, *args)
+            self.delivered = 0
+
+    original = NetworkSimulator.pass_to_application_layer
+
+    class DuplicatingSimulator(NetworkSimulator):
+        def pass_to_application_layer(self, entity, data):
+            original(self, entity, data)
+            host = self.Host[entity]
+            host.delivered += 1
+            if host.delivered == fail_at:
+                original(self, entity, data)
+    return DuplicatingHost, DuplicatingSimulator
+
+
+def run(options, host, simulator_class=NetworkSimulator, checker=None):
+    start = time.perf_counter()
+    simulator = simulator_class(options, host, None, checker)
+    try:
+        simulator.Simulate()
+        if checker:
+            checker.finish(simulator)
+        error = None
+    except DeliveryError as e:
+        error = "event %i: %s" % (simulator.nprocessed, e)
+    if checker is None:
+        ok = simulator.B.data_received == simulator.A.data_sent and simulator.A.data_received == simulator.B.data_sent
+        error = None if ok else "data lists differ"
+    return time.perf_counter() - start, simulator.nprocessed, error
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--test", default="Test12_FastDataRate_10Loss_10Corruption")
+    op.add_option("--scale", type="int", default=1000, help="Multiply num_pkts of the config by this")
+    op.add_option("--fail_at", type="int", default=1000, help="The delivery the broken host repeats")
+    args, _ = op.parse_args()
+
+    options = config_options(args.test, num_pkts=config_options(args.test).num_pkts * args.scale, keep_events=0)
+    broken_host, broken_simulator = make_broken_host(args.fail_at)
+    rows = []
+    for name, host, simulator_class, stream in [
+            ("correct, check after", GBNHost, NetworkSimulator, False),
+            ("correct, stream check", GBNHost, NetworkSimulator, True),
+            ("broken, check after", broken_host, broken_simulator, False),
+            ("broken, stream check", broken_host, broken_simulator, True)]:
+        elapsed, events, error = run(options, host, simulator_class, StreamChecker() if stream else None)
+        rows.append((name, "%.2f" % elapsed, events, error or "ok"))
+    print_table(["run", "wall s", "events", "result"], rows)
@@ -0,0 +1,58 @@
+# Shared helpers for the benchmark scripts. Run the benchmarks from the project folder, e.g.
+#   python -m benchmarks.bench_event_queue
+import contextlib, os, json, time
+from gbn_tester import GBNTester
+from gbn_host import GBNHost
+from network_simulator import NetworkSimulator
+
+
+# Builds an options object the same way GBNTester does, so every option the simulator
+# knows about is present
+def make_options(**kwargs):
+    return GBNTester(GBNHost).options_from_dict(kwargs)
+
+
+# Runs a full simulation with all printed output thrown away. Returns the simulator, the
+# list returned by Simulate() and the wall clock time the run took. simulator.nprocessed
+# has the number of events, even if they weren't kept. simulator_class can be a subclass of
+# NetworkSimulator that puts back something the simulator used to do, to compare against
+def run_quiet(options, host=GBNHost, simulator_class=NetworkSimulator):
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        simulator = simulator_class(options, host)
+        events = simulator.Simulate()
+        elapsed = time.perf_counter() - start
+    return simulator, events, elapsed
+
+
+# The names of the golden test configs under tests/test_cases, in order
+GOLDEN_TESTS = ["Test%i_%s" % (i + 1, name) for i, name in enumerate([
+    "SlowDataRate_0Loss_0Corruption", "SlowDataRate_25Loss_0Corruption",
+    "SlowDataRate_0Loss_25Corruption", "SlowDataRate_25Loss_25Corruption",
+    "MediumDataRate_0Loss_0Corruption", "MediumDataRate_10Loss_0Corruption",
+    "MediumDataRate_0Loss_10Corruption", "MediumDataRate_10Loss_10Corruption",
+    "FastDataRate_0Loss_0Corruption", "FastDataRate_10Loss_0Corruption",
+    "FastDataRate_0Loss_10Corruption", "FastDataRate_10Loss_10Corruption"])]
+
+
+def load_config(test):
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "test_cases", "%s.cfg" % test)
+    with open(path) as fp:
+        return json.load(fp)
+
+
+# The options of a golden test config with tracing turned off. Keyword arguments override
+# individual options
+def config_options(test, **overrides):
+    options = GBNTester(GBNHost).parse_test_options(load_config(test))
+    options.trace_level = "off"
+    for name, value in overrides.items():
+        setattr(options, name, value)
+    return options
+
+
+def print_table(headers, rows):
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print("  ".join(str(h).rjust(w) for h, w in zip(headers, widths)))
+    for r in rows:
+        print("  ".join(str(c).rjust(w) for c, w in zip(r, widths)))
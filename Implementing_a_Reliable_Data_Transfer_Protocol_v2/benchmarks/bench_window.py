@@ -0,0 +1,46 @@
+# Measures how throughput grows with the window size. Both hosts always have data waiting
+# (a very high arrival rate), so the window is the only thing holding the senders back
+# until the round trip is full. Throughput is the number of messages delivered per unit of
+# simulated time, counting both directions.
+#
+# --seq_bits needs the modelled link, so it has to come with --prop_delay or --bandwidth.
+#
+#   python -m benchmarks.bench_window [--num_pkts 2000] [--windows 1,2,4,8] [--loss_prob 0.1] [--host sr]
+from optparse import OptionParser
+from benchmarks.bench_utils import make_options, run_quiet, print_table
+from gbn_host import GBNHost
+from sr_host import SRHost
+
+
+if __name__ == "__main__":
+    op = OptionParser()
+    op.add_option("--num_pkts", type="int", default=2000)
+    op.add_option("--windows", default="1,2,3,4,6,8,12,16,32,64")
+    op.add_option("--loss_prob", type="float", default=0.0)
+    op.add_option("--corrupt_prob", type="float", default=0.0)
+    op.add_option("--timer_interval", type="float", default=5.0)
+    op.add_option("--seq_bits", type="int")
+    op.add_option("--bandwidth", type="float")
+    op.add_option("--prop_delay", type="float")
+    op.add_option("--seed", type="int", default=1)
+    op.add_option("--host", type="choice", choices=["gbn", "sr"], default="gbn")
+    args, _ = op.parse_args()
+    if args.seq_bits is not None and args.host == "sr":
+        op.error("--seq_bits only works with --host gbn")
+    if args.seq_bits is not None and args.bandwidth is None and args.prop_delay is None:
+        op.error("--seq_bits needs --bandwidth or --prop_delay")
+
+    rows = []
+    for window_size in [int(w) for w in args.windows.split(",")]:
+        options = make_options(num_pkts=args.num_pkts, arrival_rate=0.001, timer_interval=args.timer_interval,
+                               loss_prob=args.loss_prob, corrupt_prob=args.corrupt_prob, seed=args.seed,
+                               window_size=window_size, seq_bits=args.seq_bits, bandwidth=args.bandwidth,
+                               prop_delay=args.prop_delay, trace_level="off")
+        simulator, events, elapsed = run_quiet(options, GBNHost if args.host == "gbn" else SRHost)
+        assert simulator.B.data_received == simulator.A.data_sent, "window %i lost or reordered data" % window_size
+        delivered = len(simulator.A.data_received) + len(simulator.B.data_received)
+        rows.append((window_size, delivered, "%.1f" % simulator.last_delivery,
+                     "%.2f" % (delivered / simulator.last_delivery),
+                     "%.2f" % (simulator.ntolayer3 / delivered), "%.1f" % elapsed))
+
+    print_table(["window", "delivered", "done at", "msgs/time", "pkts per msg", "wall s"], rows)
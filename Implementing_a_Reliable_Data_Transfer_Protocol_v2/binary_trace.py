@@ -0,0 +1,174 @@
+import json, mmap, struct
+from checksum import internet_checksum
+
+# A compact binary record of a simulation, written with --record_trace FILE. It is two files:
+#
+#   FILE          a header, the simulator options as JSON, then one fixed size record for
+#                 every event a host handled and everything a host handed back
+#   FILE.payload  the payload bytes of all the records, one after another
+#
+# Each record is 24 bytes:
+#
+#   time (8 byte float) | entity (1) | kind (1) | checksum (2) | length (4) | payload offset (8)
+#
+# The kind is the EventType of an event given to a host, or TO_NETWORK / TO_APPLICATION for
+# packets and data a host passed to the simulator. The checksum is the Internet checksum of
+# the payload, so a damaged payload file can be spotted. Records are little-endian.
+
+MAGIC = b"GBNTRACE"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sHHI")       # magic, version, record size, options length
+RECORD = struct.Struct("<dBBHIQ")
+
+TO_NETWORK = 16
+TO_APPLICATION = 17
+
+
+# Application data is a str, while packets are bytes. Both are stored as bytes
+def as_bytes(data):
+    if isinstance(data, str):
+        return data.encode()
+    if isinstance(data, bytes):
+        return data
+    return bytes(data)
+
+
+# Appends records to a trace. Records are packed into a buffer and payloads collected in a
+# list, and both are only written out once batch records have built up, or on close()
+class TraceWriter():
+    def __init__(self, path, options=None, batch=4096):
+        self.file = open(path, "wb")
+        self.payload_file = open(path + ".payload", "wb")
+        options_json = json.dumps(vars(options) if options is not None else {}, default=str).encode()
+        self.file.write(FILE_HEADER.pack(MAGIC, VERSION, RECORD.size, len(options_json)))
+        self.file.write(options_json)
+
+        self.batch = batch
+        self.buffer = bytearray(RECORD.size * batch)
+        self.pending = 0                # Records in the buffer
+        self.payloads = []              # Payloads of those records
+        self.offset = 0                 # Where the next payload starts in the payload file
+        self.count = 0
+
+    def append(self, time, entity, kind, payload=b""):
+        # The length is taken after the conversion, so a str is counted in bytes, not characters
+        payload = as_bytes(payload)
+        length = len(payload)
+        checksum = 0
+        if length:
+            checksum = internet_checksum(payload)
+            self.payloads.append(payload)
+        RECORD.pack_into(self.buffer, self.pending * RECORD.size, time, entity, kind, checksum, length, self.offset)
+        self.offset += length
+        self.pending += 1
+        self.count += 1
+        if self.pending == self.batch:
+            self.flush()
+
+    def flush(self):
+        self.file.write(memoryview(self.buffer)[:self.pending * RECORD.size])
+        self.payload_file.writelines(self.payloads)
+        self.pending = 0
+        self.payloads = []
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.flush()
+        self.file.close()
+        self.payload_file.close()
+
+
+# One record read back from a trace. payload is a memoryview straight into the mapped
+# payload file
+class TraceEntry():
+    __slots__ = ("time", "entity", "kind", "checksum", "payload")
+
+    def __init__(self, time, entity, kind, checksum, payload):
+        self.time = time
+        self.entity = entity
+        self.kind = kind
+        self.checksum = checksum
+        self.payload = payload
+
+
+# Reads a trace written by TraceWriter. Both files are mapped into memory, records are
+# unpacked straight from the map and payloads are slices of the other map, so nothing is
+# copied. Raises ValueError if the file isn't a trace
+class TraceReader():
+    def __init__(self, path):
+        with open(path, "rb") as fp:
+            # Checked before mapping, since an empty file can't be mapped at all
+            if fp.seek(0, 2) < FILE_HEADER.size:
+                raise ValueError("%s is too short to be a trace" % path)
+            self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        with open(path + ".payload", "rb") as fp:
+            # An empty file can't be mapped, and a trace without payloads has nothing to map
+            self.payload_map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) if fp.seek(0, 2) else None
+
+        magic, version, record_size, options_length = FILE_HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+            raise ValueError("%s isn't a version %i trace" % (path, VERSION))
+        start = FILE_HEADER.size + options_length
+        self.options = json.loads(self.map[FILE_HEADER.size:start])
+
+        # A trace cut short by a crash can end in part of a record, which is left out
+        count = (len(self.map) - start) // RECORD.size
+        self.records = memoryview(self.map)[start:start + count * RECORD.size]
+        self.payloads = memoryview(self.payload_map) if self.payload_map is not None else memoryview(b"")
+
+    def __len__(self):
+        return len(self.records) // RECORD.size
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("trace record %i out of range" % index)
+        return self.entry(*RECORD.unpack_from(self.records, index * RECORD.size))
+
+    def __iter__(self):
+        for fields in RECORD.iter_unpack(self.records):
+            yield self.entry(*fields)
+
+    # The records as plain (time, entity, kind, checksum, length, offset) tuples, which is the
+    # fastest way through a large trace. payload() gives the payload of one
+    def raw_records(self):
+        return RECORD.iter_unpack(self.records)
+
+    def payload(self, offset, length):
+        return self.payloads[offset:offset + length]
+
+    def entry(self, time, entity, kind, checksum, length, offset):
+        return TraceEntry(time, entity, kind, checksum, self.payloads[offset:offset + length])
+
+    # The indexes of the records whose payload doesn't match its checksum
+    def verify(self):
+        return [i for i, e in enumerate(self) if len(e.payload) and internet_checksum(e.payload) != e.checksum]
+
+    # Payload views handed out keep the maps in use. The maps are closed here if nothing is
+    # still using them, and otherwise once the last view is dropped
+    def close(self):
+        self.records.release()
+        self.payloads.release()
+        for m in (self.map, self.payload_map):
+            if m is not None:
+                try:
+                    m.close()
+                except BufferError:
+                    pass
+        self.map = self.payload_map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# The recorder asked for on the command line (--record_trace), or None
+def recorder_from_options(options):
+    path = getattr(options, "record_trace", None)
+    if path:
+        return TraceWriter(path, options)
+    return None
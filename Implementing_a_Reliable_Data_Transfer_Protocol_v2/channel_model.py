@@ -0,0 +1,140 @@
+# The models of what the channel does to the packets that cross it, chosen with --channel.
+# For every packet that gets onto the channel the simulator asks lost() first and, if the
+# packet wasn't lost, corrupted() once its arrival time has been drawn. entity is the
+# sender, so a model can keep separate state for each direction:
+#
+#   bernoulli    Every packet is lost with probability loss_prob and corrupted with
+#                probability corrupt_prob, independently of every other packet. This is the
+#                default and draws exactly what the simulator always has, so seeds keep
+#                producing the same runs
+#   gilbert      A two-state Gilbert-Elliott model of loss in bursts. Each direction is in a
+#                good or a bad state, and moves between them before every packet. In the bad
+#                state packets are lost with probability bad_loss, in the good state none
+#                are. The bad state lasts burst_len packets on average, and the good state
+#                is made as long as it takes for the average loss rate to be loss_prob.
+#                Corruption stays Bernoulli
+#   trace        The fate of each packet is read from a file, in the order the packets are
+#                sent in either direction. See read_pattern() for the format. The pattern
+#                starts over when it runs out. A short pattern can fall into step with a
+#                host's retransmissions and lose the same packet every time, so patterns
+#                should be long or have a length that doesn't divide the window
+
+BERNOULLI = "bernoulli"
+GILBERT = "gilbert"
+TRACE = "trace"
+CHANNELS = [BERNOULLI, GILBERT, TRACE]
+
+# The symbols of a trace pattern
+DELIVER = "."
+LOSE = "L"
+CORRUPT = "C"
+
+
+class BernoulliChannel():
+    def __init__(self, loss_prob, corrupt_prob, loss_rng, corrupt_rng):
+        self.loss_prob = loss_prob
+        self.corrupt_prob = corrupt_prob
+        self.loss_rng = loss_rng
+        self.corrupt_rng = corrupt_rng
+
+    def lost(self, entity):
+        return self.loss_rng.uniform(0.0, 1.0) < self.loss_prob
+
+    def corrupted(self, entity):
+        return self.corrupt_rng.uniform(0.0, 1.0) < self.corrupt_prob
+
+
+class GilbertElliottChannel():
+    def __init__(self, loss_prob, corrupt_prob, burst_len, bad_loss, loss_rng, corrupt_rng):
+        if burst_len < 1:
+            raise ValueError("the mean burst length must be at least 1 packet, not %r" % burst_len)
+        if not 0 < bad_loss <= 1:
+            raise ValueError("the loss probability in the bad state must be in (0, 1], not %r" % bad_loss)
+        if not 0 <= loss_prob < bad_loss:
+            raise ValueError("a loss rate of %r can't be reached with a bad state loss of %r" % (loss_prob, bad_loss))
+        self.burst_len = burst_len
+        self.bad_loss = bad_loss
+        self.corrupt_prob = corrupt_prob
+        self.loss_rng = loss_rng
+        self.corrupt_rng = corrupt_rng
+
+        # The chance of leaving each state before a packet. In the long run the channel is bad
+        # for p / (p + r) of the packets, which is loss_prob / bad_loss
+        bad_share = loss_prob / bad_loss
+        self.r = 1.0 / burst_len
+        self.p = self.r * bad_share / (1.0 - bad_share)
+
+        self.bad = [False, False]       # The state of each direction, indexed by the sender
+        self.bursts = 0                 # Times either direction went from good to bad
+
+    def lost(self, entity):
+        rng = self.loss_rng
+        if self.bad[entity]:
+            if rng.uniform(0.0, 1.0) < self.r:
+                self.bad[entity] = False
+        elif rng.uniform(0.0, 1.0) < self.p:
+            self.bad[entity] = True
+            self.bursts += 1
+        return self.bad[entity] and rng.uniform(0.0, 1.0) < self.bad_loss
+
+    def corrupted(self, entity):
+        return self.corrupt_rng.uniform(0.0, 1.0) < self.corrupt_prob
+
+
+class TraceChannel():
+    def __init__(self, pattern):
+        if not pattern:
+            raise ValueError("the channel trace is empty")
+        self.pattern = pattern
+        self.position = 0
+        self.fate = DELIVER             # The fate of the packet lost() was last asked about
+
+    def lost(self, entity):
+        self.fate = self.pattern[self.position]
+        self.position += 1
+        if self.position == len(self.pattern):
+            self.position = 0
+        return self.fate == LOSE
+
+    def corrupted(self, entity):
+        return self.fate == CORRUPT
+
+
+# Reads a trace pattern. Each packet's fate is one symbol: "." if it is delivered, "L" if it
+# is lost and "C" if it is corrupted. Whitespace is ignored and "#" starts a comment that
+# runs to the end of the line, e.g.
+#
+#   # a burst of three losses every 20 packets
+#   ........LLL.........
+def read_pattern(path):
+    pattern = []
+    with open(path) as fp:
+        for line_num, line in enumerate(fp, 1):
+            for symbol in line.split("#", 1)[0].split():
+                for c in symbol:
+                    if c not in (DELIVER, LOSE, CORRUPT):
+                        raise ValueError("%s:%i: unknown symbol %r in channel trace" % (path, line_num, c))
+                pattern.extend(symbol)
+    return "".join(pattern)
+
+
+# The channel model asked for on the command line. It draws from the simulator's loss and
+# corruption generators
+def channel_from_options(options, loss_rng, corrupt_rng):
+    channel = getattr(options, "channel", None) or BERNOULLI
+    if channel == BERNOULLI:
+        return BernoulliChannel(options.loss_prob, options.corrupt_prob, loss_rng, corrupt_rng)
+    if channel == GILBERT:
+        burst_len = getattr(options, "burst_len", None)
+        if burst_len is None:
+            burst_len = 4.0
+        bad_loss = getattr(options, "bad_loss", None)
+        if bad_loss is None:
+            bad_loss = 1.0
+        return GilbertElliottChannel(options.loss_prob, options.corrupt_prob, burst_len, bad_loss, loss_rng, corrupt_rng)
+    if channel == TRACE:
+        path = getattr(options, "channel_trace", None)
+        if not path:
+            raise ValueError("the trace channel needs a --channel_trace file")
+        return TraceChannel(read_pattern(path))
+    raise ValueError("unknown channel model %r" % channel)
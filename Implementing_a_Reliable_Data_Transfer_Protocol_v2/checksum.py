@@ -0,0 +1,65 @@
+# The Internet checksum (RFC 1071) used by the GBN packet format.
+#
+# The ones' complement sum of a buffer's 16-bit words is the same as the buffer read as one
+# big-endian integer, taken mod 0xffff, since 0x10000 is 1 mod 0xffff. That lets Python sum
+# the whole buffer in C instead of looping over it a word at a time. The results are the same
+# as the word-by-word reference: 0 for an all-zero buffer, otherwise a value in 1..0xffff.
+
+
+# Returns the buffer as a big-endian integer, padded with a zero byte if its length is odd
+def _as_int(data):
+    n = int.from_bytes(data, "big")
+    if len(data) % 2:
+        n <<= 8
+    return n
+
+
+# Reduces n mod 0xffff, as a value in 1..0xffff unless n is 0. Dividing a big integer by a
+# small one works a digit at a time, so a large n (e.g. a 64 KB payload) is first halved
+# repeatedly by adding its top half to its bottom half. Each split is at a multiple of 16
+# bits, so the sum keeps the same value mod 0xffff and is only zero if n was
+def _fold(n):
+    if n == 0:
+        return 0
+    bits = n.bit_length()
+    while bits > 4096:
+        half = (bits // 32 + 1) * 16
+        n = (n >> half) + (n & ((1 << half) - 1))
+        bits = n.bit_length()
+    r = n % 0xffff
+    return r if r else 0xffff
+
+
+# The Internet checksum of data: the ones' complement of the ones' complement sum
+def internet_checksum(data):
+    return ~_fold(_as_int(data)) & 0xffff
+
+
+# The Internet checksum of head followed by tail, without joining them. head must have an
+# even length, so tail's words line up the same as in the joined buffer, and the sum of the
+# two is the sum of the whole. tail is folded on its own first, so a large payload isn't
+# copied into a new integer just to add the header to it
+def internet_checksum_of(head, tail):
+    return ~_fold(_as_int(head) + _fold(_as_int(tail))) & 0xffff
+
+
+# The Internet checksum of data as it would be if the 16-bit field at offset (which must be
+# even) held zero. This is how a received packet is checked against the checksum stored in
+# its own header, without rebuilding the header
+def checksum_excluding(data, offset):
+    n = _as_int(data)
+    padded_len = len(data) + len(data) % 2
+    field = data[offset] << 8 | data[offset + 1]
+    n -= field << (8 * (padded_len - offset - 2))
+    return ~_fold(n) & 0xffff
+
+
+# Incrementally updates a checksum after one 16-bit word of the data changed from old_word to
+# new_word (RFC 1624, eqn. 3). This matches a full recompute unless the new data is all
+# zeros, where a full recompute gives 0xffff and this gives 0. GBN packets use it to add a
+# piggybacked ACK to a data packet, see gbn_packet.add_ack()
+def update_checksum(checksum, old_word, new_word):
+    s = (~checksum & 0xffff) + (~old_word & 0xffff) + new_word
+    s = (s & 0xffff) + (s >> 16)
+    s = (s & 0xffff) + (s >> 16)
+    return ~s & 0xffff
@@ -1,8 +1,12 @@
 #Author: Kevin Mody
 
-from network_simulator import NetworkSimulator, Packet, EventEntity
+from network_simulator import NetworkSimulator, Packet, EventEntity, host_option
 from enum import Enum
-from struct import pack, unpack
+from checksum import internet_checksum
+from gbn_packet import parse_header, encode_data, encode_ack, add_ack, checksum_ok, payload_view, SequenceSpace
+from send_queue import SendQueue
+from send_window import SendWindow
+from rtt_estimator import RttEstimator
 
 class GBNHost():
 
@@ -23,26 +27,96 @@ class GBNHost():
         self.window_base = 0                        # The last ACKed packet. This starts at 0 because no packets 
                                                     # have been ACKed
         self.next_seq_num = 0                       # The SEQ number that will be used next
-        self.app_layer_buffer = []                  # A buffer was created that stores all data received from the application 
-                                                    # layer that hasn't yet been sent
-        self.unacked_buffer = [] 
+        # A buffer was created that stores all data received from the application layer that hasn't yet
+        # been sent. Data leaves it in the order it arrived, and it can be bounded with --send_queue_size
+        self.app_layer_buffer = SendQueue(host_option(simulator, "send_queue_size", None),
+                                          host_option(simulator, "send_queue_policy", "block"))
+        self.unacked_buffer = SendWindow(window_size)           # The packets sent but not yet ACKed, by sequence number
+
+        # With --mss a message longer than mss bytes is split into segments of at most mss
+        # bytes, one per packet. The send queue holds whole messages, and the rest of a message
+        # the window had no more room for waits in unsent_message from offset unsent_offset.
+        # Segments are views into the message, so it is only copied into the packets. The
+        # receiver keeps the segments of a message in received_segments until the last one
+        # arrives. It does this whatever its own mss, since the packets say where messages end
+        self.mss = host_option(simulator, "mss", None)
+        if self.mss is not None and self.mss < 1:
+            raise ValueError("the maximum segment size must be at least 1 byte, not %i" % self.mss)
+        self.unsent_message = None
+        self.unsent_offset = 0
+        self.received_segments = []
+
+        # window_base, next_seq_num and exp_seq_num count packets and never wrap. With --seq_bits
+        # the numbers in the packets wrap around, and are converted at the edges. That is only
+        # safe on a channel that keeps packets in order, which the random delay channel doesn't,
+        # so wrapping needs the modelled link (--bandwidth or --prop_delay)
+        self.seq_space = SequenceSpace(host_option(simulator, "seq_bits", None))
+        if self.seq_space.bits is not None and host_option(simulator, "bandwidth", None) is None and \
+                host_option(simulator, "prop_delay", None) is None:
+            raise ValueError("--seq_bits needs a link that keeps packets in order, give a --bandwidth or --prop_delay")
+        if not self.seq_space.fits_window(window_size):
+            raise ValueError("a window of %i doesn't fit in %i bit sequence numbers" % (window_size, self.seq_space.bits))
+
+        # With --adaptive_rto the timer interval follows the measured round trip time instead of
+        # staying at timer_interval. Each packet's first send time is kept to take samples from.
+        # A timeout backoff lasts until the next valid sample, or with --rto_reset_on_ack until
+        # the next ACK that moves the window
+        self.rtt = None
+        self.rto_reset_on_ack = host_option(simulator, "rto_reset_on_ack", False)
+        if host_option(simulator, "adaptive_rto", False):
+            self.rtt = RttEstimator(timer_interval)
+            self.send_times = SendWindow(window_size)           # When each packet was sent, None once resent
+
+        # With --fast_retransmit the window is resent as soon as dup_ack_threshold duplicate
+        # ACKs (ACKs for window_base - 1) have arrived, instead of when the timer runs out
+        self.fast_retransmit = host_option(simulator, "fast_retransmit", False)
+        self.dup_ack_threshold = 3
+        self.dup_acks = 0                                       # Duplicate ACKs since the window last moved
+
+        # Recovery statistics. stall_time adds up how long the sender waited before each
+        # retransmission, counted from the last time the window moved or was resent.
+        # retransmissions counts every data packet sent again
+        self.timeouts = 0
+        self.fast_retransmits = 0
+        self.retransmissions = 0
+        self.stall_time = 0.0
+        self.last_progress = 0.0
+
+        # Delayed ACKs (--ack_every / --ack_delay). Instead of ACKing every packet, the receiver
+        # sends one cumulative ACK once ack_every packets have arrived in order, or once the
+        # ACK timer runs out ack_delay after the first ACK that was held back. Duplicate ACKs
+        # for corrupt or out of order packets are held back the same way, so a burst of them
+        # goes out as one
+        # With --piggyback ACKs are held back the same way, but for no set number of packets:
+        # the held ACK rides on the next data packet this host sends (see piggyback_ack()),
+        # and only goes out on its own if the ACK timer runs out first
+        self.piggyback = host_option(simulator, "piggyback", False)
+        self.delayed_ack = host_option(simulator, "ack_every", None) is not None or \
+                           host_option(simulator, "ack_delay", None) is not None or self.piggyback
+        self.ack_every = host_option(simulator, "ack_every", None if self.piggyback else 2)
+        self.ack_delay = host_option(simulator, "ack_delay", timer_interval / 4)
+        self.ack_owed = False                                   # True if an ACK is being held back
+        self.acks_held = 0                                      # In order packets the held ACK covers
+        self.ack_timer_running = False
+        self.acks_coalesced = 0                                 # ACKs merged into a later one instead of sent
+        self.acks_piggybacked = 0                               # ACKs sent on a data packet instead of on their own
+
         self.exp_seq_num = 0                                    # The next Sequesnce number expected
-        self.last_ack_pkt = self.packet_Create(-1, "ACK")                     # The last ACK current_packet sent. 
+        self.last_ack_pkt = self.packet_Create(self.seq_space.wire(-1), "ACK")                     # The last ACK current_packet sent. 
 
     ###########################################################################################################
     ## Core Interface functions that are called by Simulator
 
     # This function implements the SENDING functionality. It should implement retransmit-on-timeout. 
     # Refer to the GBN sender flowchart for details about how this function should be implemented
+    # Returns True if the payload was sent or queued, or BLOCKED/REJECTED if the queue was full
+    # Anything still waiting to be sent is only ever left over while the window is full
     def receive_from_application_layer(self, payload):
         if self.next_seq_num < self.window_base + self.window_size:
-            self.unacked_buffer.append(self.packet_Create(self.next_seq_num, payload))
-            self.simulator.pass_to_network_layer(self.entity, self.unacked_buffer[self.next_seq_num],self.current_ack(self.unacked_buffer[self.next_seq_num]))
-            if self.window_base == self.next_seq_num:
-                self.simulator.start_timer(self.entity, self.timer_interval)
-            self.next_seq_num += 1
+            self.send_message(payload)
+            return True
         else:
-            self.app_layer_buffer.append(payload)    
+            return self.app_layer_buffer.push(payload)
 
 
     # This function implements the RECEIVING functionality. This function will be more complex that
@@ -51,97 +125,224 @@ class GBNHost():
     # data differently depending on if it is a packet containing data, or if it is an ACK.
     # Refer to the GBN receiver flowchart for details about how to implement responding to data pkts, and
     # refer to the GBN sender flowchart for details about how to implement responidng to ACKs
+    # The header is parsed once here and every check below works from it
+    # A data packet that carries an ACK is handled as the ACK first and then as the data
     def receive_from_network_layer(self, byte_data):
-        if self.current_ack(byte_data) and not self.is_corrupt(byte_data):
-            acknum = self.get_currentAck_num(byte_data)
-            if acknum >= self.window_base:
-                self.window_base = acknum + 1
-                self.simulator.stop_timer(self.entity)
-                if self.window_base != self.next_seq_num:
-                    self.simulator.start_timer(self.entity, self.timer_interval)
-                while len(self.app_layer_buffer) > 0 and self.next_seq_num < self.window_base + self.window_size:
-                    payload = self.app_layer_buffer.pop()
-                    self.unacked_buffer.append(self.packet_Create(self.next_seq_num, payload))
-                    self.simulator.pass_to_network_layer(self.entity, self.unacked_buffer[self.next_seq_num], self.current_ack(self.unacked_buffer[self.next_seq_num]))
-                    if self.window_base == self.next_seq_num:
-                        self.simulator.start_timer(self.entity, self.timer_interval)
-                    self.next_seq_num += 1
-        elif self.is_corrupt(byte_data):
-            self.simulator.pass_to_network_layer(self.entity, self.last_ack_pkt, self.current_ack(self.last_ack_pkt))   
-        elif self.get_currentSeq_num(byte_data) != self.exp_seq_num:
-            self.simulator.pass_to_network_layer(self.entity, self.last_ack_pkt, self.current_ack(self.last_ack_pkt)) 
+        header = parse_header(byte_data)
+        corrupt = not checksum_ok(byte_data, header)
+        if header.is_ack() and not corrupt:
+            self.receive_ack(header.pkt_number)
+            return
+        if header.ack_number is not None and not corrupt:
+            self.receive_ack(header.ack_number)
+        if corrupt:
+            self.send_ack(False)
+        elif header.pkt_number != self.seq_space.wire(self.exp_seq_num):
+            self.send_ack(False)
         else:
             try:
-                data = self.payload_Extraction(byte_data)
-                   
-            except Exception as e:
-                self.simulator.pass_to_network_layer(self.entity, self.last_ack_pkt, self.current_ack(self.last_ack_pkt))
-            self.simulator.pass_to_application_layer(self.entity, data)
-            self.last_ack_pkt = self.packet_Create(self.exp_seq_num, "ACK")
-            self.simulator.pass_to_network_layer(self.entity, self.last_ack_pkt, self.current_ack(self.last_ack_pkt)) 
+                data = payload_view(byte_data, header)
+            except ValueError:
+                self.send_ack(False)
+                return
+            if header.has_more():
+                self.received_segments.append(data)
+            elif self.received_segments:
+                self.received_segments.append(data)
+                self.simulator.pass_to_application_layer(self.entity, b"".join(self.received_segments))
+                self.received_segments = []
+            else:
+                self.simulator.pass_to_application_layer(self.entity, data)
+            self.last_ack_pkt = self.packet_Create(self.seq_space.wire(self.exp_seq_num), "ACK")
+            self.send_ack(True)
             self.exp_seq_num += 1
 
+    # Handles the ACK number of an ACK or of a data packet that carries one. An ACK inside the
+    # window moves it, and with --fast_retransmit duplicates of the last one are counted
+    def receive_ack(self, wire_acknum):
+        acknum = self.seq_space.unwrap(wire_acknum, self.window_base - 1)
+        if self.window_base <= acknum < self.next_seq_num:
+            if self.rtt:
+                self.take_rtt_sample(acknum)
+            self.unacked_buffer.release(self.window_base, acknum + 1)
+            self.window_base = acknum + 1
+            self.dup_acks = 0
+            self.last_progress = self.simulator.time
+            self.simulator.stop_timer(self.entity)
+            if self.window_base != self.next_seq_num:
+                self.simulator.start_timer(self.entity, self.current_timeout())
+            self.fill_window()
+        elif self.fast_retransmit and acknum == self.window_base - 1 and self.window_base != self.next_seq_num:
+            self.dup_acks += 1
+            if self.dup_acks == self.dup_ack_threshold:
+                self.fast_retransmits += 1
+                self.simulator.stop_timer(self.entity)
+                self.resend_window()
+
+
     # This function is called by the simulator when a timer interrupt is triggered due to an ACK not being 
     # received in the expected time frame. All unACKed data should be resent, and the timer restarted
     def timer_interrupt(self):
-        self.simulator.start_timer(self.entity, self.timer_interval)
-        for a in range(self.window_base, self.next_seq_num, 1):
-            self.simulator.pass_to_network_layer(self.entity, self.unacked_buffer[a], self.current_ack(self.unacked_buffer[a]))
+        self.timeouts += 1
+        if self.rtt:
+            self.rtt.backoff()
+        self.resend_window()
+
+
+    # Restarts the timer and resends every packet in the window
+    def resend_window(self):
+        self.stall_time += self.simulator.time - self.last_progress
+        self.last_progress = self.simulator.time
+        if self.rtt:
+            self.send_times.release(self.window_base, self.next_seq_num)
+        self.simulator.start_timer(self.entity, self.current_timeout())
+        for packet in self.unacked_buffer.packets(self.window_base, self.next_seq_num):
+            if self.ack_owed and self.piggyback:
+                packet = self.piggyback_ack(packet)
+            self.retransmissions += 1
+            self.simulator.pass_to_network_layer(self.entity, packet, False)
+
+
+    # The ACK timer ran out, so any ACK being held back goes out now
+    def ack_timer_interrupt(self):
+        self.ack_timer_running = False
+        if self.ack_owed:
+            self.flush_ack()
+
+
+    # Sends last_ack_pkt. With delayed ACKs it is held back instead, until enough packets have
+    # arrived in order (new_data is True for those) or the ACK timer runs out. A held back ACK
+    # that gets replaced by a newer one is never sent
+    def send_ack(self, new_data):
+        if not self.delayed_ack:
+            self.simulator.pass_to_network_layer(self.entity, self.last_ack_pkt, True)
+            return
+        if self.ack_owed:
+            self.acks_coalesced += 1
+        self.ack_owed = True
+        if new_data:
+            self.acks_held += 1
+        if self.ack_every is not None and self.acks_held >= self.ack_every:
+            self.flush_ack()
+        elif not self.ack_timer_running:
+            self.simulator.start_ack_timer(self.entity, self.ack_delay)
+            self.ack_timer_running = True
+
+
+    def flush_ack(self):
+        if self.ack_timer_running:
+            self.simulator.stop_ack_timer(self.entity)
+            self.ack_timer_running = False
+        self.ack_owed = False
+        self.acks_held = 0
+        self.simulator.pass_to_network_layer(self.entity, self.last_ack_pkt, True)
+
+
+    # Returns a copy of a data packet that also carries the ACK being held back, which then
+    # no longer needs to be sent. The window keeps the plain packet, so a later resend
+    # doesn't repeat an old ACK
+    def piggyback_ack(self, packet):
+        if self.ack_timer_running:
+            self.simulator.stop_ack_timer(self.entity)
+            self.ack_timer_running = False
+        self.ack_owed = False
+        self.acks_held = 0
+        self.acks_piggybacked += 1
+        return add_ack(packet, parse_header(self.last_ack_pkt).pkt_number)
+
+
+    # Sends new data while the window has room: first the rest of a message that didn't fit,
+    # then messages from the send queue
+    def fill_window(self):
+        while self.next_seq_num < self.window_base + self.window_size:
+            if self.unsent_message is not None:
+                self.send_message(self.unsent_message, self.unsent_offset)
+            elif len(self.app_layer_buffer) > 0:
+                self.send_message(self.app_layer_buffer.pop())
+            else:
+                break
+
+
+    # Sends a message, from offset on. Without an mss it goes out whole as one packet.
+    # Otherwise it goes out one segment at a time until it is done or the window is full
+    def send_message(self, message, offset=0):
+        mss = self.mss
+        if mss is None:
+            self.send_new(message)
+            return
+        view = memoryview(message)
+        size = len(view)
+        while True:
+            end = min(offset + mss, size)
+            self.send_new(view[offset:end], end < size)
+            offset = end
+            if offset >= size:
+                self.unsent_message = None
+                return
+            if self.next_seq_num >= self.window_base + self.window_size:
+                self.unsent_message = message
+                self.unsent_offset = offset
+                return
+
+
+    # Sends a new packet with the next sequence number, starting the timer if it is the only
+    # packet in flight. more is True for a segment that isn't the last of its message
+    def send_new(self, payload, more=False):
+        packet = self.packet_Create(self.seq_space.wire(self.next_seq_num), payload, more)
+        self.unacked_buffer.store(self.next_seq_num, packet)
+        if self.rtt:
+            self.send_times.store(self.next_seq_num, self.simulator.time)
+        if self.ack_owed and self.piggyback:
+            packet = self.piggyback_ack(packet)
+        self.simulator.pass_to_network_layer(self.entity, packet, False)
+        if self.window_base == self.next_seq_num:
+            self.simulator.start_timer(self.entity, self.current_timeout())
+            self.last_progress = self.simulator.time
+        self.next_seq_num += 1
+
+
+    def current_timeout(self):
+        if self.rtt:
+            return self.rtt.rto
+        return self.timer_interval
+
+
+    # An ACK for acknum arrived. Its send time gives an RTT sample, unless the packet has been
+    # resent (Karn's algorithm). Without a sample any backoff stays in place, unless
+    # --rto_reset_on_ack asked for it to be dropped whenever the window moves
+    def take_rtt_sample(self, acknum):
+        sent = self.send_times.get(acknum)
+        if sent is not None:
+            self.rtt.sample(self.simulator.time - sent)
+        elif self.rto_reset_on_ack:
+            self.rtt.reset_backoff()
+        self.send_times.release(self.window_base, acknum + 1)
         
 
     # This function should check to determine if a given packet is corrupt. The packet parameter accepted
     # by this function should contain a byte array
     def is_corrupt(self, packet):
-        length = unpack("!HiHI", packet[:12])
-        checksum = length[2]
-        header = pack("!HiHI", length[0], length[1], 0, length[3])
-        current_packet = header + packet[12:]
-        if checksum == self.checker(current_packet):
-            return False
-        else:
-            return True
+        return not checksum_ok(packet, parse_header(packet))
 
     def checker(self, current_packet):
-        if len(current_packet) % 2 != 0:
-            current_packet = current_packet + bytes(1)
-
-        # Checksum
-        s = 0
-        for i in range(0, len(current_packet), 2):
-            word = current_packet[i] << 8 | current_packet[i+1]
-            s += word
-            s = (s & 0xffff) + (s >> 16)
-        total = ~s & 0xffff
-        return total
+        return internet_checksum(current_packet)
  
-    def packet_Create(self, seq_num, payload):
+    # payload is the bytes to send, or "ACK" for an ACK
+    def packet_Create(self, seq_num, payload, more=False):
         if payload == "ACK":
-            current_packet = pack("!HiHI" , 0, seq_num, 0, 0 )
-            CS = self.checker(current_packet)
-            current_packet = pack("!HiHI" , 0 , seq_num, CS, 0)
+            return encode_ack(seq_num)
         else:
-            current_packet = pack("!HiHI%is"%len(payload), 128, seq_num, 0, len(payload), payload.encode())
-            CS = self.checker(current_packet)
-            current_packet = pack("!HiHI%is"%len(payload), 128, seq_num, CS, len(payload), payload.encode())
-        return current_packet
+            return encode_data(seq_num, payload, more)
 
     def current_ack(self, current_packet):
-        length = unpack("!HiHI", current_packet[:12])
-        if length[0] == 0:
-            return True
-        else:
-            return False
+        return parse_header(current_packet).is_ack()
 
     def get_currentAck_num(self, current_packet):
-        length = unpack("!HiHI", current_packet[:12])
-        return length[1]
+        return parse_header(current_packet).pkt_number
 
     def get_currentSeq_num(self, current_packet):
-        length = unpack("!HiHI", current_packet[:12])
-        return length[1]     
+        return parse_header(current_packet).pkt_number
 
+    # The payload as a view into the packet, so it isn't copied
     def payload_Extraction(self, current_packet):
-        length = unpack("!HiHI", current_packet [:12])
-        data = unpack("!%is"%length[3], current_packet[12:])
-        data = data[0].decode()
-        return data
+        return payload_view(current_packet, parse_header(current_packet))
@@ -0,0 +1,149 @@
+import struct
+from checksum import internet_checksum_of, checksum_excluding, update_checksum
+
+# The GBN packet format. Every packet starts with a 12 byte header:
+#
+#   type (2 bytes) | number (4 bytes, signed) | checksum (2 bytes) | payload length (4 bytes)
+#
+# followed by the payload. Data packets have type 128 and carry a sequence number, ACKs have
+# type 0, carry the number being acknowledged and have no payload.
+#
+# A data packet can also carry an ACK for the other direction (piggybacking). It has type 129
+# and the number being acknowledged follows the header as 4 more bytes, before the payload.
+# The payload length doesn't count them.
+#
+# A message too big for one packet is sent as several segments. Every segment but the last
+# has the MORE_SEGMENTS bit set in its type (130, or 131 if it also carries an ACK), so the
+# receiver knows to hold on to it until the rest of the message has arrived.
+
+HEADER = struct.Struct("!HiHI")
+HEADER_SIZE = HEADER.size
+CHECKSUM = struct.Struct("!H")
+CHECKSUM_OFFSET = 6
+ACK_NUMBER = struct.Struct("!i")
+DATA_ACK_HEADER = struct.Struct("!HiHIi")
+DATA_ACK_HEADER_SIZE = DATA_ACK_HEADER.size
+
+DATA_TYPE = 128
+ACK_TYPE = 0
+DATA_ACK_TYPE = 129
+
+# Bits in the type of a data packet
+CARRIES_ACK = 1
+MORE_SEGMENTS = 2
+
+
+# A parsed packet header. A received packet is parsed once into one of these and every
+# check on it reads the fields from here. ack_number is only set for data packets that
+# carry an ACK, and payload_offset is where the payload starts
+class PacketHeader():
+    __slots__ = ("pkt_type", "pkt_number", "checksum", "length", "ack_number", "payload_offset")
+
+    def __init__(self, pkt_type, pkt_number, checksum, length, ack_number=None, payload_offset=HEADER_SIZE):
+        self.pkt_type = pkt_type
+        self.pkt_number = pkt_number
+        self.checksum = checksum
+        self.length = length
+        self.ack_number = ack_number
+        self.payload_offset = payload_offset
+
+    def is_ack(self):
+        return self.pkt_type == ACK_TYPE
+
+    # True for a segment that isn't the last of its message
+    def has_more(self):
+        return self.pkt_type & MORE_SEGMENTS != 0
+
+
+# The sequence numbers that go on the wire. Hosts count packets with plain ints that never
+# wrap, and with a bit width set only the number in the header wraps around modulo 2^bits.
+# A number read off the wire is turned back into a count with unwrap(), relative to a base
+# it can't be behind of (e.g. the window base). Without a bit width numbers go out as they are
+class SequenceSpace():
+    __slots__ = ("bits", "modulus")
+
+    def __init__(self, bits=None):
+        if bits is not None and not 0 < bits < 32:
+            raise ValueError("sequence numbers need between 1 and 31 bits, not %i" % bits)
+        self.bits = bits
+        self.modulus = 1 << bits if bits else None
+
+    def wire(self, num):
+        if self.modulus is None:
+            return num
+        return num % self.modulus
+
+    # The count at or after base that goes out on the wire as wire_num
+    def unwrap(self, wire_num, base):
+        if self.modulus is None:
+            return wire_num
+        return base + (wire_num - base) % self.modulus
+
+    # True if the space is big enough for a window of this size. A Go-Back-N receiver only
+    # tells packets apart by number, so the window has to be smaller than the space. That is
+    # only enough on a channel that keeps packets in order. On a channel that reorders them
+    # an old copy can arrive any number of spaces late and be taken for a new packet, so no
+    # window size is safe there (see GBNHost)
+    def fits_window(self, window_size):
+        return self.modulus is None or window_size < self.modulus
+
+
+# Parses the header at the start of a packet. Raises struct.error if there are fewer than
+# 12 bytes. A packet marked as carrying an ACK that is too short to hold one has been
+# corrupted, so its ACK number is left unset and the checksum is left to catch it
+def parse_header(packet):
+    header = PacketHeader(*HEADER.unpack_from(packet, 0))
+    if header.pkt_type & CARRIES_ACK and len(packet) >= DATA_ACK_HEADER_SIZE:
+        header.ack_number = ACK_NUMBER.unpack_from(packet, HEADER_SIZE)[0]
+        header.payload_offset = DATA_ACK_HEADER_SIZE
+    return header
+
+
+# Builds a packet. The checksum is taken over the header (with a zero checksum field) and the
+# payload without joining them, so the payload is copied once, into the finished packet
+def encode_packet(pkt_type, pkt_number, payload=b""):
+    checksum = internet_checksum_of(HEADER.pack(pkt_type, pkt_number, 0, len(payload)), payload)
+    return HEADER.pack(pkt_type, pkt_number, checksum, len(payload)) + payload
+
+
+def encode_data(seq_num, payload, more=False):
+    return encode_packet(DATA_TYPE | MORE_SEGMENTS if more else DATA_TYPE, seq_num, payload)
+
+
+def encode_ack(ack_num):
+    return encode_packet(ACK_TYPE, ack_num)
+
+
+# Builds a data packet that also acknowledges ack_num
+def encode_data_ack(seq_num, ack_num, payload, more=False):
+    pkt_type = DATA_ACK_TYPE | MORE_SEGMENTS if more else DATA_ACK_TYPE
+    checksum = internet_checksum_of(DATA_ACK_HEADER.pack(pkt_type, seq_num, 0, len(payload), ack_num), payload)
+    return DATA_ACK_HEADER.pack(pkt_type, seq_num, checksum, len(payload), ack_num) + payload
+
+
+# Turns a data packet built by encode_data() into the same packet carrying an ACK for
+# ack_num, as encode_data_ack() would build it. Only the type changes and the ACK number is
+# inserted, which keeps the payload on 16-bit word boundaries, so the checksum is updated
+# from the old one (RFC 1624) instead of being computed again over the payload
+def add_ack(packet, ack_num):
+    pkt_type, pkt_number, checksum, length = HEADER.unpack_from(packet, 0)
+    new_type = pkt_type | CARRIES_ACK
+    wire_ack = ack_num & 0xffffffff
+    checksum = update_checksum(checksum, pkt_type, new_type)
+    checksum = update_checksum(checksum, 0, wire_ack >> 16)
+    checksum = update_checksum(checksum, 0, wire_ack & 0xffff)
+    return DATA_ACK_HEADER.pack(new_type, pkt_number, checksum, length, ack_num) + memoryview(packet)[HEADER_SIZE:]
+
+
+# True if the checksum in the header matches the rest of the packet
+def checksum_ok(packet, header):
+    return header.checksum == checksum_excluding(packet, CHECKSUM_OFFSET)
+
+
+# The payload of a packet, as a memoryview into the packet so nothing is copied. Raises
+# ValueError if the length in the header doesn't match the size of the packet
+def payload_view(packet, header):
+    offset = header.payload_offset
+    if len(packet) - offset != header.length:
+        raise ValueError("payload length %i doesn't match header length %i" % (len(packet) - offset, header.length))
+    return memoryview(packet)[offset:]
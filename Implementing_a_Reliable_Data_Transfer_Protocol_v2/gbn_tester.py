@@ -2,6 +2,8 @@ import os, json, sys, re
 from optparse import OptionParser
 from gbn_host import GBNHost
 from network_simulator import NetworkSimulator
+from sim_trace import FileSink
+from stream_checker import checker_from_options, DeliveryError
 
 
 class GBNTester():
@@ -31,6 +33,54 @@ class GBNTester():
             "--arrival_rate",
             metavar="X", type="float",
             help="The average time between packets arriving from the application layer")
+        self.op.add_option(
+            "--binary_payloads",
+            action="store_true",
+            help="The applications send random bytes instead of short text messages")
+        self.op.add_option(
+            "--payload_size",
+            metavar="X", type="int",
+            help="With --binary_payloads, each message is 1 to X bytes long (default 64)")
+        self.op.add_option(
+            "--mss",
+            metavar="X", type="int",
+            help="Split messages into segments of at most X bytes, one per packet, and reassemble them at the receiver")
+        self.op.add_option(
+            "--window_size",
+            metavar="X", type="int", default=5,
+            help="The size of each host's send window")
+        self.op.add_option(
+            "--seq_bits",
+            metavar="X", type="int",
+            help="Sequence numbers count modulo 2^X on the wire (1 to 31). Needs --bandwidth or --prop_delay. By default they never wrap")
+        self.op.add_option(
+            "--bandwidth",
+            metavar="X", type="float",
+            help="Model the link: it sends X bytes per time unit in each direction")
+        self.op.add_option(
+            "--prop_delay",
+            metavar="X", type="float",
+            help="Model the link: packets take X time units to cross it once sent")
+        self.op.add_option(
+            "--queue_size",
+            metavar="X", type="int",
+            help="At most X packets wait for a modelled link in each direction, the rest are dropped")
+        self.op.add_option(
+            "--channel",
+            type="choice", choices=["bernoulli", "gilbert", "trace"], default="bernoulli",
+            help="How packets are lost and corrupted: bernoulli, gilbert (in bursts) or trace (from --channel_trace)")
+        self.op.add_option(
+            "--burst_len",
+            metavar="X", type="float",
+            help="With the gilbert channel, losses come in bursts of X packets on average (default 4)")
+        self.op.add_option(
+            "--bad_loss",
+            metavar="X", type="float",
+            help="With the gilbert channel, the probability of losing a packet during a burst (default 1)")
+        self.op.add_option(
+            "--channel_trace",
+            metavar="FILE",
+            help="With the trace channel, read the fate of each packet from FILE, see channel_model.py")
         self.op.add_option(
             "--capture_log",
             action="store_true",
@@ -39,27 +89,90 @@ class GBNTester():
             "--seed",
             metavar="X", type="int",
             help="The seed to use for random generation")
+        self.op.add_option(
+            "--rng_substreams",
+            action="store_true",
+            help="Use separate random streams for arrivals, payloads, loss, delay and corruption")
+        self.op.add_option(
+            "--send_queue_size",
+            metavar="X", type="int",
+            help="The most application messages a host will queue while its window is full")
+        self.op.add_option(
+            "--send_queue_policy",
+            type="choice", choices=["block", "drop-oldest", "reject"], default="block",
+            help="What a host does with new data when its send queue is full: block, drop-oldest or reject")
+        self.op.add_option(
+            "--adaptive_rto",
+            action="store_true",
+            help="Adapt the timer interval to the measured round trip time. Meant for a link that keeps packets in order (--bandwidth or --prop_delay), on the default channel it is slower than the fixed timer")
+        self.op.add_option(
+            "--rto_reset_on_ack",
+            action="store_true",
+            help="With --adaptive_rto, drop the timeout backoff on any ACK that moves the window, not only on a valid RTT sample")
+        self.op.add_option(
+            "--fast_retransmit",
+            action="store_true",
+            help="Go back N as soon as the third duplicate ACK arrives instead of waiting for the timer")
+        self.op.add_option(
+            "--ack_every",
+            metavar="X", type="int",
+            help="Delay ACKs and only send one for every X packets received in order")
+        self.op.add_option(
+            "--ack_delay",
+            metavar="X", type="float",
+            help="Delay ACKs by at most X time units")
+        self.op.add_option(
+            "--piggyback",
+            action="store_true",
+            help="Send ACKs on outgoing data packets, holding them back for at most --ack_delay waiting for one")
+        self.op.add_option(
+            "--keep_events",
+            metavar="X", type="int",
+            help="Only keep the last X processed events in memory (0 keeps none)")
+        self.op.add_option(
+            "--trace_level",
+            type="choice", choices=["off", "summary", "packet", "full"], default="full",
+            help="How much of the simulation to log: off, summary, packet or full")
+        self.op.add_option(
+            "--trace_file",
+            metavar="FILE",
+            help="Write the simulation log to FILE instead of printing it")
+        self.op.add_option(
+            "--trace_ring",
+            metavar="X", type="int",
+            help="Keep only the last X log messages in memory instead of printing them")
+        self.op.add_option(
+            "--stream_check",
+            action="store_true",
+            help="Check in order, exactly once delivery while the simulation runs and stop at the first violation. "
+                 "Each message carries a 12 byte tag for it, so packets differ from a run without it")
+        self.op.add_option(
+            "--record_trace",
+            metavar="FILE",
+            help="Record a binary trace of the simulation to FILE (and FILE.payload), see binary_trace.py")
 
 
     def run_tests(self, tests):
         __location__ = os.path.realpath(os.path.join(os.getcwd(), os.path.dirname(__file__)))
-        if not os.path.exists(os.path.join(__location__, 'Logs')):
-            os.makedirs(os.path.join(__location__, 'Logs'))   
 
         results = []
         for test in tests:
             # Open the test file
             with open(os.path.join(__location__, 'tests', 'test_cases', '%s.cfg' % test), 'r') as fp:
                 test_config = json.load(fp)
-                # Redirect all output to a log file for this test
-                #with open(os.path.join(__location__, 'Logs', '%s.log' % test), 'w') as log:
-                passed, errors = self.run_test(None, test_config)
+                # With --capture_log all output is redirected to a log file for this test,
+                # otherwise no log file is written
+                if self.parse_test_options(test_config).capture_log:
+                    os.makedirs(os.path.join(__location__, 'Logs'), exist_ok=True)
+                    with open(os.path.join(__location__, 'Logs', '%s.log' % test), 'w') as log:
+                        passed, errors = self.run_test(log, test_config)
+                else:
+                    passed, errors = self.run_test(None, test_config)
                 results.append({
                     'test':test, 
                     'passed':passed, 
                     'errors':errors
                 })
-                #sys.stdout = sys.__stdout__
                 print("%s passed: %r" % (test, passed))
                 if errors:
                     print("%s\n" % errors)
@@ -67,16 +180,23 @@ class GBNTester():
 
     def run_test(self, log, test):
         try:
-            # https://stackoverflow.com/questions/16710076/python-split-a-string-respect-and-preserve-quotes
-            args = re.findall(r'(?:[^\s,"]|"(?:\\.|[^"])*")+', test["options"])
+            options = self.parse_test_options(test)
 
-            options, args = self.op.parse_args(args)
-            simulator = NetworkSimulator(options, self.RDTImpl)
-            
-            #if options.capture_log:
-            #    sys.stdout = log
+            trace_sink = None
+            if options.capture_log and log:
+                trace_sink = FileSink(log)
+            checker = self.stream_checker(options)
+            simulator = NetworkSimulator(options, self.RDTImpl, trace_sink, checker)
 
-            result = simulator.Simulate()
+            try:
+                result = simulator.Simulate()
+                if checker:
+                    checker.finish(simulator)
+            except DeliveryError as e:
+                return False, "event %i: %s" % (simulator.nprocessed, e)
+            finally:
+                # Keep the logs and the binary trace of a failed run intact for debugging it
+                simulator.close()
 
             return self.check_test_results(test, simulator, result)
             
@@ -84,11 +204,41 @@ class GBNTester():
             return False, e
 
 
+    # The StreamChecker for a run with --stream_check, or None
+    def stream_checker(self, options):
+        return checker_from_options(options)
+
+
+    # Parses the options string of a test config
+    def parse_test_options(self, test):
+        # https://stackoverflow.com/questions/16710076/python-split-a-string-respect-and-preserve-quotes
+        args = re.findall(r'(?:[^\s,"]|"(?:\\.|[^"])*")+', test["options"])
+        options, args = self.op.parse_args(args)
+        return options
+
+
+    # Builds an options object from a dictionary of option names and values, as if they had
+    # been given on the command line. Options that aren't in the dictionary get their defaults
+    def options_from_dict(self, values):
+        args = []
+        for name, value in values.items():
+            if value is True:
+                args.append("--%s" % name)
+            elif value is not None and value is not False:
+                args += ["--%s" % name, str(value)]
+        options, args = self.op.parse_args(args)
+        return options
+
+
     def check_test_results(self, test, simulator, result):
         problems = ""
-        problems += self.check_host(test['final_state']['A'], simulator.A)        
-        problems += self.check_host(test['final_state']['B'], simulator.B)
-        problems += self.check_simulator(test['final_state']['Simulator'], simulator)
+        if simulator.monitor:
+            problems += self.check_messages(test['final_state']['A'], simulator.A, simulator.monitor)
+            problems += self.check_messages(test['final_state']['B'], simulator.B, simulator.monitor)
+        else:
+            problems += self.check_host(test['final_state']['A'], simulator.A)
+            problems += self.check_host(test['final_state']['B'], simulator.B)
+            problems += self.check_simulator(test['final_state']['Simulator'], simulator)
         
         if not problems:
             return True, None
@@ -110,6 +260,19 @@ class GBNTester():
         return problems
 
 
+    # With --stream_check the data lists aren't kept and the checker has already seen the data
+    # delivered in order. Each message also carries the checker's tag, which changes where
+    # corruption lands and how long packets take on a link, so the packet counts of the config
+    # don't apply either. Only the number of messages is compared
+    def check_messages(self, test, host, checker):
+        problems = ""
+        
+        problems += self.find_problems_with_value(host.entity, "number of data sent", len(test['data_sent']), checker.sent[host.entity])
+        problems += self.find_problems_with_value(host.entity, "number of data received", len(test['data_received']), checker.delivered[host.entity])
+        
+        return problems
+
+
     def check_simulator(self, test, simulator):
         problems = ""
         
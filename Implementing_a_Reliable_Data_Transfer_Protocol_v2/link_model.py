@@ -0,0 +1,112 @@
+from collections import deque
+
+# A model of the link between the two hosts, used instead of the random delay when
+# --bandwidth or --prop_delay is given. Each direction is a Link of its own:
+#
+#   bandwidth    bytes the sender can put on the wire per unit of time. A packet of n bytes
+#                takes n / bandwidth to send, and the link sends one packet at a time, in
+#                the order they were passed to it. Without a bandwidth sending takes no time
+#   prop_delay   how long a bit takes to get from one end of the link to the other
+#   queue_size   how many packets can wait while another is being sent. A packet that
+#                arrives to a full queue is dropped (drop-tail). Without a size the queue
+#                grows as needed
+#
+# A packet arrives prop_delay after the last of its bytes has been sent, so the link never
+# reorders packets.
+class Link():
+    def __init__(self, bandwidth=None, prop_delay=0.0, queue_size=None):
+        if bandwidth is not None and bandwidth <= 0:
+            raise ValueError("the link bandwidth must be positive, not %r" % bandwidth)
+        if prop_delay < 0:
+            raise ValueError("the propagation delay can't be negative, not %r" % prop_delay)
+        if queue_size is not None and queue_size < 0:
+            raise ValueError("the queue size can't be negative, not %r" % queue_size)
+        self.bandwidth = bandwidth
+        self.prop_delay = prop_delay
+        self.queue_size = queue_size
+
+        self.departures = deque()       # When each packet waiting or being sent will be done
+        self.busy_until = 0.0           # When the last packet passed to the link will be done
+
+        # Counters for the results
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.busy_time = 0.0            # Total time spent sending
+        self.drops = 0                  # Packets dropped because the queue was full
+        self.max_queue = 0              # The most packets that were ever waiting at once
+
+    # Passes a packet of size bytes to the link at time now. Returns the time it arrives at
+    # the other end, or None if the queue was full and the packet was dropped
+    def transmit(self, now, size):
+        departures = self.departures
+        while departures and departures[0] <= now:
+            departures.popleft()
+
+        # One packet can be on the wire while queue_size more wait behind it
+        if self.queue_size is not None and len(departures) > self.queue_size:
+            self.drops += 1
+            return None
+
+        duration = size / self.bandwidth if self.bandwidth else 0.0
+        start = now if now > self.busy_until else self.busy_until
+        self.busy_until = start + duration
+        if duration:
+            departures.append(self.busy_until)
+            if len(departures) - 1 > self.max_queue:
+                self.max_queue = len(departures) - 1
+
+        self.packets_sent += 1
+        self.bytes_sent += size
+        self.busy_time += duration
+        return self.busy_until + self.prop_delay
+
+    # The share of the time up to elapsed that the link spent sending, or None if the link
+    # has no bandwidth
+    def utilization(self, elapsed):
+        if not self.bandwidth or elapsed <= 0:
+            return None
+        return self.busy_time / elapsed
+
+
+# The links for each direction asked for on the command line, indexed by the sending
+# EventEntity, or None if the link isn't modelled. Packets only wait in the queue while the
+# link is busy sending, so a queue size without a bandwidth is refused
+def links_from_options(options):
+    bandwidth = getattr(options, "bandwidth", None)
+    prop_delay = getattr(options, "prop_delay", None)
+    queue_size = getattr(options, "queue_size", None)
+    if queue_size is not None and bandwidth is None:
+        raise ValueError("--queue_size needs a --bandwidth, without one no packet ever waits")
+    if bandwidth is None and prop_delay is None:
+        return None
+    return [Link(bandwidth, prop_delay or 0.0, queue_size) for _ in range(2)]
+
+
+# Application data delivered per unit of time, in bytes, up to the last delivery. Text
+# messages are counted as the bytes they were sent as
+def goodput(simulator, entity=None):
+    hosts = simulator.hosts if entity is None else [simulator.hosts[entity]]
+    to_bytes = simulator.app_payloads.to_bytes
+    delivered = sum(len(to_bytes(data)) for host in hosts for data in host.data_received)
+    return delivered / simulator.last_delivery if simulator.last_delivery > 0 else 0.0
+
+
+# The results of a run for each direction, keyed by the sending entity's name: the goodput
+# to the other end, and if the link was modelled its utilization, the packets and bytes it
+# carried and what its queue did
+def link_report(simulator):
+    report = {}
+    for entity, host in enumerate(simulator.hosts):
+        other = 1 - entity
+        result = {"goodput": goodput(simulator, other)}
+        if simulator.links is not None:
+            link = simulator.links[entity]
+            result.update({
+                "utilization": link.utilization(simulator.time),
+                "packets": link.packets_sent,
+                "bytes": link.bytes_sent,
+                "queue_drops": link.drops,
+                "max_queue": link.max_queue,
+            })
+        report[host.entity.name] = result
+    return report
@@ -1,14 +1,37 @@
-import sys, copy, random, logging, struct
-from enum import Enum, IntEnum
+import sys, random, logging, heapq, itertools
+from collections import deque
+from enum import IntEnum
+from gbn_packet import parse_header, payload_view, MORE_SEGMENTS
+from sim_trace import TraceLevel, TraceRecord, sink_from_options
+from send_queue import BLOCKED, REJECTED, send_queue_report
+from binary_trace import recorder_from_options, as_bytes, TO_NETWORK, TO_APPLICATION
+from link_model import links_from_options, link_report
+from channel_model import channel_from_options
+from app_payload import payloads_from_options, BinaryPayloads
 
 class NetworkSimulator():
 
     # *********************** Simulator routines ***********************
     # ************ DO NOT CALL ANY ROUTINES IN THIS SECTION ************
     # *********** ROUTINES FOR STUDENT USE CAN BE FOUND BELOW **********
-    def __init__(self, options, RDTHost):
+    def __init__(self, options, RDTHost, trace_sink=None, monitor=None):
         self.continue_simulation = True
+
+        # Pending events are kept in a heap of (evtime, sequence, event) entries. The sequence
+        # number breaks ties so events scheduled for the same time run in insertion order
         self.event_list = []
+        self.event_seq = itertools.count()
+
+        # The pending timer event for each entity, so timers can be cancelled without a scan
+        self.timers = {}
+        self.ack_timers = {}        # The same for the ACK timers, see start_ack_timer()
+
+        # The latest scheduled arrival time of packets on their way to each entity. Once the
+        # simulation time passes it, every one of those packets has been delivered
+        self.last_arrival = {
+            EventEntity.A: 0.0,
+            EventEntity.B: 0.0,
+        }
 
         # Configuration for the packet simulation
         self.max_events = options.num_pkts              # number of msgs to generate, then stop
@@ -16,6 +39,20 @@ class NetworkSimulator():
         self.lossprob = options.loss_prob               # probability that a packet is dropped
         self.corruptprob = options.corrupt_prob         # probability that one bit is packet is flipped
         self.arrival_rate = options.arrival_rate        # arrival rate of messages from layer 5
+        self.window_size = getattr(options, "window_size", None)        # window size of both hosts
+        if self.window_size is None:
+            self.window_size = 5
+        elif self.window_size < 1:
+            raise ValueError("the window size must be at least 1 packet, not %i" % self.window_size)
+
+        # Hosts send and deliver bytes. This turns the applications' data into bytes and back,
+        # see app_payload.py. Binary payloads are 1 to payload_size bytes long
+        self.app_payloads = payloads_from_options(options)
+        self.payload_size = getattr(options, "payload_size", None) or 64
+
+        # With --bandwidth or --prop_delay packets cross a modelled link, one per direction
+        # indexed by the sender, instead of arriving after a random delay. See link_model.py
+        self.links = links_from_options(options)
 
         # Record statistics of what has happened to packets in our simulated network
         self.num_events = 0
@@ -24,13 +61,61 @@ class NetworkSimulator():
         self.ntolayer3 = 0      # number sent into layer 3
         self.nlost = 0          # number lost in media
         self.ncorrupt = 0       # number corrupted by media
+        self.nprocessed = 0     # number of events processed
+        self.nrejected = 0      # number of msgs from layer 5 a host refused
+        self.nqueue_drops = 0   # number dropped because a link's queue was full
+        self.last_delivery = 0.0    # the time data was last passed up to an application layer
+        
+        # Application data a host refused with BLOCKED, waiting to be offered again. Nothing
+        # bounds it, so the most it ever held is kept for the send queue report
+        self.app_backlog = [deque(), deque()]
+        self.max_backlog = [0, 0]
+
+        # Hosts can read their own settings from here, see host_option()
+        self.options = options
         
-        # If we specify a seed, initialize random with it
-        if options.seed:
-            random.seed(options.seed)
+        # Tracing. Records below the trace level are never created, and records that are created
+        # are only formatted if the sink actually uses them
+        self.trace_level = int(TraceLevel[getattr(options, "trace_level", "full").upper()])
+        self.trace_sink = trace_sink if trace_sink is not None else sink_from_options(options)
+
+        # With --record_trace every event a host handles and everything it hands back is also
+        # written to a binary trace, see binary_trace.py
+        self.recorder = recorder_from_options(options)
+
+        # An optional checker of the application data, e.g. a StreamChecker. Data from an
+        # application goes through its data_sent() on the way to the host and data a host passes
+        # up through data_delivered(), and each returns the bytes to carry on with. It checks
+        # delivery as the run goes, so the data lists of the hosts aren't kept alongside it
+        self.monitor = monitor
+        self.keep_data = monitor is None
+
+        # Each simulator owns its random number generator, so several simulators can run in the
+        # same process without disturbing each other. If we specify a seed, initialize it with that
+        self.rng = random.Random(options.seed)
+
+        # By default every random draw comes from the one generator, which is what the test
+        # configs expect. With --rng_substreams each part of the simulation gets its own
+        # generator, so that e.g. changing the loss probability doesn't shift the arrivals
+        if getattr(options, "rng_substreams", False):
+            self.arrival_rng = random.Random(self.rng.getrandbits(64))
+            self.payload_rng = random.Random(self.rng.getrandbits(64))
+            self.loss_rng = random.Random(self.rng.getrandbits(64))
+            self.delay_rng = random.Random(self.rng.getrandbits(64))
+            self.corrupt_rng = random.Random(self.rng.getrandbits(64))
+        else:
+            self.arrival_rng = self.rng
+            self.payload_rng = self.rng
+            self.loss_rng = self.rng
+            self.delay_rng = self.rng
+            self.corrupt_rng = self.rng
+
+        # Which packets are lost or corrupted is decided by the channel model, chosen with
+        # --channel. See channel_model.py
+        self.channel = channel_from_options(options, self.loss_rng, self.corrupt_rng)
 
         # Create the two hosts we will be simulating
-        self.A = RDTHost(self, EventEntity.A, self.timer_interval, 5)
+        self.A = RDTHost(self, EventEntity.A, self.timer_interval, self.window_size)
         # These variables will be used by the testing suite
         self.A.num_data_sent = 0
         self.A.num_ack_sent = 0
@@ -39,7 +124,7 @@ class NetworkSimulator():
         self.A.data_sent = []
         self.A.data_received = []
                
-        self.B = RDTHost(self, EventEntity.B, self.timer_interval, 5)
+        self.B = RDTHost(self, EventEntity.B, self.timer_interval, self.window_size)
         self.B.num_data_sent = 0
         self.B.num_ack_sent = 0
         self.B.num_data_received = 0
@@ -51,61 +136,179 @@ class NetworkSimulator():
             EventEntity.A: self.A,
             EventEntity.B: self.B,
         }
+        self.hosts = [self.A, self.B]       # The same hosts, indexed by EventEntity
+
+        # Each event type is handled by its own method. The list is indexed by EventType
+        self.handlers = [None, None, None, None, None]
+        self.handlers[EventType.FROM_LAYER5] = self.handle_from_layer5
+        self.handlers[EventType.FROM_LAYER3] = self.handle_from_layer3
+        self.handlers[EventType.TIMER_INTERRUPT] = self.handle_timer_interrupt
+        self.handlers[EventType.ACK_TIMER_INTERRUPT] = self.handle_ack_timer_interrupt
+
+        # Processed events are returned by Simulate(). By default all of them are kept, with
+        # --keep_events only the last X are (or none, if X is 0)
+        keep_events = getattr(options, "keep_events", None)
+        if keep_events is None:
+            self.events = []
+        elif keep_events > 0:
+            self.events = deque(maxlen=keep_events)
+        else:
+            self.events = None
 
         # Generate the first event
         self.generate_next_arrival()
 
 
     def Simulate(self):
-        print("-----  Sliding Window Network Simulator Version -------- \n")
-
-        events = []
-
-        while self.continue_simulation:
-            # Check to see if we have any more events to simulate
-            if len(self.event_list) == 0:
-                self.continue_simulation = False
-                #self.trace("Simulator terminated at time {} after sending {} msgs from layer5\n".format(self.time, self.nsim), 0)
-                print("Simulator terminated at time {} after sending {} msgs from layer5\n".format(self.time, self.nsim))
-            else:
-                # Get the next event to simulate
-                cur_event = self.event_list.pop(0)
-                events.append(cur_event)
+        self.print_message("-----  Sliding Window Network Simulator Version -------- \n")
+        self.run()
+        # The full event list is returned as it is rather than copied, since it can hold
+        # millions of events. Only the bounded deque of --keep_events is turned into a list
+        if self.events is None:
+            return []
+        if isinstance(self.events, list):
+            return self.events
+        return list(self.events)
+
+
+    # Flushes and closes the trace sink and the binary trace recorder. This is done when the
+    # simulation ends, and is safe to call again if it was stopped early
+    def close(self):
+        self.trace_sink.close()
+        if self.recorder:
+            self.recorder.close()
+
+
+    # Processes events until none are left, the next event is later than until_time, or
+    # max_events events have been processed, whichever comes first. Returns the number of
+    # events processed. A simulation can be run in steps by calling this repeatedly
+    def run(self, until_time=None, max_events=None):
+        event_list = self.event_list
+        handlers = self.handlers
+        events = self.events
+        heappop = heapq.heappop
+        processed = 0
+
+        # nprocessed is brought up to date even if a handler raises, so it tells which event failed
+        try:
+            while self.continue_simulation:
+                # Check to see if we have any more events to simulate
+                if len(event_list) == 0:
+                    self.continue_simulation = False
+                    #self.trace("Simulator terminated at time {} after sending {} msgs from layer5\n".format(self.time, self.nsim), 0)
+                    self.print_message("Simulator terminated at time %s after sending %i msgs from layer5\n", self.time, self.nsim)
+                    if self.links is not None:
+                        self.print_link_report()
+                    if getattr(self.options, "send_queue_size", None) is not None:
+                        self.print_send_queue_report()
+                    self.close()
+                    break
+                if max_events is not None and processed >= max_events:
+                    break
+                if until_time is not None and event_list[0][0] > until_time:
+                    break
+
+                # Get the next event to simulate, skipping any timers that have been stopped
+                cur_event = heappop(event_list)[2]
+                if cur_event.cancelled:
+                    continue
+                if events is not None:
+                    events.append(cur_event)
+                processed += 1
 
                 # update our time value to the time of the next event
-                self.time = cur_event.evtime 
-
-                # This is an event containing new data from the application layer
-                if cur_event.evtype == EventType.FROM_LAYER5:
-                    # Set up the next packet to arrive after this one
-                    self.generate_next_arrival()
+                self.time = cur_event.evtime
+                handlers[cur_event.evtype](cur_event)
+        finally:
+            self.nprocessed += processed
+        return processed
 
-                    payload = self.generate_payload()
 
-                    # Incrememnt the number of packets that have been simulated
-                    self.nsim += 1
-
-                    # Log this event
-                    self.Host[cur_event.eventity].data_sent.append(payload)
-                    self.print_entity_message(cur_event.eventity, "Rcvd from Application Layer: %s" % payload, None)
+    # This is an event containing new data from the application layer
+    def handle_from_layer5(self, cur_event):
+        # Set up the next packet to arrive after this one
+        self.generate_next_arrival()
 
-                    # Send this message to the assigned host
-                    self.Host[cur_event.eventity].receive_from_application_layer(payload)
+        payload = self.generate_payload()
+        self.from_application_layer(cur_event.eventity, payload)
 
-                # This is an event being passed up from the network layer
-                elif cur_event.evtype == EventType.FROM_LAYER3:
-                    # Log this event
-                    self.print_entity_message(cur_event.eventity, "Rcvd from Network Layer", cur_event.pkt)
 
-                    # Send this message to the assigned host
-                    self.Host[cur_event.eventity].receive_from_network_layer(cur_event.pkt)
+    # New data from the application layer for an entity
+    def from_application_layer(self, entity, payload):
+        # Incrememnt the number of packets that have been simulated
+        self.nsim += 1
 
-                # This is a timer interrupt event
-                elif cur_event.evtype == EventType.TIMER_INTERRUPT:
-                    self.print_entity_message(cur_event.eventity, "Timer Interrupt", None)
-                    self.Host[cur_event.eventity].timer_interrupt()
-            
-        return events
+        # Log this event
+        host = self.hosts[entity]
+        if self.keep_data:
+            host.data_sent.append(payload)
+        self.print_entity_message(entity, "Rcvd from Application Layer: %s", None, payload)
+        data = self.app_payloads.to_bytes(payload)
+        if self.recorder:
+            self.recorder.append(self.time, entity, EventType.FROM_LAYER5, data)
+        if self.monitor:
+            data = self.monitor.data_sent(entity, data)
+
+        # Send this message to the assigned host. If earlier data is still waiting because the
+        # host blocked, this message has to wait behind it
+        backlog = self.app_backlog[entity]
+        if backlog or not self.offer_to_host(entity, data):
+            backlog.append(data)
+            if len(backlog) > self.max_backlog[entity]:
+                self.max_backlog[entity] = len(backlog)
+
+
+    # This is an event being passed up from the network layer
+    def handle_from_layer3(self, cur_event):
+        # Log this event
+        self.print_entity_message(cur_event.eventity, "Rcvd from Network Layer", cur_event.pkt)
+        if self.recorder:
+            self.recorder.append(self.time, cur_event.eventity, EventType.FROM_LAYER3, cur_event.pkt)
+
+        # Send this message to the assigned host
+        self.hosts[cur_event.eventity].receive_from_network_layer(cur_event.pkt)
+        if self.app_backlog[cur_event.eventity]:
+            self.drain_backlog(cur_event.eventity)
+
+
+    # This is a timer interrupt event
+    def handle_timer_interrupt(self, cur_event):
+        self.timers.pop(cur_event.eventity, None)
+        self.print_entity_message(cur_event.eventity, "Timer Interrupt", None, level=TraceLevel.FULL)
+        if self.recorder:
+            self.recorder.append(self.time, cur_event.eventity, EventType.TIMER_INTERRUPT)
+        self.hosts[cur_event.eventity].timer_interrupt()
+        if self.app_backlog[cur_event.eventity]:
+            self.drain_backlog(cur_event.eventity)
+
+
+    # This is an ACK timer interrupt event. ACKs don't touch the send window, so the backlog
+    # can't move
+    def handle_ack_timer_interrupt(self, cur_event):
+        self.ack_timers.pop(cur_event.eventity, None)
+        self.print_entity_message(cur_event.eventity, "ACK Timer Interrupt", None, level=TraceLevel.FULL)
+        if self.recorder:
+            self.recorder.append(self.time, cur_event.eventity, EventType.ACK_TIMER_INTERRUPT)
+        self.hosts[cur_event.eventity].ack_timer_interrupt()
+
+
+    # Gives application data to a host. Returns False if the host blocked and the payload has
+    # to be offered again later
+    def offer_to_host(self, entity, payload):
+        status = self.hosts[entity].receive_from_application_layer(payload)
+        if status == BLOCKED:
+            return False
+        if status == REJECTED:
+            self.nrejected += 1
+            self.print_entity_message(entity, "Application Layer data rejected: %s", None, payload)
+        return True
+
+
+    # Offers data that was blocked to the host again, in order, until it blocks again
+    def drain_backlog(self, entity):
+        backlog = self.app_backlog[entity]
+        while backlog and self.offer_to_host(entity, backlog[0]):
+            backlog.popleft()
 
 
     def opposite_entity(self, entity):
@@ -117,12 +320,13 @@ class NetworkSimulator():
     def unpack_pkt(self, byte_data):
         try:
             # First, unpack the fixed length header
-            header = struct.unpack("!HiHI", byte_data[:12])
+            header = parse_header(byte_data)
             
             # Check to see if the length of the packet is greater
-            # than zero. If so, unpack the payload
-            if header[3] > 0:
-                payload = struct.unpack("!%is"%header[3], byte_data[12:])[0].decode()
+            # than zero. If so, unpack the payload. It stays a view into the packet and is
+            # only turned into text if the trace is formatted
+            if header.length > 0:
+                payload = payload_view(byte_data, header)
             else:
                 payload = None
 
@@ -132,30 +336,64 @@ class NetworkSimulator():
             return None
 
     
-    def print_entity_message(self, entity, message, bytes):
-        msg = "{} @ {:.4f}: {}".format(entity.name, self.time, message)
-
-        if bytes:
-            pkt = self.unpack_pkt(bytes)
-            if pkt:
-                type = "Data"
-                if pkt.pkt_type == 0:
-                    type = "ACK"
-                msg += ": [TYPE: %s, NUM: %i, CKSUM: %i, LEN: %i" % (type, pkt.pkt_number, pkt.checksum, pkt.length)
-                #msg += ": [SEQ: %i, ACK: %i, ACK_FLAG: %s, CKSUM: %i, LEN: %i" % (pkt.seqnum, pkt.acknum, str(pkt.ackflag), pkt.checksum, pkt.length)
-                if pkt.length > 0:
-                    msg += ", PAYLOAD: %s]" % pkt.payload
-                else:
-                    msg += "]"
-
-        print(msg)
+    # Hands a trace message to the trace sink. The message is a %-format string filled in
+    # from args, and bytes is an optional packet to describe after it. Nothing is formatted
+    # or unpacked here, and nothing happens at all if the trace level is below level
+    def print_entity_message(self, entity, message, bytes, *args, level=TraceLevel.PACKET):
+        if level <= self.trace_level:
+            self.trace_sink.write(TraceRecord(level, entity, self.time, message, args, bytes, self.describe_pkt))
+
+
+    # Trace messages that don't belong to an entity, such as the start and end of the simulation
+    def print_message(self, message, *args, level=TraceLevel.SUMMARY):
+        if level <= self.trace_level:
+            self.trace_sink.write(TraceRecord(level, None, self.time, message, args))
+
+
+    # The send queue counters of each host, at the end of a run with --send_queue_size
+    def print_send_queue_report(self):
+        for name, result in send_queue_report(self).items():
+            self.print_message("%s: send queue took %i messages, at most %i queued, %i dropped, %i rejected, blocked %i times, at most %i held back by the simulator\n",
+                               name, result["enqueued"], result["max_depth"], result["dropped"], result["rejected"],
+                               result["blocked"], result["max_backlog"])
+
+    # Goodput and link utilization in each direction, at the end of a run with a modelled link
+    def print_link_report(self):
+        for name, result in link_report(self).items():
+            utilization = result["utilization"]
+            self.print_message("%s: goodput %.2f bytes/time, link utilization %s, %i packets (%i bytes) sent, %i dropped by a full queue, at most %i queued\n",
+                               name, result["goodput"], "-" if utilization is None else "%.1f%%" % (100.0 * utilization),
+                               result["packets"], result["bytes"], result["queue_drops"], result["max_queue"])
+
+
+    def describe_pkt(self, bytes):
+        msg = ""
+        pkt = self.unpack_pkt(bytes)
+        if pkt:
+            type = "Data"
+            if pkt.pkt_type == 0:
+                type = "ACK"
+            msg += ": [TYPE: %s, NUM: %i, CKSUM: %i, LEN: %i" % (type, pkt.pkt_number, pkt.checksum, pkt.length)
+            if pkt.ack_number is not None:
+                msg += ", ACK: %i" % pkt.ack_number
+            if pkt.pkt_type & MORE_SEGMENTS:
+                msg += ", MORE"
+            #msg += ": [SEQ: %i, ACK: %i, ACK_FLAG: %s, CKSUM: %i, LEN: %i" % (pkt.seqnum, pkt.acknum, str(pkt.ackflag), pkt.checksum, pkt.length)
+            if pkt.length > 0:
+                msg += ", PAYLOAD: %s]" % self.app_payloads.describe(pkt.payload)
+            else:
+                msg += "]"
+        return msg
 
 
     def generate_payload(self):
+        if isinstance(self.app_payloads, BinaryPayloads):
+            return self.payload_rng.randbytes(self.payload_rng.randint(1, self.payload_size))
+
         # Create a simulated message for this packet
         j = self.nsim % 26
         msg2give = ""
-        length = random.randint(2, 5)
+        length = self.payload_rng.randint(2, 5)
         for i in range(0,length):
             msg2give += chr(97 + j)
         return msg2give
@@ -169,14 +407,14 @@ class NetworkSimulator():
             new_event = SimulatedEvent()
 
             # Determine when this simulated event will occur
-            x = self.arrival_rate*random.uniform(0.0, 1.0)*2  # x is uniform on [0,2*lambda], having mean of lambda
+            x = self.arrival_rate*self.arrival_rng.uniform(0.0, 1.0)*2  # x is uniform on [0,2*lambda], having mean of lambda
             new_event.evtime = self.time + x
 
             # Specify that this event is coming from the application layer
             new_event.evtype = EventType.FROM_LAYER5
 
             # Determine which host is receiving this event, A or B
-            if random.uniform(0.0, 1.0) > 0.5:
+            if self.arrival_rng.uniform(0.0, 1.0) > 0.5:
                 new_event.eventity = EventEntity.A
             else:
                 new_event.eventity = EventEntity.B
@@ -186,25 +424,12 @@ class NetworkSimulator():
 
 
     def insert_event(self, new_event):
-        # If queue is empty, add as head and don't connect any adjacent events
-        if len(self.event_list) == 0:
-            self.event_list.append(new_event)
-        else:
-            # check to see if this event occurs before the first element
-            if new_event.evtime < self.event_list[0].evtime:
-                self.event_list.insert(0, new_event)
-            # check to see if this event occurs after the last element\
-            elif new_event.evtime > self.event_list[-1].evtime:
-                self.event_list.append(new_event)
-            else:
-                for idx, e in enumerate(self.event_list):
-                    if new_event.evtime < e.evtime:
-                        self.event_list.insert(idx, new_event)
-                        break
+        # Events with the same time are ordered by when they were inserted
+        heapq.heappush(self.event_list, (new_event.evtime, next(self.event_seq), new_event))
 
 
     def print_event_list(self, trace_level):
-        for e in self.event_list:
+        for _, _, e in sorted(self.event_list):
             #self.trace("Event time: {}, type: {} entity: {}".format(e.evtime, e.evtype, e.eventity),trace_level)
             pass
 
@@ -216,32 +441,49 @@ class NetworkSimulator():
     
 
     def stop_timer(self, entity):
-        for idx, e in enumerate(self.event_list):
-            if e.eventity == entity:
-                if e.evtype == EventType.TIMER_INTERRUPT:
-                    self.event_list.pop(idx)    # Remove the first timer event associated with this entity
-                    self.print_entity_message(entity, "Stopping Timer", None)
-                    return
-                else:
-                    # No timer event to stop
-                    pass
-        self.print_entity_message(entity, "ERROR: ATTEMPTED TO STOP A TIMER BUT NONE WERE RUNNING", None)
+        timer = self.timers.pop(entity, None)
+        if timer:
+            timer.cancelled = True      # The event stays in the heap and is skipped when it is popped
+            self.print_entity_message(entity, "Stopping Timer", None, level=TraceLevel.FULL)
+            return
+        self.print_entity_message(entity, "ERROR: ATTEMPTED TO STOP A TIMER BUT NONE WERE RUNNING", None, level=TraceLevel.SUMMARY)
         
 
 
     def start_timer(self, entity, increment):
         # Check to see if a timer has already been started
-        for e in self.event_list:
-            if e.evtype == EventType.TIMER_INTERRUPT and e.eventity == entity:
-                self.print_entity_message(entity, "ERROR: ATTEMPTED TO START TIMER WHILE ONE IS ALREADY RUNNING", None)
-                return
+        if entity in self.timers:
+            self.print_entity_message(entity, "ERROR: ATTEMPTED TO START TIMER WHILE ONE IS ALREADY RUNNING", None, level=TraceLevel.SUMMARY)
+            return
+
+        self.print_entity_message(entity, "Starting Timer", None, level=TraceLevel.FULL)
+
+        new_event = SimulatedEvent(self.time + increment, EventType.TIMER_INTERRUPT, entity)
+        self.timers[entity] = new_event
+        self.insert_event(new_event)
+
+
+
+    # A second timer for each entity, separate from the retransmission timer, for hosts that
+    # hold ACKs back for a while. When it runs out the host's ack_timer_interrupt() is called
+    def stop_ack_timer(self, entity):
+        timer = self.ack_timers.pop(entity, None)
+        if timer:
+            timer.cancelled = True
+            self.print_entity_message(entity, "Stopping ACK Timer", None, level=TraceLevel.FULL)
+            return
+        self.print_entity_message(entity, "ERROR: ATTEMPTED TO STOP AN ACK TIMER BUT NONE WERE RUNNING", None, level=TraceLevel.SUMMARY)
+
+
+    def start_ack_timer(self, entity, increment):
+        if entity in self.ack_timers:
+            self.print_entity_message(entity, "ERROR: ATTEMPTED TO START ACK TIMER WHILE ONE IS ALREADY RUNNING", None, level=TraceLevel.SUMMARY)
+            return
 
-        self.print_entity_message(entity, "Starting Timer", None)
+        self.print_entity_message(entity, "Starting ACK Timer", None, level=TraceLevel.FULL)
 
-        new_event = SimulatedEvent()
-        new_event.evtime = self.time + increment
-        new_event.evtype = EventType.TIMER_INTERRUPT
-        new_event.eventity = entity
+        new_event = SimulatedEvent(self.time + increment, EventType.ACK_TIMER_INTERRUPT, entity)
+        self.ack_timers[entity] = new_event
         self.insert_event(new_event)
 
 
@@ -255,9 +497,20 @@ class NetworkSimulator():
             self.Host[entity].num_data_sent += 1
 
         self.print_entity_message(entity, "Passing to Network Layer", packet)
+        if self.recorder:
+            self.recorder.append(self.time, entity, TO_NETWORK, packet)
+
+        # A modelled link drops the packet if its queue is full. Otherwise the packet takes up
+        # the link whether or not it is lost on the way
+        if self.links is not None:
+            arrival = self.links[entity].transmit(self.time, len(packet))
+            if arrival is None:
+                self.nqueue_drops += 1
+                self.print_entity_message(entity, "QUEUE FULL, DROPPING PACKET!", None)
+                return
 
         # Simulate losses
-        if random.uniform(0.0, 1.0) < self.lossprob:
+        if self.channel.lost(entity):
             self.nlost += 1
             self.print_entity_message(entity, "LOSING PACKET!", None)
             #self.trace("TOLAYER3: PACKET BEING LOST", 0)
@@ -269,80 +522,107 @@ class NetworkSimulator():
             self.Host[self.opposite_entity(entity)].num_data_received += 1
 
         # make a copy of the packet student just gave me since he/she may decide
-        # to do something with the packet after we return back to him/her
-        pkt = copy.deepcopy(packet)
-        try:
-            #self.trace("TOLAYER3: seq: {}, ack {}, check: {}, {}".format(pkt.seqnum, pkt.acknum, pkt.checksum, pkt.payload), 2)
-            pass
-        except Exception as e:
-            pass
+        # to do something with the packet after we return back to him/her. Immutable bytes
+        # can't be changed, so those are shared as they are and only mutable buffers are copied
+        if isinstance(packet, bytes):
+            pkt = packet
+        else:
+            pkt = bytes(packet)
 
-        new_event = SimulatedEvent()
-        new_event.evtype = EventType.FROM_LAYER3
-        new_event.eventity = EventEntity((int(entity)+1) % 2)     # event occurs at the other entity
-        new_event.pkt = pkt
+        new_event = SimulatedEvent(0, EventType.FROM_LAYER3, OTHER_ENTITY[entity], pkt)     # event occurs at the other entity
 
         # finally, compute the arrival time of packet at the other end.
         # medium can not reorder, so make sure packet arrives between 1 and 10
         # time units after the latest arrival time of packets
         # currently in the medium on their way to the destination
-        last_time = self.time
-        for e in self.event_list:
-            if e.evtype == EventType.FROM_LAYER3 and e.eventity == entity:
-                last_time = e.evtime
-        new_event.evtime = last_time + 0.1 + 0.9*random.uniform(0.0, 1.0)
+        # Note: this has always looked at the packets on their way to the sending entity, and
+        # is kept that way so existing seeds still produce the same traces
+        if self.links is not None:
+            new_event.evtime = arrival
+        else:
+            last_time = max(self.time, self.last_arrival[entity])
+            new_event.evtime = last_time + 0.1 + 0.9*self.delay_rng.uniform(0.0, 1.0)
 
         # simulate corruption
-        if random.uniform(0.0, 1.0) < self.corruptprob:
+        if self.channel.corrupted(entity):
             self.ncorrupt += 1
             self.print_entity_message(entity, "CORRUPTING PACKET!", None)
 
-            # Flip a random bit
-            bytenum = random.randint(0, len(pkt)-1)
-            bitnum = random.randint(0, 7)
+            # Flip a random bit. The altered copy is only ever seen by the receiving host, so
+            # it is delivered as it is rather than being copied again into bytes
+            bytenum = self.corrupt_rng.randint(0, len(pkt)-1)
+            bitnum = self.corrupt_rng.randint(0, 7)
             values = bytearray(pkt)
-            altered_value = values[bytenum]
-            bit_mask = 1 << bitnum
-            values[bytenum] = altered_value ^ bit_mask
-            new_event.pkt = bytes(values)
+            values[bytenum] ^= 1 << bitnum
+            new_event.pkt = values
 
         #self.trace("TOLAYER3: scheduling arrival on other side", 2)
+        if new_event.evtime > self.last_arrival[new_event.eventity]:
+            self.last_arrival[new_event.eventity] = new_event.evtime
         self.insert_event(new_event)
 
 
+    # data is the bytes of the payload, or a view of them in the packet they arrived in
     def pass_to_application_layer(self, entity, data):
         # Log this event
-        self.Host[entity].data_received.append(data)
-        self.print_entity_message(entity, "Passing to Application Layer: %s" % data, None)
+        if self.recorder:
+            self.recorder.append(self.time, entity, TO_APPLICATION, as_bytes(data))
+        if self.monitor:
+            data = self.monitor.data_delivered(entity, data, self.time)
+        payload = self.app_payloads.from_bytes(data)
+        if self.keep_data:
+            self.Host[entity].data_received.append(payload)
+        self.last_delivery = self.time
+        self.print_entity_message(entity, "Passing to Application Layer: %s", None, payload)
     
 
+# Events are created for every packet and timer, so they use __slots__ rather than a
+# per-instance dictionary
 class SimulatedEvent():
-    def __init__(self):
-        self.evtime = 0
-        self.evtype = None
-        self.eventity = None
-        self.pkt = None
-        self.previous_event = None
-        self.next_event = None
+    __slots__ = ("evtime", "evtype", "eventity", "pkt", "cancelled")
+
+    def __init__(self, evtime=0, evtype=None, eventity=None, pkt=None):
+        self.evtime = evtime
+        self.evtype = evtype
+        self.eventity = eventity
+        self.pkt = pkt
+        self.cancelled = False
 
 
 
 class Packet():
+    __slots__ = ("pkt_type", "pkt_number", "checksum", "length", "ack_number", "payload", "bytes")
+
     def __init__(self, header, payload, bytes):
-        self.pkt_type = header[0]
-        self.pkt_number = header[1]
-        self.checksum = header[2]
-        self.length = header[3]
+        self.pkt_type = header.pkt_type
+        self.pkt_number = header.pkt_number
+        self.checksum = header.checksum
+        self.length = header.length
+        self.ack_number = header.ack_number
         self.payload = payload
         self.bytes = bytes
         
 
-class EventType(Enum):
+# Looks up a setting for a host. Hosts are built with a fixed set of arguments, so anything
+# else they can be configured with is read from the simulator's options. Returns default
+# if there is no simulator (as in some tests) or the option wasn't given
+def host_option(simulator, name, default):
+    value = getattr(getattr(simulator, "options", None), name, None)
+    return default if value is None else value
+
+
+# Both enums are ints, so they can index lists and compare as cheaply as plain ints
+class EventType(IntEnum):
     FROM_LAYER5 = 1
     FROM_LAYER3 = 2
     TIMER_INTERRUPT = 3
+    ACK_TIMER_INTERRUPT = 4
 
 
 class EventEntity(IntEnum):
     A = 0
-    B = 1
\ No newline at end of file
+    B = 1
+
+
+# The entity at the other end of the link, indexed by EventEntity
+OTHER_ENTITY = (EventEntity.B, EventEntity.A)
\ No newline at end of file
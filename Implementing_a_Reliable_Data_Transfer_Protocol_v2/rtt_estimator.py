@@ -0,0 +1,54 @@
+# Estimates the round trip time from ACKs and derives the retransmission timeout from it,
+# following RFC 6298:
+#
+#   first sample R:  SRTT = R, RTTVAR = R/2
+#   later samples:   RTTVAR = 3/4 RTTVAR + 1/4 |SRTT - R|,  SRTT = 7/8 SRTT + 1/8 R
+#   RTO = SRTT + 4 RTTVAR, kept between min_rto and max_rto
+#
+# Samples must only come from packets that were sent once (Karn's algorithm), since an ACK
+# for a retransmitted packet can't be matched to the send it answers. Every timeout doubles
+# the RTO, and the doubled RTO is kept until the next valid sample. The simulated channel
+# reorders packets, which Go-Back-N treats as loss, so valid samples can stay rare for a long
+# time. The RTO therefore goes back to initial_rto after max_stale_timeouts timeouts without
+# a valid sample, throwing away any estimate (RFC 6298 allows this), since by then it is most
+# likely out of date. That also happens if there never was a sample. The RTO is capped at
+# max_rto, by default 4 times initial_rto, so a run of timeouts can't stall recovery for
+# long. A host can also call reset_backoff() itself to drop the doubling sooner (see
+# --rto_reset_on_ack).
+class RttEstimator():
+    def __init__(self, initial_rto, min_rto=0.2, max_rto=None, max_stale_timeouts=3):
+        self.initial_rto = initial_rto
+        self.rto = initial_rto
+        self.min_rto = min_rto
+        self.max_rto = max_rto if max_rto is not None else initial_rto * 4
+        self.srtt = None
+        self.rttvar = None
+        self.max_stale_timeouts = max_stale_timeouts
+        self.samples = 0
+        self.stale_timeouts = 0                 # Timeouts since the last valid sample
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+        self.samples += 1
+        self.stale_timeouts = 0
+        self.reset_backoff()
+
+    # The RTO from the current estimate, without any backoff
+    def reset_backoff(self):
+        if self.srtt is None:
+            self.rto = self.initial_rto
+        else:
+            self.rto = min(max(self.srtt + 4 * self.rttvar, self.min_rto), self.max_rto)
+
+    def backoff(self):
+        self.stale_timeouts += 1
+        if self.stale_timeouts >= self.max_stale_timeouts:
+            self.srtt = None
+            self.rttvar = None
+            self.rto = self.initial_rto
+        self.rto = min(self.rto * 2, self.max_rto)
@@ -0,0 +1,89 @@
+from collections import deque
+
+# The queue a host keeps of application data that is waiting for room in the send window.
+# Payloads leave in the order they arrived. The queue can be given a capacity, and a policy
+# for what happens to new data when it is full:
+#
+#   block        The payload is refused with BLOCKED. The simulator holds on to it, and to
+#                any data that arrives for the host after it, and offers it again later.
+#                That backlog has no bound, so block moves the growth out of the host and
+#                into the simulator. Its depth is reported by send_queue_report()
+#   drop-oldest  The oldest queued payload is thrown away to make room
+#   reject       The payload is refused with REJECTED and is gone for good
+#
+# Without a capacity the queue grows as needed and never refuses anything
+
+BLOCK = "block"
+DROP_OLDEST = "drop-oldest"
+REJECT = "reject"
+POLICIES = [BLOCK, DROP_OLDEST, REJECT]
+
+# What receive_from_application_layer returns when a payload wasn't taken
+BLOCKED = "blocked"
+REJECTED = "rejected"
+
+
+class SendQueue():
+    def __init__(self, capacity=None, policy=BLOCK):
+        if policy not in POLICIES:
+            raise ValueError("unknown send queue policy %r" % policy)
+        if capacity is not None and capacity < 0:
+            raise ValueError("the send queue capacity can't be negative, got %i" % capacity)
+        # drop-oldest makes room by throwing away a queued payload, so it needs room for one
+        if capacity == 0 and policy == DROP_OLDEST:
+            raise ValueError("a drop-oldest send queue needs a capacity of at least 1")
+        self.items = deque()
+        self.capacity = capacity
+        self.policy = policy
+
+        # Counters for sizing the queue
+        self.enqueued = 0       # payloads accepted into the queue
+        self.dropped = 0        # payloads thrown away by drop-oldest
+        self.rejected = 0       # payloads refused by reject
+        self.blocked = 0        # times a payload was refused by block
+        self.max_depth = 0      # the most payloads that were ever waiting at once
+
+    def __len__(self):
+        return len(self.items)
+
+    # Adds a payload to the back of the queue. Returns True if it was queued, otherwise
+    # BLOCKED or REJECTED
+    def push(self, payload):
+        if self.capacity is not None and len(self.items) >= self.capacity:
+            if self.policy == DROP_OLDEST:
+                self.items.popleft()
+                self.dropped += 1
+            elif self.policy == REJECT:
+                self.rejected += 1
+                return REJECTED
+            else:
+                self.blocked += 1
+                return BLOCKED
+
+        self.items.append(payload)
+        self.enqueued += 1
+        if len(self.items) > self.max_depth:
+            self.max_depth = len(self.items)
+        return True
+
+    # Removes and returns the payload at the front of the queue
+    def pop(self):
+        return self.items.popleft()
+
+
+# The send queue counters of both hosts, together with the data the simulator is holding for
+# each of them because the host blocked (see NetworkSimulator.app_backlog)
+def send_queue_report(simulator):
+    report = {}
+    for entity, host in enumerate(simulator.hosts):
+        queue = host.app_layer_buffer
+        report[host.entity.name] = {
+            "enqueued": queue.enqueued,
+            "dropped": queue.dropped,
+            "rejected": queue.rejected,
+            "blocked": queue.blocked,
+            "max_depth": queue.max_depth,
+            "backlog": len(simulator.app_backlog[entity]),
+            "max_backlog": simulator.max_backlog[entity],
+        }
+    return report
@@ -0,0 +1,29 @@
+# The packets a sender has sent but not yet had ACKed. It holds at most one window of
+# packets in a fixed ring of slots: the packet with sequence number n lives in slot
+# n % capacity, so the ring wraps around as the sequence numbers grow, and a slot is
+# released as soon as the window base moves past it.
+class SendWindow():
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+
+    def store(self, seq_num, packet):
+        self.slots[seq_num % self.capacity] = packet
+
+    def get(self, seq_num):
+        return self.slots[seq_num % self.capacity]
+
+    # Releases the packets from first up to (but not including) last
+    def release(self, first, last):
+        slots = self.slots
+        capacity = self.capacity
+        for seq_num in range(first, min(last, first + capacity)):
+            slots[seq_num % capacity] = None
+
+    # The packets from first up to (but not including) last, in order, read straight from
+    # the ring
+    def packets(self, first, last):
+        slots = self.slots
+        capacity = self.capacity
+        for seq_num in range(first, last):
+            yield slots[seq_num % capacity]
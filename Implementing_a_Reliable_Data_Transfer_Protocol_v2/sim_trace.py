@@ -0,0 +1,108 @@
+import sys
+from collections import deque
+from enum import IntEnum
+
+
+# How much the simulator reports. Each level includes everything from the levels below it
+class TraceLevel(IntEnum):
+    OFF = 0         # Nothing at all
+    SUMMARY = 1     # Start and end of the simulation, plus any errors
+    PACKET = 2      # Everything that happens to packets and application data
+    FULL = 3        # Timer activity as well
+
+
+# A single trace message. Nothing is formatted when the record is created: the message, its
+# arguments and the raw packet bytes are stored as they are, and turned into text only when
+# a sink calls format()
+class TraceRecord():
+    __slots__ = ("level", "entity", "time", "message", "args", "pkt", "describe_pkt")
+
+    def __init__(self, level, entity, time, message, args=(), pkt=None, describe_pkt=None):
+        self.level = level
+        self.entity = entity
+        self.time = time
+        self.message = message
+        self.args = args
+        self.pkt = pkt
+        self.describe_pkt = describe_pkt
+
+    def format(self):
+        msg = self.message % self.args if self.args else self.message
+        if self.entity is not None:
+            msg = "{} @ {:.4f}: {}".format(self.entity.name, self.time, msg)
+        if self.pkt and self.describe_pkt:
+            msg += self.describe_pkt(self.pkt)
+        return msg
+
+
+# Sinks receive every record that passes the trace level. They all provide write() and close()
+
+# Drops every record
+class NullSink():
+    def write(self, record):
+        pass
+
+    def close(self):
+        pass
+
+
+# Prints every record, which is what the simulator has always done
+class StdoutSink():
+    def write(self, record):
+        print(record.format())
+
+    def close(self):
+        sys.stdout.flush()
+
+
+# Writes every record to a file. Accepts either a path, in which case the sink owns the
+# file and closes it, or a file object that is already open
+class FileSink():
+    def __init__(self, file):
+        if isinstance(file, str):
+            self.file = open(file, "w")
+            self.owns_file = True
+        else:
+            self.file = file
+            self.owns_file = False
+
+    def write(self, record):
+        self.file.write(record.format())
+        self.file.write("\n")
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+
+# Keeps only the most recent records in memory. They are formatted when lines() is called
+class RingBufferSink():
+    def __init__(self, capacity=10000):
+        self.records = deque(maxlen=capacity)
+
+    def write(self, record):
+        self.records.append(record)
+
+    def lines(self):
+        return [r.format() for r in self.records]
+
+    def close(self):
+        pass
+
+
+# Picks the sink asked for on the command line (--trace_file, --trace_ring), printing to
+# stdout if neither was given
+def sink_from_options(options):
+    if TraceLevel[getattr(options, "trace_level", "full").upper()] == TraceLevel.OFF:
+        return NullSink()
+    trace_file = getattr(options, "trace_file", None)
+    if trace_file:
+        return FileSink(trace_file)
+    trace_ring = getattr(options, "trace_ring", None)
+    if trace_ring is not None:
+        if trace_ring <= 0:
+            raise ValueError("--trace_ring must keep at least 1 message, not %i" % trace_ring)
+        return RingBufferSink(trace_ring)
+    return StdoutSink()
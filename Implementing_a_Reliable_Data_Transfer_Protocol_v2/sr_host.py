@@ -0,0 +1,180 @@
+import heapq
+from network_simulator import host_option
+from gbn_packet import parse_header, encode_data, encode_ack, checksum_ok, payload_view
+from send_queue import SendQueue
+from send_window import SendWindow
+
+# Options that only GBNHost implements
+GBN_ONLY_OPTIONS = ("seq_bits", "mss", "piggyback", "ack_every", "ack_delay", "fast_retransmit", "adaptive_rto",
+                    "rto_reset_on_ack")
+
+# A Selective Repeat host. It plugs into NetworkSimulator the same way GBNHost does, but:
+# - every packet has its own logical timer, and only packets whose timer runs out are sent
+#   again. The logical timers are multiplexed onto the simulator's single timer per host,
+#   which is always set to go off at the earliest deadline
+# - the receiver buffers packets that arrive out of order and delivers them once the gap
+#   before them is filled
+# - every data packet is ACKed on its own (selective ACKs), not cumulatively
+# Each packet's timeout doubles every time it runs out, and starts at timer_interval again
+# for a new packet.
+class SRHost():
+
+    # The __init__ method accepts the same arguments as GBNHost.__init__
+    def __init__(self, simulator, entity, timer_interval, window_size):
+        self.simulator = simulator
+        self.entity = entity
+
+        # Sequence numbers never wrap here, messages aren't segmented and ACKs are neither delayed
+        # nor piggybacked. Rather than silently ignore the options for those, a run that asks
+        # for any of them is refused
+        for name in GBN_ONLY_OPTIONS:
+            if host_option(simulator, name, None) not in (None, False):
+                raise ValueError("SRHost doesn't support --%s, it only works with GBNHost" % name)
+
+        # Sender properties
+        self.timer_interval = timer_interval        # How long each packet waits for its ACK
+        self.window_size = window_size              # The size of the seq/ack window
+        self.window_base = 0                        # The oldest sequence number not yet ACKed
+        self.next_seq_num = 0                       # The SEQ number that will be used next
+        self.app_layer_buffer = SendQueue(host_option(simulator, "send_queue_size", None),
+                                          host_option(simulator, "send_queue_policy", "block"))
+        self.unacked_buffer = SendWindow(window_size)   # The packets sent and not yet ACKed
+        self.acked = SendWindow(window_size)            # True for packets in the window that have been ACKed
+        self.timeouts = SendWindow(window_size)         # The current timeout of each packet in the window
+        self.retransmissions = 0                        # Data packets sent again after a timeout
+
+        # The logical timers, as a heap of (deadline, seq_num). A packet's timer is cancelled by
+        # ACKing the packet, and its entry is skipped when it reaches the top
+        self.deadlines = []
+        self.timer_running = False
+        self.timer_expiry = 0.0                     # When the simulator's timer will go off, if running
+
+        # Receiver properties
+        self.rcv_base = 0                           # The next sequence number to deliver upwards
+        self.rcv_buffer = SendWindow(window_size)   # Payloads that arrived ahead of rcv_base
+
+    ###########################################################################################################
+    ## Core Interface functions that are called by Simulator
+
+    # Returns True if the payload was sent or queued, or BLOCKED/REJECTED if the queue was full
+    def receive_from_application_layer(self, payload):
+        if self.next_seq_num < self.window_base + self.window_size:
+            self.send_new(payload)
+            return True
+        else:
+            return self.app_layer_buffer.push(payload)
+
+
+    def receive_from_network_layer(self, byte_data):
+        header = parse_header(byte_data)
+        if not checksum_ok(byte_data, header):
+            # There is no way to tell what a corrupt packet was, so it is simply dropped and the
+            # sender's timer takes care of it
+            return
+        if header.is_ack():
+            self.receive_ack(header.pkt_number)
+        else:
+            self.receive_data(header, byte_data)
+
+
+    # The simulator's timer went off, so at least one logical timer has run out. Every packet
+    # whose deadline has passed is resent, and the timer is set for the next deadline
+    def timer_interrupt(self):
+        self.timer_running = False
+        now = self.simulator.time
+        while self.deadlines and self.deadlines[0][0] <= now + 1e-9:
+            deadline, seq_num = heapq.heappop(self.deadlines)
+            if self.is_outstanding(seq_num):
+                self.retransmissions += 1
+                self.simulator.pass_to_network_layer(self.entity, self.unacked_buffer.get(seq_num), False)
+
+                # Back off: a packet that timed out waits twice as long the next time. Without
+                # this, once the round trip grows past the timer interval every packet times
+                # out and is resent, which only makes the round trip longer
+                timeout = min(self.timeouts.get(seq_num) * 2, self.timer_interval * 64)
+                self.timeouts.store(seq_num, timeout)
+                heapq.heappush(self.deadlines, (now + timeout, seq_num))
+        self.schedule_timer()
+
+    ###########################################################################################################
+    ## Sender
+
+    def send_new(self, payload):
+        seq_num = self.next_seq_num
+        packet = encode_data(seq_num, payload)
+        self.unacked_buffer.store(seq_num, packet)
+        self.acked.store(seq_num, False)
+        self.timeouts.store(seq_num, self.timer_interval)
+        self.simulator.pass_to_network_layer(self.entity, packet, False)
+        heapq.heappush(self.deadlines, (self.simulator.time + self.timer_interval, seq_num))
+        self.next_seq_num += 1
+        self.schedule_timer()
+
+
+    def receive_ack(self, acknum):
+        if not self.is_outstanding(acknum):
+            return
+        self.acked.store(acknum, True)
+
+        # Slide the window past every packet that has now been ACKed
+        if acknum == self.window_base:
+            while self.window_base < self.next_seq_num and self.acked.get(self.window_base):
+                self.unacked_buffer.release(self.window_base, self.window_base + 1)
+                self.acked.release(self.window_base, self.window_base + 1)
+                self.window_base += 1
+
+            while len(self.app_layer_buffer) > 0 and self.next_seq_num < self.window_base + self.window_size:
+                self.send_new(self.app_layer_buffer.pop())
+
+        # With nothing left to wait for, the simulator's timer isn't needed
+        if self.window_base == self.next_seq_num and self.timer_running:
+            self.simulator.stop_timer(self.entity)
+            self.timer_running = False
+            self.deadlines.clear()
+
+
+    def is_outstanding(self, seq_num):
+        return self.window_base <= seq_num < self.next_seq_num and not self.acked.get(seq_num)
+
+
+    # Makes sure the simulator's timer goes off at the earliest deadline of a packet still
+    # waiting for its ACK, restarting it if a packet now has an earlier deadline
+    def schedule_timer(self):
+        while self.deadlines and not self.is_outstanding(self.deadlines[0][1]):
+            heapq.heappop(self.deadlines)
+        if not self.deadlines:
+            return
+        deadline = self.deadlines[0][0]
+        if self.timer_running:
+            if self.timer_expiry <= deadline + 1e-9:
+                return
+            self.simulator.stop_timer(self.entity)
+        self.simulator.start_timer(self.entity, max(deadline - self.simulator.time, 0.0))
+        self.timer_running = True
+        self.timer_expiry = max(deadline, self.simulator.time)
+
+
+    ###########################################################################################################
+    ## Receiver
+
+    def receive_data(self, header, byte_data):
+        seq_num = header.pkt_number
+        if self.rcv_base <= seq_num < self.rcv_base + self.window_size:
+            try:
+                data = payload_view(byte_data, header)
+            except ValueError:
+                return
+            self.simulator.pass_to_network_layer(self.entity, encode_ack(seq_num), True)
+            if self.rcv_buffer.get(seq_num) is None:
+                self.rcv_buffer.store(seq_num, data)
+
+            # Deliver everything that is now in order
+            while self.rcv_buffer.get(self.rcv_base) is not None:
+                data = self.rcv_buffer.get(self.rcv_base)
+                self.rcv_buffer.release(self.rcv_base, self.rcv_base + 1)
+                self.simulator.pass_to_application_layer(self.entity, data)
+                self.rcv_base += 1
+
+        elif self.rcv_base - self.window_size <= seq_num < self.rcv_base:
+            # Already delivered, but the sender hasn't seen the ACK yet
+            self.simulator.pass_to_network_layer(self.entity, encode_ack(seq_num), True)
@@ -0,0 +1,104 @@
+import struct
+import zlib
+
+MASK = (1 << 64) - 1
+
+# Put in front of every message while it is with the hosts: the message's send index and
+# the CRC32 of its contents
+TAG = struct.Struct("!QI")
+
+
+# Raised as soon as data is delivered that breaks in order, exactly once delivery. entity is
+# the host the data was delivered to and delivery counts the data already delivered there
+class DeliveryError(Exception):
+    def __init__(self, entity, delivery, time, message):
+        Exception.__init__(self, "%s @ %.4f, delivery %i: %s" % (entity.name, time, delivery, message))
+        self.entity = entity
+        self.delivery = delivery
+        self.time = time
+
+
+# Adds the CRC32 of one message to a rolling hash of a whole stream of messages
+def roll(stream_hash, digest):
+    return (stream_hash * 1000003 + digest + 1) & MASK
+
+
+# Checks delivery while the simulation runs, instead of comparing data_sent and
+# data_received afterwards. The simulator passes the bytes an application hands to a host
+# through data_sent() and the bytes a host passes up through data_delivered(), see
+# NetworkSimulator's monitor.
+#
+# data_sent() tags each message with its send index and its CRC32, and the hosts carry the
+# tag as part of the data, so packets are TAG.size bytes longer than without the checker.
+# data_delivered() strips it again and checks that the index is the next one due from the
+# other entity and that the contents still match. Nothing is kept per message: for each
+# direction there is a cursor and a rolling hash of everything sent and everything
+# delivered, so memory stays the same however long the run is. A delivery that breaks the
+# order raises DeliveryError on the spot.
+#
+# With allow_gaps, data may go missing (for a send queue that drops or rejects data) but what
+# does arrive must still be in order: a delivery may move the cursor past messages that never
+# arrived. The stream hashes are only compared when no gaps are allowed.
+class StreamChecker():
+    def __init__(self, allow_gaps=False):
+        self.allow_gaps = allow_gaps
+        self.sent = [0, 0]                      # Also the send index of each entity's next message
+        self.cursor = [0, 0]                    # Send index of the next message due from each entity
+        self.delivered = [0, 0]
+        self.skipped = [0, 0]                   # Sent by each entity and passed over by a gap
+        self.sent_hash = [0, 0]
+        self.delivered_hash = [0, 0]
+
+    # Returns the tagged bytes to hand to the host
+    def data_sent(self, entity, data):
+        digest = zlib.crc32(data)
+        index = self.sent[entity]
+        self.sent[entity] += 1
+        self.sent_hash[entity] = roll(self.sent_hash[entity], digest)
+        return TAG.pack(index, digest) + data
+
+    # Returns the bytes that were sent, without the tag
+    def data_delivered(self, entity, data, time):
+        source = 1 - entity
+        if len(data) < TAG.size:
+            raise DeliveryError(entity, self.delivered[entity], time,
+                                "delivered %i bytes, too few to hold the tag" % len(data))
+        index, digest = TAG.unpack_from(data)
+        data = data[TAG.size:]
+        cursor = self.cursor[source]
+        if zlib.crc32(data) != digest:
+            raise DeliveryError(entity, self.delivered[entity], time,
+                                "message %i was delivered with different contents" % index)
+        if index < cursor:
+            raise DeliveryError(entity, self.delivered[entity], time,
+                                "message %i delivered out of order or more than once, expected message %i" % (index, cursor))
+        if index >= self.sent[source]:
+            raise DeliveryError(entity, self.delivered[entity], time, "message %i was never sent" % index)
+        if index > cursor:
+            if not self.allow_gaps:
+                raise DeliveryError(entity, self.delivered[entity], time,
+                                    "message %i delivered before message %i" % (index, cursor))
+            self.skipped[source] += index - cursor
+        self.cursor[source] = index + 1
+        self.delivered[entity] += 1
+        self.delivered_hash[entity] = roll(self.delivered_hash[entity], digest)
+        return data
+
+    # Called once the simulation is over. Raises DeliveryError if anything sent was never
+    # delivered, unless gaps are allowed
+    def finish(self, simulator):
+        if self.allow_gaps:
+            return
+        for entity in simulator.Host:
+            source = 1 - entity
+            if self.cursor[source] != self.sent[source] or self.sent_hash[source] != self.delivered_hash[entity]:
+                raise DeliveryError(entity, self.delivered[entity], simulator.time,
+                                    "%i of %i messages sent were never delivered" % (self.sent[source] - self.cursor[source], self.sent[source]))
+
+
+# The StreamChecker for a run with --stream_check, or None. A send queue that drops or
+# rejects data loses it on purpose, so then only the order is checked
+def checker_from_options(options):
+    if not getattr(options, "stream_check", False):
+        return None
+    return StreamChecker(allow_gaps=getattr(options, "send_queue_policy", "block") != "block")
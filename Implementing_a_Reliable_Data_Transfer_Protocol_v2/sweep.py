@@ -0,0 +1,175 @@
+import math, json, itertools
+from concurrent.futures import ProcessPoolExecutor
+from optparse import OptionParser
+from gbn_tester import GBNTester
+from gbn_host import GBNHost
+from network_simulator import NetworkSimulator
+
+# Runs many simulations over a grid of parameters and seeds, spread over a pool of worker
+# processes, and summarises the results. Every simulator has its own seeded random number
+# generator, so the result for a given (parameters, seed) pair is the same whatever the
+# number of workers, and runs could just as well share a process or a thread. Example:
+#
+#   python sweep.py --num_pkts 1000 --grid timer_interval=2,3,5 --grid loss_prob=0,0.1 --seeds 50
+
+
+# The per-run measurements, in the order they appear in the result table
+METRICS = ["completion_time", "retransmissions", "goodput", "ntolayer3", "nlost", "ncorrupt"]
+
+
+# Runs a single simulation with tracing turned off and returns its measurements
+def run_one(host, params, seed):
+    values = dict(params)
+    values["seed"] = seed
+    values["trace_level"] = "off"
+    options = GBNTester(host).options_from_dict(values)
+
+    simulator = NetworkSimulator(options, host)
+    simulator.Simulate()
+
+    # The hosts count their own resends. A message can take several packets (with --mss), so
+    # they can't be told apart from the packet count
+    to_bytes = simulator.app_payloads.to_bytes
+    delivered = sum(len(to_bytes(d)) for host in (simulator.A, simulator.B) for d in host.data_received)
+    return {
+        "completion_time": simulator.time,
+        "retransmissions": simulator.A.retransmissions + simulator.B.retransmissions,
+        "goodput": delivered / simulator.time if simulator.time > 0 else 0.0,
+        "ntolayer3": simulator.ntolayer3,
+        "nlost": simulator.nlost,
+        "ncorrupt": simulator.ncorrupt,
+    }
+
+
+# Work unit handed to a worker process: a list of (run index, params, seed) tuples
+def run_chunk(host, chunk):
+    return [(index, run_one(host, params, seed)) for index, params, seed in chunk]
+
+
+# Linear interpolation between closest ranks, on an already sorted list
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return float("nan")
+    k = (len(sorted_values) - 1) * p / 100.0
+    lo = math.floor(k)
+    hi = math.ceil(k)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+# The results of a sweep, stored by column. runs has one row per simulation, summary has
+# one row per parameter combination with the mean, p50 and p99 of every metric
+class SweepResult():
+    def __init__(self, param_names, runs, summary):
+        self.param_names = param_names
+        self.runs = runs
+        self.summary = summary
+
+    def to_json(self):
+        return json.dumps({"runs": self.runs, "summary": self.summary})
+
+
+# Expands a grid such as {"loss_prob": [0, 0.1], "timer_interval": [2, 3]} into the list of
+# every combination of its values
+def expand_grid(base, grid):
+    names = sorted(grid)
+    combos = []
+    for values in itertools.product(*(grid[n] for n in names)):
+        params = dict(base)
+        params.update(zip(names, values))
+        combos.append(params)
+    return names, combos
+
+
+# Runs every parameter combination once for each seed. base holds the options shared by all
+# runs, grid the options to vary
+def run_sweep(base, grid, seeds, workers=None, chunk_size=16, host=GBNHost):
+    names, combos = expand_grid(base, grid)
+    units = []
+    for params in combos:
+        for seed in seeds:
+            units.append((len(units), params, seed))
+    chunks = [units[i:i + chunk_size] for i in range(0, len(units), chunk_size)]
+
+    results = [None] * len(units)
+    if workers == 1:
+        for chunk in map(run_chunk, itertools.repeat(host), chunks):
+            for index, metrics in chunk:
+                results[index] = metrics
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for chunk in executor.map(run_chunk, itertools.repeat(host), chunks):
+                for index, metrics in chunk:
+                    results[index] = metrics
+
+    # Per-run table
+    runs = {n: [] for n in names}
+    runs["seed"] = []
+    for m in METRICS:
+        runs[m] = []
+    for (index, params, seed), metrics in zip(units, results):
+        for n in names:
+            runs[n].append(params[n])
+        runs["seed"].append(seed)
+        for m in METRICS:
+            runs[m].append(metrics[m])
+
+    # Summary table, one row per combination
+    summary = {n: [] for n in names}
+    summary["runs"] = []
+    for m in METRICS:
+        for stat in ("mean", "p50", "p99"):
+            summary["%s_%s" % (m, stat)] = []
+    per_combo = len(seeds)
+    for c, params in enumerate(combos):
+        rows = results[c * per_combo:(c + 1) * per_combo]
+        for n in names:
+            summary[n].append(params[n])
+        summary["runs"].append(len(rows))
+        for m in METRICS:
+            values = sorted(r[m] for r in rows)
+            summary["%s_mean" % m].append(sum(values) / len(values) if values else float("nan"))
+            summary["%s_p50" % m].append(percentile(values, 50))
+            summary["%s_p99" % m].append(percentile(values, 99))
+
+    return SweepResult(names, runs, summary)
+
+
+# Turns "name=1,2,3" into ("name", ["1", "2", "3"])
+def parse_grid_arg(arg):
+    name, _, values = arg.partition("=")
+    return name, values.split(",")
+
+
+if __name__ == "__main__":
+    op = OptionParser(description="Runs the GBN simulator over a grid of parameters and seeds")
+    op.add_option("--grid", action="append", default=[], metavar="NAME=V1,V2",
+                  help="A simulator option and the values to sweep it over. May be repeated")
+    op.add_option("--set", action="append", default=[], metavar="NAME=V",
+                  help="A simulator option shared by every run. May be repeated")
+    op.add_option("--num_pkts", type="int", default=1000)
+    op.add_option("--seeds", type="int", default=20, help="Number of seeds per combination")
+    op.add_option("--first_seed", type="int", default=1)
+    op.add_option("--workers", type="int", help="Worker processes (default: one per CPU)")
+    op.add_option("--chunk_size", type="int", default=16)
+    op.add_option("--json", metavar="FILE", help="Also write the full result tables to FILE")
+    args, _ = op.parse_args()
+
+    base = {"num_pkts": args.num_pkts, "timer_interval": 3, "loss_prob": 0.1,
+            "corrupt_prob": 0.1, "arrival_rate": 10}
+    for s in args.set:
+        name, _, value = s.partition("=")
+        base[name] = value
+    grid = dict(parse_grid_arg(g) for g in args.grid)
+
+    seeds = list(range(args.first_seed, args.first_seed + args.seeds))
+    result = run_sweep(base, grid, seeds, args.workers, args.chunk_size)
+
+    columns = result.param_names + ["runs"] + ["%s_%s" % (m, s) for m in ("completion_time", "retransmissions", "goodput") for s in ("mean", "p50", "p99")]
+    print("  ".join(columns))
+    for i in range(len(result.summary["runs"])):
+        print("  ".join(str(result.summary[c][i]) if not isinstance(result.summary[c][i], float)
+                        else "%.3f" % result.summary[c][i] for c in columns))
+
+    if args.json:
+        with open(args.json, "w") as fp:
+            fp.write(result.to_json())
@@ -0,0 +1,25 @@
+# Shared helpers for the tests that run the simulator
+from gbn_tester import GBNTester
+from gbn_host import GBNHost
+from network_simulator import NetworkSimulator
+
+
+# Parses command line arguments with the tester's parser, so every option the simulator
+# knows about is present. Tracing is off unless args turn it on, and numbers can be given
+# as they are
+def parse_options(args, host=GBNHost):
+    options, _ = GBNTester(host).op.parse_args(["--trace_level", "off"] + [str(a) for a in args])
+    return options
+
+
+# A simulator for host set up from command line arguments. trace_sink and monitor are
+# passed on to NetworkSimulator
+def make_simulator(args, host=GBNHost, trace_sink=None, monitor=None):
+    return NetworkSimulator(parse_options(args, host), host, trace_sink, monitor)
+
+
+# Like make_simulator, but runs the simulation to the end before returning it
+def run_simulator(args, host=GBNHost, trace_sink=None, monitor=None):
+    simulator = make_simulator(args, host, trace_sink, monitor)
+    simulator.Simulate()
+    return simulator
@@ -0,0 +1,64 @@
+import os, shutil, tempfile, unittest
+from gbn_host import GBNHost
+from sr_host import SRHost
+from gbn_packet import encode_data
+from trace_replay import replay
+from sim_helpers import run_simulator
+
+
+class TestBinaryPayloads(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run_simulator(self, host, *extra):
+        return run_simulator(["--num_pkts", 200, "--timer_interval", 3, "--loss_prob", 0.1, "--corrupt_prob", 0.1,
+                              "--arrival_rate", 0.5, "--seed", 8, "--binary_payloads"] + list(extra), host)
+
+    def test_delivers_any_bytes(self):
+        for host in (GBNHost, SRHost):
+            simulator = self.run_simulator(host)
+            sent = simulator.A.data_sent + simulator.B.data_sent
+            self.assertTrue(all(isinstance(data, bytes) for data in sent))
+            self.assertTrue(any(max(data) > 127 for data in sent))
+            self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+            self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+
+    def test_64k_payloads(self):
+        for host in (GBNHost, SRHost):
+            simulator = self.run_simulator(host, "--num_pkts", "20", "--payload_size", "65536", "--trace_level", "packet",
+                                           "--trace_ring", "100")
+            self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+            self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+
+    def test_text_by_default(self):
+        simulator = run_simulator(["--num_pkts", 20, "--timer_interval", 3, "--loss_prob", 0, "--corrupt_prob", 0,
+                                   "--arrival_rate", 0.5, "--seed", 8])
+        self.assertTrue(all(isinstance(data, str) for data in simulator.B.data_received))
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+
+    def test_extraction_does_not_copy(self):
+        packet = encode_data(0, bytes(range(256)))
+        payload = GBNHost(None, None, 3, 5).payload_Extraction(packet)
+        self.assertIs(payload.obj, packet)
+        self.assertEqual(bytes(payload), bytes(range(256)))
+
+
+class TestBinaryPayloadReplay(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "trace.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_replay(self):
+        recorded = run_simulator(["--num_pkts", 100, "--timer_interval", 3, "--loss_prob", 0.2, "--corrupt_prob", 0.2,
+                                  "--arrival_rate", 0.5, "--seed", 4, "--binary_payloads", "--record_trace", self.path])
+
+        replayed = replay(self.path)
+        self.assertEqual(replayed.mismatches, 0)
+        self.assertEqual(replayed.missing, 0)
+        self.assertEqual(replayed.B.data_received, recorded.B.data_received)
@@ -0,0 +1,114 @@
+import os, shutil, tempfile, unittest
+from binary_trace import TraceWriter, TraceReader, TO_NETWORK, TO_APPLICATION, RECORD
+from gbn_host import GBNHost
+from gbn_packet import parse_header
+from network_simulator import EventType
+from trace_replay import replay
+from sim_helpers import make_simulator, run_simulator
+from stream_checker import StreamChecker
+
+
+# Drops every third ACK it would send, so its outputs differ from a GBNHost trace
+class ForgetfulHost(GBNHost):
+    def send_ack(self, new_data):
+        self.acks_asked = getattr(self, "acks_asked", 0) + 1
+        if self.acks_asked % 3:
+            GBNHost.send_ack(self, new_data)
+
+
+class TestBinaryTrace(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "trace.bin")
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def record(self, host=GBNHost):
+        return run_simulator(["--num_pkts", 100, "--timer_interval", 3, "--loss_prob", 0.2, "--corrupt_prob", 0.2,
+                              "--arrival_rate", 0.5, "--seed", 11, "--record_trace", self.path], host)
+
+    def test_round_trip(self):
+        writer = TraceWriter(self.path, batch=2)
+        writer.append(1.5, 0, EventType.FROM_LAYER5, b"abc")
+        writer.append(2.0, 1, EventType.TIMER_INTERRUPT)
+        writer.append(2.25, 1, TO_NETWORK, bytearray(b"\x00\x01packet"))
+        writer.close()
+        self.assertEqual(os.path.getsize(self.path + ".payload"), 11)
+
+        with TraceReader(self.path) as reader:
+            self.assertEqual(len(reader), 3)
+            self.assertEqual(reader.options, {})
+            entries = list(reader)
+            self.assertEqual([(e.time, e.entity, e.kind) for e in entries], [(1.5, 0, 1), (2.0, 1, 3), (2.25, 1, TO_NETWORK)])
+            self.assertEqual(bytes(entries[0].payload), b"abc")
+            self.assertEqual(len(entries[1].payload), 0)
+            self.assertEqual(bytes(reader[-1].payload), b"\x00\x01packet")
+            self.assertEqual(reader.verify(), [])
+            self.assertRaises(IndexError, reader.__getitem__, 3)
+            entries = None
+
+    def test_text_payload_length_in_bytes(self):
+        writer = TraceWriter(self.path)
+        writer.append(1.0, 0, EventType.FROM_LAYER5, "é")
+        writer.append(2.0, 0, EventType.FROM_LAYER5, b"zz")
+        writer.close()
+
+        with TraceReader(self.path) as reader:
+            self.assertEqual([bytes(e.payload) for e in reader], ["é".encode(), b"zz"])
+            self.assertEqual(reader.verify(), [])
+
+    def test_truncated_and_invalid(self):
+        writer = TraceWriter(self.path)
+        writer.append(1.0, 0, EventType.TIMER_INTERRUPT)
+        writer.append(2.0, 0, EventType.TIMER_INTERRUPT)
+        writer.close()
+        with open(self.path, "r+b") as fp:
+            fp.truncate(os.path.getsize(self.path) - RECORD.size // 2)
+        with TraceReader(self.path) as reader:
+            self.assertEqual(len(reader), 1)
+
+        with open(self.path, "wb") as fp:
+            fp.write(b"not a trace at all")
+        self.assertRaises(ValueError, TraceReader, self.path)
+
+        open(self.path, "wb").close()
+        self.assertRaisesRegex(ValueError, "too short", TraceReader, self.path)
+
+    def test_records_simulation(self):
+        simulator = self.record()
+        with TraceReader(self.path) as reader:
+            self.assertEqual(reader.options["seed"], 11)
+            kinds = [record[2] for record in reader.raw_records()]
+            self.assertEqual(kinds.count(TO_NETWORK), simulator.ntolayer3)
+            self.assertEqual(kinds.count(TO_APPLICATION), len(simulator.A.data_received) + len(simulator.B.data_received))
+            self.assertEqual(kinds.count(EventType.FROM_LAYER5), simulator.nsim)
+            first_send = reader[kinds.index(TO_NETWORK)]
+            self.assertEqual(parse_header(first_send.payload).pkt_number, 0)
+            first_send = None
+
+    def test_replay_reproduces_trace(self):
+        simulator = self.record()
+        replayed = replay(self.path)
+        self.assertEqual(replayed.mismatches, 0)
+        self.assertEqual(replayed.missing, 0)
+        self.assertEqual(replayed.ntolayer3, simulator.ntolayer3)
+        self.assertEqual(replayed.B.data_received, simulator.B.data_received)
+        self.assertEqual(replayed.A.data_received, simulator.A.data_received)
+
+    def test_replay_stream_check(self):
+        checker = StreamChecker()
+        simulator = make_simulator(["--num_pkts", 100, "--timer_interval", 3, "--loss_prob", 0.2, "--corrupt_prob", 0.2,
+                                    "--arrival_rate", 0.5, "--seed", 11, "--record_trace", self.path, "--stream_check"],
+                                   monitor=checker)
+        simulator.Simulate()
+        replayed = replay(self.path)
+        self.assertEqual(replayed.mismatches, 0)
+        self.assertEqual(replayed.missing, 0)
+        self.assertEqual(replayed.monitor.delivered, checker.delivered)
+
+    def test_replay_finds_changed_host(self):
+        self.record()
+        replayed = replay(self.path, ForgetfulHost)
+        self.assertGreater(replayed.mismatches, 0)
+        self.assertIsNotNone(replayed.first_mismatch)
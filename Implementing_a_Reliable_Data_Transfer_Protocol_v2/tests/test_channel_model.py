@@ -0,0 +1,93 @@
+import os, random, tempfile, unittest
+from channel_model import GilbertElliottChannel, TraceChannel, read_pattern
+from sim_helpers import make_simulator, run_simulator
+
+
+class TestGilbertElliottChannel(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(5)
+        self.channel = GilbertElliottChannel(0.1, 0.0, 8, 1.0, rng, rng)
+
+    def tearDown(self):
+        pass
+
+    def test_loss_rate_and_burst_length(self):
+        losses = [self.channel.lost(0) for i in range(200000)]
+        self.assertAlmostEqual(sum(losses) / len(losses), 0.1, delta=0.01)
+
+        bursts = []
+        run = 0
+        for lost in losses:
+            if lost:
+                run += 1
+            elif run:
+                bursts.append(run)
+                run = 0
+        self.assertAlmostEqual(sum(bursts) / len(bursts), 8, delta=0.5)
+
+    def test_directions_are_independent(self):
+        for i in range(1000):
+            self.channel.lost(0)
+            if self.channel.bad[0]:
+                break
+        self.assertTrue(self.channel.bad[0])
+        self.assertFalse(self.channel.bad[1])
+
+    def test_bad_settings(self):
+        rng = random.Random(1)
+        self.assertRaises(ValueError, GilbertElliottChannel, 0.1, 0.0, 0.5, 1.0, rng, rng)
+        self.assertRaises(ValueError, GilbertElliottChannel, 0.5, 0.0, 4, 0.4, rng, rng)
+
+
+class TestTraceChannel(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".txt")
+        with os.fdopen(fd, "w") as fp:
+            fp.write("# two packets, then a loss and a corruption\n..  LC\n\n")
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_pattern_repeats(self):
+        channel = TraceChannel(read_pattern(self.path))
+        fates = []
+        for i in range(8):
+            lost = channel.lost(i % 2)
+            fates.append("L" if lost else "C" if channel.corrupted(i % 2) else ".")
+        self.assertEqual("".join(fates), "..LC..LC")
+
+    def test_unknown_symbol(self):
+        with open(self.path, "a") as fp:
+            fp.write("..X\n")
+        self.assertRaises(ValueError, read_pattern, self.path)
+
+    def test_simulator_follows_the_trace(self):
+        with open(self.path, "w") as fp:
+            fp.write("....L.\n..C..\n")
+        simulator = run_simulator(["--num_pkts", 100, "--timer_interval", 3, "--loss_prob", 0.5, "--corrupt_prob", 0.5,
+                                   "--arrival_rate", 1, "--seed", 2, "--channel", "trace", "--channel_trace", self.path])
+        fates = [simulator.channel.pattern[i % 11] for i in range(simulator.ntolayer3)]
+        self.assertEqual(simulator.nlost, fates.count("L"))
+        self.assertEqual(simulator.ncorrupt, fates.count("C"))
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+        self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+
+
+class TestSimulatedBurstLoss(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_delivers_in_order(self):
+        for seed in (1, 2, 3):
+            simulator = run_simulator(["--num_pkts", 300, "--timer_interval", 3, "--loss_prob", 0.2, "--corrupt_prob", 0.05,
+                                       "--arrival_rate", 0.5, "--seed", seed, "--channel", "gilbert", "--burst_len", 6])
+            self.assertGreater(simulator.channel.bursts, 0)
+            self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+            self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+
+    def test_zero_burst_length_is_refused(self):
+        for extra in (["--burst_len", "0"], ["--bad_loss", "0"]):
+            self.assertRaises(ValueError, make_simulator, ["--num_pkts", 10, "--loss_prob", 0.1, "--channel", "gilbert"] + extra)
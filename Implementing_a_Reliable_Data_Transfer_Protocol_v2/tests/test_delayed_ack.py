@@ -0,0 +1,44 @@
+import unittest
+from gbn_host import GBNHost
+from sim_helpers import run_simulator
+
+
+# Counts every ACK the receiver asked for, whether or not it was sent
+class CountingHost(GBNHost):
+    def send_ack(self, new_data):
+        self.ack_requests = getattr(self, "ack_requests", 0) + 1
+        GBNHost.send_ack(self, new_data)
+
+
+class TestDelayedAck(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run_simulator(self, host, arrival_rate, seed, *extra):
+        return run_simulator(["--num_pkts", 150, "--timer_interval", 3, "--loss_prob", 0.1, "--corrupt_prob", 0.1,
+                              "--arrival_rate", arrival_rate, "--seed", seed] + list(extra), host)
+
+    def test_delivers_everything_in_order(self):
+        for arrival_rate in (20, 0.3, 0.01):
+            for seed in (1, 2):
+                simulator = self.run_simulator(GBNHost, arrival_rate, seed, "--ack_every", "3")
+                self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+                self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+
+    def test_every_ack_sent_or_coalesced(self):
+        simulator = self.run_simulator(CountingHost, 0.05, 3, "--ack_every", "2", "--ack_delay", "0.5")
+        for host in (simulator.A, simulator.B):
+            self.assertFalse(host.ack_owed)
+            self.assertGreater(host.acks_coalesced, 0)
+            self.assertEqual(host.num_ack_sent + host.acks_coalesced, host.ack_requests)
+
+    def test_fewer_acks(self):
+        every = self.run_simulator(GBNHost, 0.05, 4)
+        delayed = self.run_simulator(GBNHost, 0.05, 4, "--ack_delay", "0.5")
+        self.assertFalse(every.A.delayed_ack)
+        self.assertEqual(delayed.A.ack_every, 2)
+        self.assertLess(delayed.A.num_ack_sent + delayed.B.num_ack_sent, every.A.num_ack_sent + every.B.num_ack_sent)
+        self.assertEqual(delayed.ack_timers, {})
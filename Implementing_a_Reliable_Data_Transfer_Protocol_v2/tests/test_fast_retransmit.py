@@ -0,0 +1,55 @@
+import unittest
+from gbn_packet import encode_ack
+from sim_helpers import make_simulator
+
+
+class TestFastRetransmit(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def make_simulator(self, *extra):
+        return make_simulator(["--num_pkts", 200, "--timer_interval", 3, "--loss_prob", 0.1, "--corrupt_prob", 0.1,
+                               "--arrival_rate", 0.05, "--seed", 5] + list(extra))
+
+    def test_third_duplicate_resends_window(self):
+        simulator = self.make_simulator("--fast_retransmit")
+        host = simulator.A
+        for i in range(4):
+            host.receive_from_application_layer(b"msg%i" % i)
+        host.receive_from_network_layer(encode_ack(0))
+        self.assertEqual(host.window_base, 1)
+
+        sent = simulator.ntolayer3
+        host.receive_from_network_layer(encode_ack(0))
+        host.receive_from_network_layer(encode_ack(0))
+        self.assertEqual(simulator.ntolayer3, sent)
+        host.receive_from_network_layer(encode_ack(0))
+        self.assertEqual(simulator.ntolayer3, sent + 3)
+        self.assertEqual(host.fast_retransmits, 1)
+
+        # Only once until the window moves again
+        host.receive_from_network_layer(encode_ack(0))
+        self.assertEqual(simulator.ntolayer3, sent + 3)
+        host.receive_from_network_layer(encode_ack(2))
+        self.assertEqual(host.dup_acks, 0)
+
+    def test_duplicates_ignored_by_default(self):
+        simulator = self.make_simulator()
+        host = simulator.A
+        for i in range(3):
+            host.receive_from_application_layer(b"msg%i" % i)
+        sent = simulator.ntolayer3
+        for i in range(5):
+            host.receive_from_network_layer(encode_ack(-1))
+        self.assertEqual(simulator.ntolayer3, sent)
+        self.assertEqual(host.fast_retransmits, 0)
+
+    def test_delivers_everything_in_order(self):
+        simulator = self.make_simulator("--fast_retransmit")
+        simulator.Simulate()
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+        self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+        self.assertGreater(simulator.A.fast_retransmits + simulator.B.fast_retransmits, 0)
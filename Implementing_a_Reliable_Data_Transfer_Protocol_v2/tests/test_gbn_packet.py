@@ -0,0 +1,42 @@
+import unittest
+from struct import pack
+from gbn_packet import parse_header, encode_data, encode_ack, checksum_ok, payload_view, DATA_TYPE, HEADER_SIZE
+from checksum import internet_checksum
+
+
+class TestGBNPacket(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_data_packet_matches_two_pass_layout(self):
+        payload = b"hello"
+        expected = pack("!HiHI5s", 128, 7, 0, 5, payload)
+        expected = pack("!HiHI5s", 128, 7, internet_checksum(expected), 5, payload)
+        self.assertEqual(encode_data(7, payload), expected)
+
+    def test_header_round_trip(self):
+        pkt = encode_data(42, b"abc")
+        header = parse_header(pkt)
+        self.assertEqual((header.pkt_type, header.pkt_number, header.length), (DATA_TYPE, 42, 3))
+        self.assertFalse(header.is_ack())
+        self.assertTrue(parse_header(encode_ack(-1)).is_ack())
+
+    def test_payload_view_does_not_copy(self):
+        pkt = encode_data(1, b"payload")
+        view = payload_view(pkt, parse_header(pkt))
+        self.assertIs(view.obj, pkt)
+        self.assertEqual(bytes(view), b"payload")
+
+    def test_checksum_detects_flipped_bit(self):
+        pkt = bytearray(encode_data(3, b"data"))
+        self.assertTrue(checksum_ok(pkt, parse_header(pkt)))
+        pkt[HEADER_SIZE + 1] ^= 0x10
+        self.assertFalse(checksum_ok(pkt, parse_header(pkt)))
+
+    def test_length_mismatch_is_rejected(self):
+        pkt = encode_data(3, b"data")
+        with self.assertRaises(ValueError):
+            payload_view(pkt[:-1], parse_header(pkt))
@@ -0,0 +1,50 @@
+import unittest, random
+from checksum import internet_checksum, internet_checksum_of, checksum_excluding, update_checksum
+
+
+class TestInternetChecksum(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(3600)
+
+    def tearDown(self):
+        pass
+
+    # The word-at-a-time algorithm from test_checksum.py
+    def reference_checksum(self, packet):
+        if len(packet) % 2 == 1:
+            packet = packet + bytes(1)
+        s = 0
+        for i in range(0, len(packet), 2):
+            c = s + (packet[i] << 8 | packet[i+1])
+            s = (c & 0xffff) + (c >> 16)
+        return ~s & 0xffff
+
+    def random_bytes(self, n):
+        return bytes(self.rng.getrandbits(8) for _ in range(n))
+
+    def test_matches_reference(self):
+        for n in list(range(0, 40)) + [1500, 4097, 65536]:
+            for data in (self.random_bytes(n), bytes(n), b"\xff" * n):
+                self.assertEqual(internet_checksum(data), self.reference_checksum(data), n)
+
+    def test_split_buffer_matches_joined(self):
+        for n in list(range(0, 20)) + [1501]:
+            for head in (b"", self.random_bytes(12), bytes(16)):
+                for tail in (self.random_bytes(n), bytes(n), b"\xff" * n):
+                    self.assertEqual(internet_checksum_of(head, tail), self.reference_checksum(head + tail), n)
+
+    def test_excluding_field_matches_zeroed_header(self):
+        for n in range(12, 40):
+            data = self.random_bytes(n)
+            zeroed = data[:6] + bytes(2) + data[8:]
+            self.assertEqual(checksum_excluding(data, 6), self.reference_checksum(zeroed))
+
+    def test_incremental_update_matches_recompute(self):
+        for i in range(2000):
+            data = bytearray(self.random_bytes(12))
+            checksum = self.reference_checksum(bytes(data))
+            offset = 2 * self.rng.randrange(6)
+            old_word = data[offset] << 8 | data[offset + 1]
+            new_word = self.rng.randrange(1, 0x10000)
+            data[offset:offset + 2] = new_word.to_bytes(2, "big")
+            self.assertEqual(update_checksum(checksum, old_word, new_word), self.reference_checksum(bytes(data)))
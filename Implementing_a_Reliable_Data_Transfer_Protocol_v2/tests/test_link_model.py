@@ -0,0 +1,77 @@
+import unittest
+from link_model import Link, link_report
+from sim_helpers import run_simulator
+
+
+class TestLink(unittest.TestCase):
+    def setUp(self):
+        self.link = Link(bandwidth=10.0, prop_delay=2.0, queue_size=2)
+
+    def tearDown(self):
+        pass
+
+    def test_serialization_and_propagation(self):
+        self.assertEqual(self.link.transmit(0.0, 20), 4.0)
+        # The second packet waits for the first to be sent
+        self.assertEqual(self.link.transmit(1.0, 10), 5.0)
+        # An idle link starts sending straight away
+        self.assertEqual(self.link.transmit(10.0, 5), 12.5)
+        self.assertEqual(self.link.bytes_sent, 35)
+        self.assertAlmostEqual(self.link.utilization(20.0), 3.5 / 20.0)
+
+    def test_drop_tail(self):
+        arrivals = [self.link.transmit(0.0, 10) for i in range(5)]
+        self.assertEqual(arrivals, [3.0, 4.0, 5.0, None, None])
+        self.assertEqual(self.link.drops, 2)
+        self.assertEqual(self.link.max_queue, 2)
+        # Once the first packet is sent there is room for one more
+        self.assertEqual(self.link.transmit(1.0, 10), 6.0)
+
+    def test_delay_only(self):
+        link = Link(prop_delay=1.5, queue_size=0)
+        self.assertEqual([link.transmit(3.0, 100) for i in range(3)], [4.5, 4.5, 4.5])
+        self.assertIsNone(link.utilization(10.0))
+
+    def test_bad_settings(self):
+        self.assertRaises(ValueError, Link, 0)
+        self.assertRaises(ValueError, Link, 10.0, -1.0)
+        self.assertRaises(ValueError, Link, 10.0, 1.0, -1)
+
+
+class TestSimulatedLink(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run_simulator(self, *extra):
+        return run_simulator(["--num_pkts", 200, "--timer_interval", 20, "--loss_prob", 0, "--corrupt_prob", 0,
+                              "--arrival_rate", 0.5, "--seed", 3] + list(extra))
+
+    def test_delivers_in_order_over_a_full_queue(self):
+        simulator = self.run_simulator("--bandwidth", "40", "--prop_delay", "1", "--queue_size", "2")
+        self.assertGreater(simulator.nqueue_drops, 0)
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+        self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+        self.assertEqual(sum(link.drops for link in simulator.links), simulator.nqueue_drops)
+
+    def test_report(self):
+        simulator = self.run_simulator("--bandwidth", "100", "--prop_delay", "2")
+        report = link_report(simulator)
+        for name, entity in (("A", 0), ("B", 1)):
+            link = simulator.links[entity]
+            self.assertEqual(report[name]["packets"], link.packets_sent)
+            self.assertEqual(report[name]["queue_drops"], 0)
+            self.assertGreater(report[name]["goodput"], 0)
+            self.assertLess(0, report[name]["utilization"], 1)
+        self.assertEqual(simulator.links[0].packets_sent + simulator.links[1].packets_sent, simulator.ntolayer3)
+
+    def test_queue_size_needs_bandwidth(self):
+        self.assertRaises(ValueError, self.run_simulator, "--prop_delay", "1", "--queue_size", "2")
+        self.assertRaises(ValueError, self.run_simulator, "--queue_size", "2")
+
+    def test_no_link_by_default(self):
+        simulator = self.run_simulator()
+        self.assertIsNone(simulator.links)
+        self.assertEqual(simulator.nqueue_drops, 0)
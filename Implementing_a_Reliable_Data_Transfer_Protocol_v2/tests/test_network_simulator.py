@@ -0,0 +1,152 @@
+import optparse, unittest
+from gbn_host import GBNHost
+from network_simulator import NetworkSimulator, SimulatedEvent, EventType, EventEntity
+from sim_trace import RingBufferSink
+from sim_helpers import make_simulator
+
+
+# A host that does nothing, so the simulator can be driven directly by the tests
+class IdleHost():
+    def __init__(self, simulator, entity, timer_interval, window_size):
+        self.entity = entity
+        self.interrupts = 0
+
+    def receive_from_application_layer(self, payload):
+        pass
+
+    def receive_from_network_layer(self, byte_data):
+        pass
+
+    def timer_interrupt(self):
+        self.interrupts += 1
+
+
+class TestNetworkSimulator(unittest.TestCase):
+    def setUp(self):
+        self.simulator = make_simulator(["--num_pkts", 0, "--timer_interval", 3, "--loss_prob", 0, "--corrupt_prob", 0,
+                                         "--arrival_rate", 10, "--seed", 1], IdleHost)
+
+    def tearDown(self):
+        pass
+
+    def make_event(self, evtime, entity=EventEntity.A):
+        e = SimulatedEvent()
+        e.evtime = evtime
+        e.evtype = EventType.FROM_LAYER3
+        e.eventity = entity
+        return e
+
+    def test_events_with_equal_times_keep_insertion_order(self):
+        first = self.make_event(5.0)
+        second = self.make_event(5.0)
+        earlier = self.make_event(1.0)
+        for e in (first, second, earlier):
+            self.simulator.insert_event(e)
+
+        order = [e for _, _, e in sorted(self.simulator.event_list)]
+        self.assertEqual(order, [earlier, first, second])
+
+    def test_stopped_timer_is_never_delivered(self):
+        self.simulator.start_timer(EventEntity.A, 3)
+        self.simulator.stop_timer(EventEntity.A)
+        self.simulator.start_timer(EventEntity.A, 3)
+
+        events = self.simulator.Simulate()
+        self.assertEqual(len(events), 1)
+        self.assertEqual(events[0].evtype, EventType.TIMER_INTERRUPT)
+        self.assertEqual(self.simulator.A.interrupts, 1)
+
+    def test_window_size_must_be_positive(self):
+        self.assertRaises(ValueError, make_simulator,
+                          ["--num_pkts", 0, "--timer_interval", 3, "--loss_prob", 0, "--corrupt_prob", 0,
+                           "--arrival_rate", 10, "--window_size", 0], IdleHost)
+
+    # Options made by hand, with only the settings the simulator started out with, still work
+    def test_minimal_options(self):
+        options = optparse.Values({"num_pkts": 20, "timer_interval": 3, "loss_prob": 0.1, "corrupt_prob": 0.1,
+                                   "arrival_rate": 5, "seed": 4})
+        simulator = NetworkSimulator(options, GBNHost, RingBufferSink(10))
+        events = simulator.Simulate()
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+        self.assertEqual(len(events), simulator.nprocessed)
+
+
+class TestSimulatorRandomStreams(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def make_simulator(self, *extra):
+        return make_simulator(["--num_pkts", 30, "--timer_interval", 3, "--corrupt_prob", 0.1, "--arrival_rate", 5,
+                               "--seed", 99] + list(extra))
+
+    def test_simulators_in_one_process_do_not_interfere(self):
+        alone = self.make_simulator("--loss_prob", "0.1")
+        alone.Simulate()
+
+        # Run two simulators at the same time in threads, and draw from the global random module
+        # while they run
+        import threading, random
+        first = self.make_simulator("--loss_prob", "0.1")
+        second = self.make_simulator("--loss_prob", "0.1")
+        threads = [threading.Thread(target=sim.Simulate) for sim in (first, second)]
+        for t in threads:
+            t.start()
+        for i in range(1000):
+            random.random()
+        for t in threads:
+            t.join()
+
+        for sim in (first, second):
+            self.assertEqual(sim.A.data_received, alone.A.data_received)
+            self.assertEqual(sim.ntolayer3, alone.ntolayer3)
+
+    def test_substreams_keep_arrivals_when_loss_changes(self):
+        lossless = self.make_simulator("--loss_prob", "0", "--rng_substreams")
+        lossy = self.make_simulator("--loss_prob", "0.3", "--rng_substreams")
+        lossless.Simulate()
+        lossy.Simulate()
+
+        self.assertEqual(lossless.A.data_sent, lossy.A.data_sent)
+        self.assertEqual(lossless.B.data_sent, lossy.B.data_sent)
+        self.assertGreater(lossy.nlost, 0)
+
+
+class TestSimulatorRunLoop(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def make_simulator(self, *extra):
+        return make_simulator(["--num_pkts", 40, "--timer_interval", 3, "--loss_prob", 0.1, "--corrupt_prob", 0.1,
+                               "--arrival_rate", 5, "--seed", 7] + list(extra))
+
+    def test_stepped_run_matches_simulate(self):
+        whole = self.make_simulator()
+        events = whole.Simulate()
+        self.assertIs(events, whole.events)
+
+        stepped = self.make_simulator()
+        until = 0.0
+        while stepped.continue_simulation:
+            until += 10.0
+            stepped.run(until_time=until)
+            self.assertLessEqual(stepped.time, until)
+        while stepped.run(max_events=3):
+            pass
+
+        self.assertEqual(stepped.nprocessed, len(events))
+        self.assertEqual(stepped.time, whole.time)
+        self.assertEqual(stepped.B.data_received, whole.B.data_received)
+
+    def test_keep_events_bounds_memory(self):
+        none_kept = self.make_simulator("--keep_events", "0")
+        self.assertEqual(none_kept.Simulate(), [])
+        self.assertGreater(none_kept.nprocessed, 0)
+
+        last_five = self.make_simulator("--keep_events", "5")
+        self.assertEqual(len(last_five.Simulate()), 5)
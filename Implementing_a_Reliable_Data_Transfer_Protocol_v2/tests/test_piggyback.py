@@ -0,0 +1,72 @@
+import unittest
+from gbn_packet import parse_header, encode_data, encode_data_ack, add_ack, checksum_ok, payload_view, DATA_ACK_TYPE, HEADER_SIZE
+from sim_helpers import make_simulator, run_simulator
+
+
+class TestPiggybackPacket(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def test_round_trip(self):
+        pkt = encode_data_ack(9, -1, b"abc")
+        header = parse_header(pkt)
+        self.assertEqual((header.pkt_type, header.pkt_number, header.ack_number, header.length), (DATA_ACK_TYPE, 9, -1, 3))
+        self.assertFalse(header.is_ack())
+        self.assertTrue(checksum_ok(pkt, header))
+        self.assertEqual(bytes(payload_view(pkt, header)), b"abc")
+        self.assertIsNone(parse_header(encode_data(9, b"abc")).ack_number)
+
+    def test_ack_number_is_checksummed(self):
+        pkt = bytearray(encode_data_ack(9, 4, b"abc"))
+        pkt[HEADER_SIZE + 3] ^= 0x01
+        self.assertFalse(checksum_ok(pkt, parse_header(pkt)))
+
+    def test_add_ack_matches_full_encode(self):
+        for payload in (b"", b"a", b"abc", bytes(range(256)) * 3):
+            for ack_num in (-1, 0, 4, 0x7fffffff):
+                for more in (False, True):
+                    self.assertEqual(add_ack(encode_data(9, payload, more), ack_num),
+                                     encode_data_ack(9, ack_num, payload, more))
+
+
+class TestPiggybackHost(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run_simulator(self, seed, *extra):
+        return run_simulator(["--num_pkts", 300, "--timer_interval", 3, "--loss_prob", 0.1, "--corrupt_prob", 0.1,
+                              "--arrival_rate", 0.2, "--seed", seed] + list(extra))
+
+    def test_held_ack_rides_on_data(self):
+        simulator = make_simulator(["--num_pkts", 0, "--timer_interval", 3, "--loss_prob", 0, "--corrupt_prob", 0,
+                                    "--arrival_rate", 1, "--piggyback"])
+        host = simulator.A
+        host.receive_from_network_layer(encode_data(0, b"in"))
+        self.assertTrue(host.ack_owed)
+        self.assertEqual(simulator.ntolayer3, 0)
+
+        host.receive_from_application_layer(b"out")
+        self.assertFalse(host.ack_owed)
+        self.assertEqual(host.acks_piggybacked, 1)
+        self.assertEqual(simulator.ack_timers, {})
+        # The window keeps the plain packet for resends
+        self.assertIsNone(parse_header(host.unacked_buffer.get(0)).ack_number)
+
+    def test_delivers_everything_in_order(self):
+        for seed in (1, 2, 3):
+            simulator = self.run_simulator(seed, "--piggyback")
+            self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+            self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+            self.assertFalse(simulator.A.ack_owed or simulator.B.ack_owed)
+
+    def test_fewer_transmissions(self):
+        every = self.run_simulator(4)
+        piggyback = self.run_simulator(4, "--piggyback", "--ack_delay", "0.5")
+        self.assertGreater(piggyback.A.acks_piggybacked + piggyback.B.acks_piggybacked, 0)
+        self.assertLess(piggyback.ntolayer3, every.ntolayer3)
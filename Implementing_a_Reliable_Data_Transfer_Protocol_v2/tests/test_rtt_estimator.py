@@ -0,0 +1,88 @@
+import unittest
+from rtt_estimator import RttEstimator
+from sim_helpers import make_simulator, run_simulator
+
+
+class TestRttEstimator(unittest.TestCase):
+    def setUp(self):
+        self.rtt = RttEstimator(3, min_rto=0.5)
+
+    def tearDown(self):
+        pass
+
+    def test_first_sample(self):
+        self.rtt.sample(2)
+        self.assertEqual(self.rtt.srtt, 2)
+        self.assertEqual(self.rtt.rttvar, 1)
+        self.assertEqual(self.rtt.rto, 6)
+
+    def test_smoothing(self):
+        self.rtt.sample(2)
+        self.rtt.sample(4)
+        self.assertAlmostEqual(self.rtt.rttvar, 0.75 * 1 + 0.25 * 2)
+        self.assertAlmostEqual(self.rtt.srtt, 0.875 * 2 + 0.125 * 4)
+        self.assertAlmostEqual(self.rtt.rto, self.rtt.srtt + 4 * self.rtt.rttvar)
+
+    def test_bounds(self):
+        for i in range(50):
+            self.rtt.sample(0.01)
+        self.assertEqual(self.rtt.rto, 0.5)
+        rtt = RttEstimator(3, max_stale_timeouts=100)
+        for i in range(20):
+            rtt.backoff()
+        self.assertEqual(rtt.rto, 3 * 4)
+
+    # Without any valid sample the backoff still doesn't pile up
+    def test_stale_reset_without_samples(self):
+        rtts = []
+        for i in range(6):
+            self.rtt.backoff()
+            rtts.append(self.rtt.rto)
+        self.assertEqual(rtts, [6, 12, 6, 6, 6, 6])
+
+    def test_backoff_until_next_sample(self):
+        self.rtt.backoff()
+        self.rtt.backoff()
+        self.assertEqual(self.rtt.rto, 12)
+        self.rtt.sample(1)
+        self.assertEqual(self.rtt.rto, 3)
+
+
+class TestAdaptiveGBNHost(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run_simulator(self, arrival_rate, loss_prob, seed, *extra):
+        return run_simulator(["--num_pkts", 100, "--timer_interval", 3, "--loss_prob", loss_prob,
+                              "--corrupt_prob", loss_prob, "--arrival_rate", arrival_rate, "--seed", seed] + list(extra))
+
+    def test_delivers_everything_in_order(self):
+        for arrival_rate in (20, 0.3, 0.01):
+            for seed in (1, 2):
+                simulator = self.run_simulator(arrival_rate, 0.1, seed, "--adaptive_rto")
+                self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+                self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+
+    def test_learns_round_trip_time(self):
+        simulator = self.run_simulator(20, 0, 4, "--adaptive_rto")
+        self.assertGreater(simulator.A.rtt.samples, 0)
+        self.assertAlmostEqual(simulator.A.rtt.rto, simulator.A.rtt.srtt + 4 * simulator.A.rtt.rttvar)
+
+    def test_backoff_kept_until_valid_sample(self):
+        for extra, rto in (((), 6), (("--rto_reset_on_ack",), 3)):
+            host = make_simulator(["--num_pkts", 0, "--timer_interval", 3, "--loss_prob", 0, "--corrupt_prob", 0,
+                                   "--arrival_rate", 1, "--adaptive_rto"] + list(extra)).A
+            host.receive_from_application_layer(b"x")
+            host.timer_interrupt()
+            host.receive_ack(0)
+            self.assertEqual(host.window_base, 1)
+            self.assertEqual(host.rtt.samples, 0)
+            self.assertEqual(host.rtt.rto, rto)
+
+    def test_off_by_default(self):
+        fixed = self.run_simulator(0.3, 0.1, 3)
+        self.assertIsNone(fixed.A.rtt)
+        self.assertEqual(fixed.A.current_timeout(), 3)
@@ -0,0 +1,90 @@
+import unittest
+from gbn_host import GBNHost
+from gbn_packet import parse_header, encode_data, payload_view
+from sweep import run_one
+from sim_helpers import parse_options, run_simulator
+
+
+# Keeps every packet it is given instead of simulating the network
+class RecordingSimulator():
+    def __init__(self, options):
+        self.options = options
+        self.time = 0.0
+        self.sent = []
+        self.delivered = []
+
+    def pass_to_network_layer(self, entity, packet, is_ACK=False):
+        self.sent.append(packet)
+
+    def pass_to_application_layer(self, entity, data):
+        self.delivered.append(bytes(data))
+
+    def start_timer(self, entity, increment):
+        pass
+
+    def stop_timer(self, entity):
+        pass
+
+
+class TestSegmentation(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def make_host(self, *extra):
+        return GBNHost(RecordingSimulator(parse_options(["--window_size", 4] + list(extra))), 0, 3, 4)
+
+    def test_segments_fill_the_window(self):
+        host = self.make_host("--mss", "4")
+        host.receive_from_application_layer(b"0123456789abcdefghij")
+        headers = [parse_header(p) for p in host.simulator.sent]
+        self.assertEqual([bytes(payload_view(p, h)) for p, h in zip(host.simulator.sent, headers)],
+                         [b"0123", b"4567", b"89ab", b"cdef"])
+        self.assertTrue(all(h.has_more() for h in headers))
+        self.assertEqual(host.unsent_offset, 16)
+
+        # The rest goes out, marked as the end of the message, once the window moves
+        host.receive_from_application_layer(b"next")
+        self.assertEqual(len(host.app_layer_buffer), 1)
+        host.receive_ack(1)
+        headers = [parse_header(p) for p in host.simulator.sent[4:]]
+        self.assertEqual([h.length for h in headers], [4, 4])
+        self.assertEqual([h.has_more() for h in headers], [False, False])
+        self.assertIsNone(host.unsent_message)
+
+    def test_reassembly(self):
+        host = self.make_host()
+        host.receive_from_network_layer(encode_data(0, b"abc", True))
+        host.receive_from_network_layer(encode_data(1, b"def", True))
+        self.assertEqual(host.simulator.delivered, [])
+        host.receive_from_network_layer(encode_data(2, b"g"))
+        host.receive_from_network_layer(encode_data(3, b"single"))
+        self.assertEqual(host.simulator.delivered, [b"abcdefg", b"single"])
+        self.assertEqual(host.received_segments, [])
+
+    def test_large_messages_over_a_lossy_network(self):
+        for extra in ([], ["--piggyback"]):
+            simulator = run_simulator(["--num_pkts", 12, "--timer_interval", 20, "--loss_prob", 0.05, "--corrupt_prob", 0.05,
+                                       "--arrival_rate", 5, "--seed", 6, "--binary_payloads", "--payload_size", 200000,
+                                       "--mss", 1460, "--window_size", 16] + extra)
+            self.assertGreater(max(len(data) for data in simulator.A.data_sent + simulator.B.data_sent), 10 * 1460)
+            self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+            self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+
+    # The modelled link keeps packets in order, so a lossless run resends nothing
+    def test_segments_are_not_counted_as_resends(self):
+        result = run_one(GBNHost, {"num_pkts": 30, "timer_interval": 50, "loss_prob": 0, "corrupt_prob": 0,
+                                   "arrival_rate": 5, "binary_payloads": True, "payload_size": 4000, "mss": 100,
+                                   "prop_delay": 1}, 3)
+        self.assertEqual(result["retransmissions"], 0)
+
+        # Without segments every data packet beyond the first send of each message is a resend
+        simulator = run_simulator(["--num_pkts", 100, "--timer_interval", 3, "--loss_prob", 0.2, "--corrupt_prob", 0.1,
+                                   "--arrival_rate", 1, "--seed", 5])
+        self.assertEqual(simulator.A.retransmissions + simulator.B.retransmissions,
+                         simulator.A.num_data_sent + simulator.B.num_data_sent - simulator.nsim)
+
+    def test_bad_mss(self):
+        self.assertRaises(ValueError, self.make_host, "--mss", "0")
@@ -0,0 +1,66 @@
+import unittest
+from send_queue import SendQueue, BLOCKED, REJECTED, send_queue_report
+from sim_helpers import make_simulator
+
+
+class TestSendQueue(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def make_simulator(self, *extra):
+        return make_simulator(["--num_pkts", 200, "--timer_interval", 3, "--loss_prob", 0.1, "--corrupt_prob", 0.1,
+                               "--arrival_rate", 0.2, "--seed", 11] + list(extra))
+
+    def test_queue_is_fifo(self):
+        q = SendQueue()
+        for p in ("a", "b", "c"):
+            q.push(p)
+        self.assertEqual([q.pop() for _ in range(3)], ["a", "b", "c"])
+        self.assertEqual(q.max_depth, 3)
+
+    def test_full_queue_policies(self):
+        drop = SendQueue(2, "drop-oldest")
+        for p in ("a", "b", "c"):
+            self.assertTrue(drop.push(p))
+        self.assertEqual(list(drop.items), ["b", "c"])
+        self.assertEqual(drop.dropped, 1)
+
+        self.assertEqual(SendQueue(0, "reject").push("a"), REJECTED)
+        self.assertEqual(SendQueue(0, "block").push("a"), BLOCKED)
+
+    def test_capacity_is_checked(self):
+        self.assertRaises(ValueError, SendQueue, -1, "block")
+        self.assertRaises(ValueError, SendQueue, -1, "reject")
+        self.assertRaises(ValueError, SendQueue, 0, "drop-oldest")
+        self.assertRaises(ValueError, self.make_simulator, "--send_queue_size", "0",
+                          "--send_queue_policy", "drop-oldest")
+
+    def test_fast_arrivals_are_delivered_in_order(self):
+        simulator = self.make_simulator()
+        simulator.Simulate()
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+        self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+        self.assertGreater(simulator.A.app_layer_buffer.max_depth, 1)
+
+    def test_blocking_queue_loses_nothing(self):
+        simulator = self.make_simulator("--send_queue_size", "2", "--send_queue_policy", "block")
+        simulator.Simulate()
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+        self.assertLessEqual(simulator.A.app_layer_buffer.max_depth, 2)
+        self.assertGreater(simulator.A.app_layer_buffer.blocked, 0)
+
+        # What the host refused waited in the simulator instead, and is counted there
+        report = send_queue_report(simulator)["A"]
+        self.assertGreater(report["max_backlog"], 0)
+        self.assertEqual(report["backlog"], 0)
+
+    def test_rejecting_queue_reports_to_simulator(self):
+        simulator = self.make_simulator("--send_queue_size", "2", "--send_queue_policy", "reject")
+        simulator.Simulate()
+        rejected = simulator.A.app_layer_buffer.rejected + simulator.B.app_layer_buffer.rejected
+        self.assertGreater(rejected, 0)
+        self.assertEqual(simulator.nrejected, rejected)
+        self.assertEqual(len(simulator.B.data_received), len(simulator.A.data_sent) - simulator.A.app_layer_buffer.rejected)
@@ -0,0 +1,23 @@
+import unittest
+from send_window import SendWindow
+
+
+class TestSendWindow(unittest.TestCase):
+    def setUp(self):
+        self.window = SendWindow(4)
+
+    def tearDown(self):
+        pass
+
+    def test_wraps_around_the_ring(self):
+        for seq_num in range(10):
+            self.window.store(seq_num, "pkt%i" % seq_num)
+        self.assertEqual(list(self.window.packets(6, 10)), ["pkt6", "pkt7", "pkt8", "pkt9"])
+        self.assertEqual(len(self.window.slots), 4)
+
+    def test_release_frees_slots(self):
+        for seq_num in range(3):
+            self.window.store(seq_num, "pkt%i" % seq_num)
+        self.window.release(0, 2)
+        self.assertEqual(self.window.slots, [None, None, "pkt2", None])
+        self.assertEqual(self.window.get(2), "pkt2")
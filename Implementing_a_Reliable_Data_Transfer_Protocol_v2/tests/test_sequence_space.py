@@ -0,0 +1,92 @@
+import unittest
+from gbn_tester import GBNTester
+from gbn_host import GBNHost
+from gbn_packet import SequenceSpace, parse_header
+from network_simulator import NetworkSimulator
+from stream_checker import DeliveryError
+from sim_helpers import run_simulator
+
+
+class TestSequenceSpace(unittest.TestCase):
+    def setUp(self):
+        self.space = SequenceSpace(3)
+
+    def tearDown(self):
+        pass
+
+    def test_wire(self):
+        self.assertEqual([self.space.wire(n) for n in range(-1, 10)], [7, 0, 1, 2, 3, 4, 5, 6, 7, 0, 1])
+
+    def test_unwrap(self):
+        self.assertEqual(self.space.unwrap(1, 14), 17)
+        self.assertEqual(self.space.unwrap(6, 14), 14)
+        self.assertEqual(self.space.unwrap(5, 14), 21)
+
+    def test_unbounded(self):
+        space = SequenceSpace()
+        self.assertEqual(space.wire(-1), -1)
+        self.assertEqual(space.wire(1 << 40), 1 << 40)
+        self.assertEqual(space.unwrap(3, 100), 3)
+        self.assertTrue(space.fits_window(1000))
+
+    def test_limits(self):
+        self.assertTrue(self.space.fits_window(7))
+        self.assertFalse(self.space.fits_window(8))
+        self.assertRaises(ValueError, SequenceSpace, 0)
+        self.assertRaises(ValueError, SequenceSpace, 32)
+
+
+class TestWindowOptions(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run_simulator(self, *extra):
+        return run_simulator(["--num_pkts", 200, "--timer_interval", 3, "--loss_prob", 0.1, "--corrupt_prob", 0.1,
+                              "--arrival_rate", 0.05, "--seed", 7] + list(extra))
+
+    def test_window_size(self):
+        simulator = self.run_simulator("--window_size", "9")
+        self.assertEqual(simulator.A.window_size, 9)
+        self.assertEqual(simulator.B.window_size, 9)
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+
+    def test_wraparound(self):
+        simulator = self.run_simulator("--window_size", "8", "--seq_bits", "5", "--prop_delay", "1")
+        self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+        self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+        self.assertGreater(simulator.A.window_base, 32)
+        self.assertLess(parse_header(simulator.B.last_ack_pkt).pkt_number, 32)
+
+    def test_window_too_big(self):
+        self.assertRaises(ValueError, self.run_simulator, "--window_size", "8", "--seq_bits", "3", "--prop_delay", "1")
+
+    # The random delay channel reorders packets, so no window is safe with wrapping numbers
+    def test_needs_in_order_link(self):
+        self.assertRaises(ValueError, self.run_simulator, "--window_size", "1", "--seq_bits", "8")
+
+    # Every window the check accepts delivers every message exactly once and in order, over
+    # many seeds, both arrival rates and both ways of modelling the link
+    def test_accepted_windows_deliver_in_order(self):
+        for link in (["--prop_delay", "1"], ["--bandwidth", "10", "--queue_size", "4"]):
+            for bits in (2, 3):
+                for window_size in range(1, 2 ** bits):
+                    for arrival_rate in (2, 0.5):
+                        for seed in range(10):
+                            self.check_stream(link + ["--seq_bits", str(bits), "--window_size", str(window_size),
+                                                      "--arrival_rate", str(arrival_rate), "--seed", str(seed)])
+
+    def check_stream(self, args):
+        tester = GBNTester(GBNHost)
+        options = tester.parse_test_options(
+            {"options": "--num_pkts 60 --timer_interval 3 --loss_prob 0.1 --corrupt_prob 0.1 --trace_level off "
+                        "--stream_check " + " ".join(args)})
+        checker = tester.stream_checker(options)
+        simulator = NetworkSimulator(options, GBNHost, None, checker)
+        try:
+            simulator.Simulate()
+            checker.finish(simulator)
+        except DeliveryError as e:
+            self.fail("%s: %s" % (" ".join(args), e))
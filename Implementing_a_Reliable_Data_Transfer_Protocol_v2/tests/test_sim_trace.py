@@ -0,0 +1,48 @@
+import unittest
+from sim_trace import TraceLevel, RingBufferSink, sink_from_options
+from sim_helpers import make_simulator, parse_options
+
+
+class TestSimTrace(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def make_simulator(self, trace_level, trace_sink=None):
+        return make_simulator(["--num_pkts", 20, "--timer_interval", 3, "--loss_prob", 0.1, "--corrupt_prob", 0.1,
+                               "--arrival_rate", 5, "--seed", 42, "--trace_level", trace_level], trace_sink=trace_sink)
+
+    def test_trace_off_never_unpacks_packets(self):
+        simulator = self.make_simulator("off")
+
+        def fail(byte_data):
+            raise AssertionError("unpack_pkt called while tracing is off")
+        simulator.unpack_pkt = fail
+        simulator.Simulate()
+
+        self.assertEqual(simulator.nsim, 20)
+
+    def test_ring_buffer_keeps_latest_records(self):
+        sink = RingBufferSink(5)
+        simulator = self.make_simulator("full", sink)
+        simulator.Simulate()
+
+        lines = sink.lines()
+        self.assertEqual(len(lines), 5)
+        self.assertTrue(lines[-1].startswith("Simulator terminated"))
+
+    def test_level_filters_records(self):
+        sink = RingBufferSink(100000)
+        simulator = self.make_simulator("packet", sink)
+        simulator.Simulate()
+
+        levels = set(r.level for r in sink.records)
+        self.assertNotIn(TraceLevel.FULL, levels)
+        self.assertIn(TraceLevel.PACKET, levels)
+        self.assertFalse(any("Timer" in line for line in sink.lines()))
+
+    def test_empty_ring_is_refused(self):
+        for size in ("0", "-1"):
+            self.assertRaises(ValueError, sink_from_options, parse_options(["--trace_level", "full", "--trace_ring", size]))
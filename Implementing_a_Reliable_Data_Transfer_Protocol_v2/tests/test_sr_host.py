@@ -0,0 +1,35 @@
+import unittest
+from sr_host import SRHost
+from sim_helpers import make_simulator, run_simulator
+
+
+class TestSRHost(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        pass
+
+    def run_simulator(self, arrival_rate, loss_prob, corrupt_prob, seed):
+        return run_simulator(["--num_pkts", 100, "--timer_interval", 3, "--loss_prob", loss_prob,
+                              "--corrupt_prob", corrupt_prob, "--arrival_rate", arrival_rate, "--seed", seed], SRHost)
+
+    def test_delivers_everything_in_order(self):
+        for arrival_rate in (20, 0.3, 0.01):
+            for seed in (1, 2, 3):
+                simulator = self.run_simulator(arrival_rate, 0.2, 0.2, seed)
+                self.assertEqual(simulator.B.data_received, simulator.A.data_sent)
+                self.assertEqual(simulator.A.data_received, simulator.B.data_sent)
+                self.assertEqual(simulator.A.window_base, len(simulator.A.data_sent))
+
+    def test_no_retransmissions_without_loss(self):
+        simulator = self.run_simulator(20, 0, 0, 5)
+        self.assertEqual(simulator.A.num_data_sent + simulator.B.num_data_sent, simulator.nsim)
+
+    def test_gbn_only_options_are_refused(self):
+        for extra in (["--seq_bits", "8"], ["--mss", "4"], ["--piggyback"], ["--ack_every", "2"],
+                      ["--ack_delay", "1"], ["--fast_retransmit"], ["--adaptive_rto"],
+                      ["--rto_reset_on_ack"]):
+            self.assertRaises(ValueError, make_simulator,
+                              ["--num_pkts", 10, "--timer_interval", 3, "--loss_prob", 0, "--corrupt_prob", 0,
+                               "--arrival_rate", 1] + extra, SRHost)
@@ -0,0 +1,134 @@
+import json, os, shutil, tempfile, unittest
+from binary_trace import TraceReader
+from gbn_tester import GBNTester
+from gbn_host import GBNHost
+from network_simulator import NetworkSimulator, EventEntity
+from stream_checker import StreamChecker, DeliveryError
+
+
+# Stands in for the simulator to a host and passes every fifth message the host passes up twice
+class Stutter():
+    def __init__(self, simulator):
+        self.simulator = simulator
+        self.passed_up = 0
+
+    def __getattr__(self, name):
+        return getattr(self.simulator, name)
+
+    def pass_to_application_layer(self, entity, data):
+        self.simulator.pass_to_application_layer(entity, data)
+        self.passed_up += 1
+        if self.passed_up % 5 == 0:
+            self.simulator.pass_to_application_layer(entity, data)
+
+
+class StutteringHost(GBNHost):
+    def __init__(self, simulator, *args):
+        GBNHost.__init__(self, Stutter(simulator), *args)
+
+
+class TestStreamChecker(unittest.TestCase):
+    def setUp(self):
+        self.checker = StreamChecker()
+
+    def tearDown(self):
+        pass
+
+    # Returns the tagged bytes of each message, as handed to the host
+    def send(self, entity, *messages):
+        return [self.checker.data_sent(entity, m) for m in messages]
+
+    def test_in_order(self):
+        tagged = self.send(EventEntity.A, b"aa", b"bbb", b"aa")
+        reply, = self.send(EventEntity.B, b"cc")
+        delivered = [self.checker.data_delivered(EventEntity.B, data, i) for i, data in enumerate(tagged)]
+        self.assertEqual(delivered, [b"aa", b"bbb", b"aa"])
+        self.assertEqual(self.checker.data_delivered(EventEntity.A, reply, 3), b"cc")
+        self.assertEqual(self.checker.delivered, [1, 3])
+        self.assertEqual(self.checker.sent_hash[0], self.checker.delivered_hash[1])
+        self.assertEqual(self.checker.cursor, [3, 1])
+
+    def test_out_of_order(self):
+        first, second = self.send(EventEntity.A, b"aa", b"bbb")
+        self.assertRaises(DeliveryError, self.checker.data_delivered, EventEntity.B, second, 1.0)
+
+    def test_duplicate(self):
+        first, second = self.send(EventEntity.A, b"aa", b"aa")
+        self.checker.data_delivered(EventEntity.B, first, 1.0)
+        with self.assertRaises(DeliveryError) as raised:
+            self.checker.data_delivered(EventEntity.B, first, 2.0)
+        self.assertEqual(raised.exception.delivery, 1)
+        self.assertEqual(raised.exception.entity, EventEntity.B)
+
+    def test_changed_contents(self):
+        tagged, = self.send(EventEntity.A, b"aa")
+        self.assertRaises(DeliveryError, self.checker.data_delivered, EventEntity.B, tagged[:-1] + b"b", 1.0)
+
+    def test_nothing_sent(self):
+        tagged = StreamChecker().data_sent(EventEntity.B, b"aa")
+        self.assertRaises(DeliveryError, self.checker.data_delivered, EventEntity.A, tagged, 1.0)
+        self.assertRaises(DeliveryError, self.checker.data_delivered, EventEntity.A, b"aa", 1.0)
+
+    def test_gaps(self):
+        self.checker = StreamChecker(allow_gaps=True)
+        first, second, third = self.send(EventEntity.A, b"aa", b"bbb", b"cc")
+        self.checker.data_delivered(EventEntity.B, third, 1.0)
+        self.assertEqual(self.checker.skipped[0], 2)
+        self.assertRaises(DeliveryError, self.checker.data_delivered, EventEntity.B, first, 2.0)
+
+
+class TestStreamCheckOption(unittest.TestCase):
+    def setUp(self):
+        self.test = {"options": "--num_pkts 200 --arrival_rate 0.3 --timer_interval 3 --loss_prob 0.1 "
+                                "--corrupt_prob 0.1 --seed 9 --trace_level off --stream_check"}
+
+    def tearDown(self):
+        pass
+
+    def run_simulator(self, host):
+        tester = GBNTester(host)
+        options = tester.parse_test_options(self.test)
+        checker = tester.stream_checker(options)
+        simulator = NetworkSimulator(options, host, None, checker)
+        try:
+            simulator.Simulate()
+            checker.finish(simulator)
+        except DeliveryError as e:
+            return simulator, e
+        return simulator, None
+
+    def test_correct_host(self):
+        simulator, error = self.run_simulator(GBNHost)
+        self.assertIsNone(error)
+        self.assertEqual(simulator.monitor.delivered[1], simulator.monitor.sent[0])
+        self.assertEqual(simulator.B.data_received, [])
+
+    # The data lists aren't kept, so the tester compares the numbers of messages instead
+    def test_config_with_stream_check(self):
+        path = os.path.join(os.path.dirname(__file__), "test_cases", "Test12_FastDataRate_10Loss_10Corruption.cfg")
+        with open(path) as fp:
+            test = json.load(fp)
+        test["options"] += " --trace_level off --stream_check"
+        self.assertEqual(GBNTester(GBNHost).run_test(None, test), (True, None))
+        test["final_state"]["B"]["data_received"].pop()
+        passed, problems = GBNTester(GBNHost).run_test(None, test)
+        self.assertFalse(passed)
+        self.assertIn("number of data received", problems)
+
+    def test_fails_fast(self):
+        simulator, error = self.run_simulator(StutteringHost)
+        self.assertIsNotNone(error)
+        self.assertEqual(error.delivery, 5)
+        self.assertLess(simulator.nsim, 200)
+
+    def test_failed_run_keeps_its_trace(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "trace.bin")
+            test = {"options": self.test["options"] + " --record_trace " + path}
+            passed, error = GBNTester(StutteringHost).run_test(None, test)
+            self.assertFalse(passed)
+            with TraceReader(path) as reader:
+                self.assertGreater(len(reader), 0)
+        finally:
+            shutil.rmtree(directory)
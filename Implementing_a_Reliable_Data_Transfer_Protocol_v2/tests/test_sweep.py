@@ -0,0 +1,22 @@
+import unittest
+from sweep import run_sweep
+
+
+class TestSweep(unittest.TestCase):
+    def setUp(self):
+        self.base = {"num_pkts": 30, "timer_interval": 3, "corrupt_prob": 0.1, "arrival_rate": 5}
+        self.grid = {"loss_prob": [0, 0.2]}
+
+    def tearDown(self):
+        pass
+
+    def test_results_do_not_depend_on_worker_count(self):
+        serial = run_sweep(self.base, self.grid, [1, 2, 3], workers=1, chunk_size=2)
+        parallel = run_sweep(self.base, self.grid, [1, 2, 3], workers=2, chunk_size=1)
+        self.assertEqual(serial.runs, parallel.runs)
+        self.assertEqual(serial.summary["runs"], [3, 3])
+
+    def test_lossless_runs_have_no_lost_packets(self):
+        result = run_sweep(self.base, self.grid, [7], workers=1)
+        self.assertEqual(result.runs["loss_prob"], [0, 0.2])
+        self.assertEqual(result.runs["nlost"][0], 0)
@@ -0,0 +1,134 @@
+import sys
+from optparse import OptionParser, Values
+from binary_trace import TraceReader, as_bytes, TO_NETWORK, TO_APPLICATION
+from network_simulator import NetworkSimulator, SimulatedEvent, EventType, EventEntity
+from stream_checker import checker_from_options, DeliveryError
+from gbn_host import GBNHost
+from sr_host import SRHost
+
+EVENT_TYPES = {t.value: t for t in EventType}
+ENTITIES = (EventEntity.A, EventEntity.B)
+
+
+# Feeds the events recorded in a binary trace (see binary_trace.py) to a pair of hosts. No
+# random numbers are drawn: the application data, the packets that reached each host (lost,
+# delayed and corrupted exactly as they were) and the timer interrupts all come from the
+# trace, at the times they were recorded. Whatever the hosts send is checked against what
+# was recorded instead of being put on a network.
+#
+# Replaying the host that made the trace must reproduce it exactly (mismatches == 0). A host
+# that has been changed gets the same inputs, and first_mismatch shows the first output that
+# differs, as (output number, time). Once a host departs from the trace the inputs no longer
+# follow from what it does, so only the first mismatch is meaningful.
+class ReplaySimulator(NetworkSimulator):
+    def __init__(self, reader, RDTHost, trace_sink=None):
+        options = Values(reader.options)
+        options.record_trace = None
+        options.keep_events = 0
+        if trace_sink is None:
+            options.trace_level = "off"
+        # A trace made with --stream_check holds the data as the application sent it, and what
+        # the hosts passed up with its tag, so the data is tagged again on the way in
+        NetworkSimulator.__init__(self, options, RDTHost, trace_sink, checker_from_options(options))
+
+        # The recorded events are in the order they were handled, so the list is already a heap.
+        # Recorded outputs are kept as raw records and their payloads only looked at when
+        # they are checked
+        self.payloads = reader.payloads
+        self.expected = []
+        event_list = self.event_list
+        event_seq = self.event_seq
+        for record in reader.raw_records():
+            time, entity, kind, checksum, length, offset = record
+            if kind >= TO_NETWORK:
+                self.expected.append(record)
+            else:
+                event = SimulatedEvent(time, EVENT_TYPES[kind], ENTITIES[entity], self.payloads[offset:offset + length])
+                event_list.append((time, next(event_seq), event))
+        self.next_output = 0
+        self.mismatches = 0
+        self.first_mismatch = None
+        self.missing = 0
+
+    def Simulate(self):
+        events = NetworkSimulator.Simulate(self)
+        self.missing = len(self.expected) - min(self.next_output, len(self.expected))
+        self.expected = None
+        self.payloads = None
+        return events
+
+    # Arrivals come from the trace
+    def generate_next_arrival(self):
+        pass
+
+    def handle_from_layer5(self, cur_event):
+        self.from_application_layer(cur_event.eventity, self.app_payloads.from_bytes(cur_event.pkt))
+
+    # A recorded timer interrupt is only passed on if the host has that timer running. A
+    # host that behaves differently may have stopped it, or never started it
+    def handle_timer_interrupt(self, cur_event):
+        if cur_event.eventity in self.timers:
+            NetworkSimulator.handle_timer_interrupt(self, cur_event)
+
+    def handle_ack_timer_interrupt(self, cur_event):
+        if cur_event.eventity in self.ack_timers:
+            NetworkSimulator.handle_ack_timer_interrupt(self, cur_event)
+
+    # Timers the hosts start have nothing to do: they fired (or not) when the trace says
+    def insert_event(self, new_event):
+        pass
+
+    def pass_to_network_layer(self, entity, packet, is_ACK = False):
+        self.ntolayer3 += 1
+        if is_ACK:
+            self.Host[entity].num_ack_sent += 1
+        else:
+            self.Host[entity].num_data_sent += 1
+        self.print_entity_message(entity, "Passing to Network Layer", packet)
+        self.check_output(TO_NETWORK, entity, packet)
+
+    # A host that breaks the stream differs from the trace, which check_output counts
+    def pass_to_application_layer(self, entity, data):
+        try:
+            NetworkSimulator.pass_to_application_layer(self, entity, data)
+        except DeliveryError:
+            pass
+        self.check_output(TO_APPLICATION, entity, as_bytes(data))
+
+    def check_output(self, kind, entity, data):
+        index = self.next_output
+        self.next_output += 1
+        if index < len(self.expected):
+            _, expected_entity, expected_kind, _, length, offset = self.expected[index]
+            if expected_kind == kind and expected_entity == entity and self.payloads[offset:offset + length] == data:
+                return
+        self.mismatches += 1
+        if self.first_mismatch is None:
+            self.first_mismatch = (index, self.time)
+
+
+# Replays the trace at path through RDTHost and returns the simulator, for its hosts and
+# mismatch counts
+def replay(path, RDTHost=GBNHost):
+    with TraceReader(path) as reader:
+        simulator = ReplaySimulator(reader, RDTHost)
+        simulator.Simulate()
+    return simulator
+
+
+if __name__ == "__main__":
+    op = OptionParser(usage="%prog [options] TRACE", description="Replays a binary simulator trace through a host")
+    op.add_option("--host", type="choice", choices=["gbn", "sr"], default="gbn")
+    args, paths = op.parse_args()
+    if len(paths) != 1:
+        op.error("expected one trace file")
+
+    simulator = replay(paths[0], GBNHost if args.host == "gbn" else SRHost)
+    print("replayed %i events, %i outputs checked" % (simulator.nprocessed, simulator.next_output))
+    if simulator.first_mismatch:
+        print("%i outputs differ, first at output %i (time %.4f)" % (simulator.mismatches, *simulator.first_mismatch))
+    if simulator.missing:
+        print("%i recorded outputs were never produced" % simulator.missing)
+    if simulator.mismatches or simulator.missing:
+        sys.exit(1)
+    print("identical to the trace")